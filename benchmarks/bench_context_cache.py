@@ -0,0 +1,84 @@
+"""Back-to-back segment edits of a media, like a reviewer nudging segment edges
+
+Load the segment validator context of a media with a long segments history, edit a segment and store the media,
+without context cache (`ContextCache__max_entries=0`, rebuilding the context on every edit as before) and with it.
+
+Usage: python benchmarks/bench_context_cache.py [--edits 200] [--segments 500] [--medias 500]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from movie_pipeline_segments_validator.adapters.repository.session_repository import SessionRepository
+from movie_pipeline_segments_validator.domain.movie_segments import MovieSegments
+from movie_pipeline_segments_validator.domain.segment_container import Segment
+from movie_pipeline_segments_validator.lib.timestamp_codec import encode_segments
+from movie_pipeline_segments_validator.settings import ContextCacheSettings, Settings
+
+from bench_session_build import create_config, create_folder
+
+
+def create_media_history(media_path: Path, segments: int, results: int):
+    raw_segments = encode_segments((i * 10., i * 10. + 5.) for i in range(segments))
+    media_path.with_name(f'{media_path.name}.segments.json').write_text(json.dumps({'auto': raw_segments}), encoding='utf-8')
+    media_path.with_name(f'{media_path.name}.segments.jsonl').write_text(
+        ''.join(f'{json.dumps({f"result_{i}": raw_segments})}\n' for i in range(results)),
+        encoding='utf-8'
+    )
+
+
+def measure(config: Settings, session_id: str, media_stem: str, edits: int):
+    session_repository = SessionRepository(config)
+
+    started_at = time.perf_counter()
+    for i in range(edits):
+        context = session_repository.get_segment_validator_context(session_id, media_stem)
+        segment = context.segment_container.segments[0]
+        context.segment_container.edit(segment, Segment(segment.start, 1. + i % 2))
+        session_repository.update_media(session_id, context)
+    elapsed_s = time.perf_counter() - started_at
+
+    return session_repository.get_media(session_id, media_stem).segments, elapsed_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--edits', type=int, default=200, help='number of edits')
+    parser.add_argument('--segments', type=int, default=500, help='number of segments of the media')
+    parser.add_argument('--medias', type=int, default=500, help='number of medias of the synthetic folder')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(Path(temp_dir))
+        config.Paths.db_path = Path(temp_dir) / 'sessions.sqlite3'
+
+        root_path = Path(temp_dir) / 'PVR'
+        root_path.mkdir()
+        create_folder(root_path, args.medias)
+
+        media_path = sorted(root_path.glob('*.ts'))[0]
+        create_media_history(media_path, args.segments, results=20)
+
+        session_repository = SessionRepository(config)
+        session = session_repository.create(root_path)
+        media_stem = media_path.stem
+
+        # prefill media segments from detector segments, like showing the media does
+        context = session_repository.get_segment_validator_context(session.id, media_stem)
+        context.segment_container.add_many(Segment(start, end) for start, end in MovieSegments(context.imported_segments['auto']).segments)
+        session_repository.update_media(session.id, context)
+
+        print(f'{args.edits} edits of a media with {args.segments} segments, in a folder of {args.medias} medias')
+        results = {}
+        for max_entries in (0, ContextCacheSettings().max_entries):
+            run_config = config.model_copy(update={'ContextCache': ContextCacheSettings(max_entries=max_entries)})
+            results[max_entries], elapsed_s = measure(run_config, session.id, media_stem, args.edits)
+            print(f'max_entries={max_entries:<4} {elapsed_s:>8.3f} s  {elapsed_s / args.edits * 1000:>8.3f} ms/edit')
+
+        assert len(set(map(repr, results.values()))) == 1, 'stored segments differ'
+
+
+if __name__ == '__main__':
+    main()
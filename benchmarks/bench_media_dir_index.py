@@ -0,0 +1,94 @@
+"""State computation of every media of a large recordings folder
+
+Compare the previous implementation (four globs, then one regex scan of all entries per media)
+with the single-pass `MediaDirIndex` on a synthetic folder.
+
+Usage: python benchmarks/bench_media_dir_index.py [--entries 20000]
+"""
+import argparse
+import itertools
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from movie_pipeline_segments_validator.domain.media_path import MediaDirIndex
+
+MEDIA_EXT = '.ts'
+SIDECAR_SUFFIXES = (
+    (),
+    ('.metadata.json',),
+    ('.metadata.json', '.segments.json'),
+    ('.metadata.json', '.segments.json', '.yml'),
+    ('.metadata.json', '.segments.json', '.pending_yml_1739740572'),
+    ('.metadata.json', '.segments.json', '.yml.done'),
+)
+
+
+def create_folder(root_path: Path, entries: int):
+    created_entries = 0
+
+    for i in itertools.count():
+        media_path = root_path / f'Channel {i % 20}_Program {i}_2022-12-05-2203-20{MEDIA_EXT}'
+
+        for path in (media_path, *(media_path.with_name(f'{media_path.name}{suffix}') for suffix in SIDECAR_SUFFIXES[i % len(SIDECAR_SUFFIXES)])):
+            path.touch()
+            created_entries += 1
+
+        if created_entries >= entries:
+            return
+
+
+def glob_states(root_path: Path):
+    """Previous implementation"""
+    cached_media_dir_entries = set(itertools.chain(
+        root_path.glob(f'*{MEDIA_EXT}'),
+        root_path.glob(f'*{MEDIA_EXT}.metadata.json'),
+        root_path.glob(f'*{MEDIA_EXT}.segments.json'),
+        root_path.glob(f'*{MEDIA_EXT}.*yml*'),
+    ))
+
+    def state(path: Path):
+        media_processing_suffix_regex = re.compile(fr'{re.escape(path.name)}\..*yml.*')
+
+        if path.with_suffix(f'{path.suffix}.yml.done') in cached_media_dir_entries:
+            return 'media_processed'
+        elif path.with_suffix(f'{path.suffix}.yml') in cached_media_dir_entries:
+            return 'segment_reviewed'
+        elif path.with_suffix(f'{path.suffix}.metadata.json') not in cached_media_dir_entries:
+            return 'waiting_metadata'
+        elif path.with_suffix(f'{path.suffix}.segments.json') not in cached_media_dir_entries:
+            return 'no_segment'
+        elif any(entry.suffix != '.txt' for entry in cached_media_dir_entries if media_processing_suffix_regex.match(entry.name)):
+            return 'media_processing'
+        else:
+            return 'waiting_segment_review'
+
+    return {path.name: state(path) for path in root_path.glob(f'*{MEDIA_EXT}')}
+
+
+def index_states(root_path: Path):
+    media_dir_index = MediaDirIndex.scan(root_path, MEDIA_EXT)
+    return {path.name: media_dir_index.state(path) for path in media_dir_index.media_paths}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=20000, help='number of files in the synthetic folder')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root_path = Path(temp_dir)
+        create_folder(root_path, args.entries)
+
+        results = {}
+        for name, fn in (('glob + regex scan per media', glob_states), ('single-pass directory index', index_states)):
+            started_at = time.perf_counter()
+            results[name] = fn(root_path)
+            print(f'{name:<30} {time.perf_counter() - started_at:>8.3f} s ({len(results[name])} medias)')
+
+        assert len(set(map(lambda states: tuple(sorted(states.items())), results.values()))) == 1, 'states differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Segment container operations with thousands of segments, like scene-cut detector output
+
+Compare the previous implementation (a set scanned on every add and edit, sorted on every access)
+with the sorted arrays of `SegmentContainer`.
+
+Usage: python benchmarks/bench_segment_container.py [--segments 5000]
+"""
+import argparse
+import random
+import time
+
+from movie_pipeline_segments_validator.domain.segment_container import Segment, SegmentContainer
+
+
+class SetSegmentContainer:
+    def __init__(self) -> None:
+        self._segments: set[Segment] = set()
+
+    @property
+    def segments(self):
+        return tuple(sorted(self._segments))
+
+    def add(self, segment: Segment):
+        if SegmentContainer.check_validity(self._segments, segment):
+            self._segments.add(segment)
+
+    def add_many(self, segments):
+        for segment in segments:
+            self.add(segment)
+
+    def edit(self, old_segment: Segment, new_segment: Segment):
+        if SegmentContainer.check_validity([segment for segment in self._segments if segment != old_segment], new_segment):
+            self._segments.remove(old_segment)
+            self._segments.add(new_segment)
+
+
+def scene_cuts(count: int, rng: random.Random) -> list[Segment]:
+    """Shots separated by one frame, with a few duplicated detections overlapping them"""
+    segments, position = [], 0.
+
+    for _ in range(count):
+        duration = round(rng.uniform(.5, 8.), 2)
+        segments.append(Segment(position, position + duration))
+        position = round(position + duration + .04, 2)
+
+    overlapping_segments = [Segment(segment.start + .1, segment.end + .1) for segment in rng.sample(segments, count // 10)]
+    return rng.sample(segments + overlapping_segments, len(segments) + len(overlapping_segments))
+
+
+def measure(container_class, segments: list[Segment], accesses: int, rng: random.Random):
+    started_at = time.perf_counter()
+    container = container_class()
+    container.add_many(segments)
+    built_at = time.perf_counter()
+
+    for _ in range(accesses):
+        container.segments
+    accessed_at = time.perf_counter()
+
+    for segment in rng.sample(container.segments, 100):
+        container.edit(segment, Segment(segment.start, segment.end - .01))
+    edited_at = time.perf_counter()
+
+    return container.segments, (built_at - started_at, accessed_at - built_at, edited_at - accessed_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segments', type=int, default=5000, help='number of detected segments')
+    parser.add_argument('--accesses', type=int, default=100, help='number of sorted segments accesses')
+    args = parser.parse_args()
+
+    segments = scene_cuts(args.segments, random.Random(42))
+    print(f'{len(segments)} segments')
+
+    results = {}
+    for container_class in (SetSegmentContainer, SegmentContainer):
+        results[container_class], (build_s, access_s, edit_s) = measure(container_class, segments, args.accesses, random.Random(42))
+        print(f'{container_class.__name__:<20} build {build_s:>8.3f} s  {args.accesses} accesses {access_s:>8.3f} s  100 edits {edit_s:>8.3f} s')
+
+    assert results[SetSegmentContainer] == results[SegmentContainer], 'containers differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Scaling of session medias build with the worker pool size
+
+Build every media of a folder serially, then with thread pools (and optionally process pools)
+of increasing size, checking results match the serial build. The gain of threads comes from
+overlapping sidecar reads, so it is the most visible with `--root-path` on a network share.
+
+Usage: python benchmarks/bench_session_build.py [--medias 2000] [--root-path V:\\PVR] [--process-pool]
+"""
+import argparse
+import contextlib
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from movie_pipeline_segments_validator.adapters.repository.session_repository import build_medias
+from movie_pipeline_segments_validator.services.media_selector_service import list_medias
+from movie_pipeline_segments_validator.settings import SessionBuildSettings, Settings
+
+WORKERS = (1, 2, 4, 8, 16, 32)
+
+
+def create_folder(root_path: Path, medias: int):
+    for i in range(medias):
+        media_path = root_path / f'Channel {i % 2 + 1}_Serie Name {i}_2022-12-05-2203-20.ts'
+        media_path.touch()
+        media_path.with_name(f'{media_path.name}.metadata.json').write_text(json.dumps({
+            'title': f'Serie Name {i}',
+            'sub_title': f'Serie Name {i} : Episode Name. Série policière. 2022. Saison 1. {i % 26 + 1}/26.',
+            'description': ''
+        }), encoding='utf-8')
+
+        if i % 3 == 0:
+            media_path.with_name(f'{media_path.name}.segments.json').write_text('{}', encoding='utf-8')
+
+
+def create_config(config_dir_path: Path) -> Settings:
+    (config_dir_path / 'Films').mkdir()
+    (config_dir_path / 'Séries').mkdir()
+    (config_dir_path / 'title_strategies.yml').write_text(
+        'Channel 1: SerieSubTitleAwareTitleExtractor\nChannel 2: SubtitleTitleExpanderExtractor',
+        encoding='utf-8'
+    )
+
+    with contextlib.chdir(config_dir_path):
+        return Settings(Paths={  # type: ignore
+            'movies_folder': 'Films',
+            'series_folder': 'Séries',
+            'title_strategies': 'title_strategies.yml'
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--medias', type=int, default=2000, help='number of medias of the synthetic folder')
+    parser.add_argument('--root-path', type=Path, help='existing folder to build instead of a synthetic one')
+    parser.add_argument('--process-pool', action='store_true', help='also measure process pools')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(Path(temp_dir))
+
+        if args.root_path is None:
+            args.root_path = Path(temp_dir) / 'PVR'
+            args.root_path.mkdir()
+            create_folder(args.root_path, args.medias)
+
+        media_paths = list_medias(args.root_path, config)
+        serial_medias = None
+
+        runs = [('threads', workers, False) for workers in WORKERS]
+        if args.process_pool:
+            runs += [('processes', workers, True) for workers in WORKERS[1:]]
+
+        print(f'{len(media_paths)} medias')
+        for kind, workers, use_process_pool in runs:
+            session_build_settings = SessionBuildSettings(max_workers=workers, use_process_pool=use_process_pool, min_parallel_medias=1)
+            run_config = config.model_copy(update={'SessionBuild': session_build_settings})
+
+            started_at = time.perf_counter()
+            medias = build_medias(media_paths, run_config)
+            elapsed_s = time.perf_counter() - started_at
+
+            if serial_medias is None:
+                serial_medias = medias
+            assert medias == serial_medias, f'{kind} x{workers} build differs from serial build'
+            print(f'{kind:<10} x{workers:<3} {elapsed_s:>8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
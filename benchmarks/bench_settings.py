@@ -0,0 +1,74 @@
+"""Per-request overhead of resolving the settings dependency
+
+Compare building `Settings` from the env file on every request (previous behavior)
+with the process-wide `SettingsLoader` only checking files mtime once its TTL expires.
+
+Usage: python benchmarks/bench_settings.py [--requests 2000]
+"""
+import argparse
+import contextlib
+import json
+import tempfile
+import timeit
+from pathlib import Path
+
+from movie_pipeline_segments_validator.settings import Settings, SettingsLoader
+
+
+def create_config(config_dir_path: Path) -> Path:
+    (config_dir_path / 'Films').mkdir()
+    (config_dir_path / 'Séries').mkdir()
+    (config_dir_path / 'title_strategies.yml').write_text(
+        '\n'.join(f'Channel {i}: SubtitleTitleExpanderExtractor' for i in range(50)),
+        encoding='utf-8'
+    )
+    (config_dir_path / 'title_re_blacklist.txt').write_text(
+        '\n'.join(rf'\bword{i}\b' for i in range(200)),
+        encoding='utf-8'
+    )
+    (config_dir_path / 'series_extracted_metadata.json').write_text(
+        json.dumps({f'Serie {i}': {'season': 1, 'episodes': list(range(26))} for i in range(500)}),
+        encoding='utf-8'
+    )
+
+    config_path = config_dir_path / 'config.env'
+    config_path.write_text(
+        'Paths__movies_folder=Films\n'
+        'Paths__series_folder=Séries\n'
+        'Paths__title_strategies=title_strategies.yml\n'
+        'Paths__title_re_blacklist=title_re_blacklist.txt\n'
+        'Paths__series_extracted_metadata=series_extracted_metadata.json\n',
+        encoding='utf-8'
+    )
+
+    return config_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='number of simulated requests')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_path = create_config(Path(temp_dir))
+
+        def build_per_request():
+            with contextlib.chdir(config_path.parent):
+                Settings(_env_file=config_path, _env_file_encoding='utf-8')  # type: ignore
+
+        settings_loader = SettingsLoader(config_path)
+        settings_loader.get()
+        always_checked_settings_loader = SettingsLoader(config_path, ttl_s=0)
+        always_checked_settings_loader.get()
+
+        for name, fn in (
+            ('build per request', build_per_request),
+            ('loader, mtime checked every request', always_checked_settings_loader.get),
+            ('loader, mtime checked every 2s', settings_loader.get)
+        ):
+            elapsed_s = min(timeit.repeat(fn, number=args.requests, repeat=3))
+            print(f'{name:<40} {elapsed_s / args.requests * 1e6:>10.2f} µs/request')
+
+
+if __name__ == '__main__':
+    main()
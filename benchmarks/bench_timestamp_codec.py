@@ -0,0 +1,81 @@
+"""Timestamp formatting and parsing of thousands of segments, like scene-cut detector output
+
+Compare the previous per-value implementations (`time.gmtime`/`strftime` and `timedelta`)
+with the bulk functions of `timestamp_codec`.
+
+Usage: python benchmarks/bench_timestamp_codec.py [--segments 5000]
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+from movie_pipeline_segments_validator.lib.timestamp_codec import decode_segments, encode_segments
+
+
+def seconds_to_position(seconds: float) -> str:
+    formatted_time = time.strftime('%H:%M:%S', time.gmtime(seconds))
+    formatted_decimal_part = f'{(seconds % 1):.3f}'.removeprefix('0')
+    return f"{formatted_time}{formatted_decimal_part}"
+
+
+def position_in_seconds(position: str) -> float:
+    hours, mins, secs = position.split(':', maxsplit=3)
+    return timedelta(hours=int(hours), minutes=int(mins), seconds=float(secs)).total_seconds()
+
+
+def humanize_segments(segments: list[tuple[float, float]]) -> str:
+    return ','.join('-'.join(map(seconds_to_position, segment)) for segment in segments)
+
+
+def parse_segments(raw_segments: str) -> list[tuple[float, ...]]:
+    splitted_raw_segments = raw_segments.removesuffix(',').split(',')
+    return [
+        tuple(position_in_seconds(x) for x in segment.split('-', 2))
+        for segment in splitted_raw_segments
+    ] if splitted_raw_segments != [''] else []
+
+
+def scene_cuts(count: int, rng: random.Random) -> list[tuple[float, float]]:
+    segments, position = [], 0.
+
+    for _ in range(count):
+        duration = rng.uniform(.5, 8.)
+        segments.append((position, position + duration))
+        position += duration + .04
+
+    return segments
+
+
+def measure(encode, decode, segments: list[tuple[float, float]], repeat: int):
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        raw_segments = encode(segments)
+    encoded_at = time.perf_counter()
+
+    for _ in range(repeat):
+        decoded_segments = decode(raw_segments)
+    decoded_at = time.perf_counter()
+
+    return (raw_segments, decoded_segments), (encoded_at - started_at, decoded_at - encoded_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--segments', type=int, default=5000, help='number of detected segments')
+    parser.add_argument('--repeat', type=int, default=20, help='number of encodings and decodings')
+    args = parser.parse_args()
+
+    segments = scene_cuts(args.segments, random.Random(42))
+    print(f'{len(segments)} segments, {args.repeat} times')
+
+    results = {}
+    for name, encode, decode in (('per value', humanize_segments, parse_segments), ('timestamp_codec', encode_segments, decode_segments)):
+        results[name], (encode_s, decode_s) = measure(encode, decode, segments, args.repeat)
+        print(f'{name:<16} encode {encode_s:>8.3f} s  decode {decode_s:>8.3f} s')
+
+    assert results['per value'] == results['timestamp_codec'], 'codecs differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""Offline benchmark suite of sessions, segments and frames
+
+Generate synthetic PVR folders of 100, 1k and 10k medias with realistic sidecar files (metadata, detector
+segments, segments journal, EDL files in every processing state) and a short test video made with ffmpeg `testsrc`,
+then time:
+
+- `list_medias` and the title extraction of every media of a folder
+- `SessionRepository.create`, session GET and refresh through the FastAPI `TestClient`
+- segment edit round trips (create then edit a segment) through the FastAPI `TestClient`
+- `extract_frame` from the test video (skipped when ffmpeg is not available)
+
+Results are written as JSON (`benchmarks/results/{commit}.json` by default). Compare them with the results of
+another commit with `--compare`, which exits with status 1 when a median is slower than `--threshold` times the
+baseline one.
+
+Usage: python benchmarks/run_suite.py [--sizes 100 1000 10000] [--repeat 5] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import ffmpeg
+
+from movie_pipeline_segments_validator.adapters.repository.session_repository import SessionRepository
+from movie_pipeline_segments_validator.lib.timestamp_codec import encode_segments
+from movie_pipeline_segments_validator.lib.video_player.simple_video_only_player import extract_frame
+from movie_pipeline_segments_validator.services.edit_decision_file_dumper import extract_titles
+from movie_pipeline_segments_validator.services.media_selector_service import list_medias
+
+RESULTS_PATH = Path(__file__).parent / 'results'
+MEDIA_EXT = '.ts'
+VIDEO_DURATION_S = 30
+CHANNELS = (
+    ('Channel 1', 'SerieSubTitleAwareTitleExtractor'),
+    ('Channel 2', 'SubtitleTitleExpanderExtractor'),
+    ('Channel 3', 'NaiveTitleExtractor')
+)
+
+
+def create_test_video(video_path: Path) -> Optional[str]:
+    """Create a short MPEG-TS video with ffmpeg `testsrc`, returning the error when ffmpeg cannot"""
+    cmd = (
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc=duration={VIDEO_DURATION_S}:size=640x360:rate=25',
+        '-c:v', 'mpeg2video', '-q:v', '4', '-g', '25', '-f', 'mpegts', str(video_path)
+    )
+
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        return str(e)
+
+    return None
+
+
+def create_pvr_folder(root_path: Path, medias: int, video_path: Optional[Path], rng: random.Random) -> list[Path]:
+    """Medias of a PVR folder in every state, the first one being the test video when available"""
+    root_path.mkdir(parents=True)
+    media_paths = []
+
+    for i in range(medias):
+        channel, _ = CHANNELS[i % len(CHANNELS)]
+        media_path = root_path / f'{channel}_Serie Name {i}_2022-12-05-2203-20{MEDIA_EXT}'
+        media_paths.append(media_path)
+
+        if i == 0 and video_path is not None:
+            shutil.copyfile(video_path, media_path)
+        else:
+            media_path.touch()
+
+        def sidecar(suffix: str):
+            return media_path.with_name(f'{media_path.name}{suffix}')
+
+        if i % 10 == 9:
+            continue  # waiting_metadata
+
+        sidecar('.metadata.json').write_text(json.dumps({
+            'title': f'Serie Name {i}',
+            'sub_title': f'Serie Name {i} : Episode Name. Série policière. 2022. Saison 1. {i % 26 + 1}/26.',
+            'description': 'Bla Bla Bla'
+        }), encoding='utf-8')
+
+        if i % 10 == 8:
+            continue  # no_segment
+
+        detected_segments = sorted((start, start + rng.uniform(60, 600)) for start in rng.sample(range(0, 6000, 10), 20))
+        sidecar('.segments.json').write_text(json.dumps({
+            'auto': encode_segments(detected_segments[:10]) + ',',
+            'total': encode_segments(detected_segments[10:]) + ','
+        }), encoding='utf-8')
+
+        if i % 4 == 0:
+            sidecar('.segments.jsonl').write_text(''.join(
+                f'{json.dumps({f"result_2024-10-05T11:40:{second:02d}": encode_segments(detected_segments[:5])})}\n'
+                for second in range(10)
+            ), encoding='utf-8')
+
+        if i % 7 == 0:
+            sidecar('.yml').write_text(f"filename: Serie Name {i}.mp4\nsegments: '00:00:00.000-00:10:00.000,'\nskip_backup: false\n", encoding='utf-8')
+        elif i % 11 == 0:
+            sidecar('.yml.done').write_text(f'filename: Serie Name {i}.mp4\n', encoding='utf-8')
+        elif i % 13 == 0:
+            sidecar('.pending_yml_1739740572').write_text(f'filename: Serie Name {i}.mp4\n', encoding='utf-8')
+
+    return media_paths
+
+
+def create_config_file(config_dir_path: Path) -> Path:
+    (config_dir_path / 'Films').mkdir()
+    (config_dir_path / 'Séries').mkdir()
+    (config_dir_path / 'title_strategies.yml').write_text(
+        '\n'.join(f'{channel}: {title_strategy}' for channel, title_strategy in CHANNELS),
+        encoding='utf-8'
+    )
+
+    config_path = config_dir_path / 'config.env'
+    config_path.write_text('\n'.join((
+        'Paths__movies_folder=Films',
+        'Paths__series_folder=Séries',
+        'Paths__title_strategies=title_strategies.yml',
+        'Paths__db_path=sessions.sqlite3',
+        f'MediaSelector__media_extension={MEDIA_EXT}',
+        # frames prefetched in background would compete with the measured requests
+        'FramePrefetch__enabled=false',
+        'FrameCache__disk_path=cache/frames',
+    )), encoding='utf-8')
+
+    return config_path
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    durations_s = []
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        durations_s.append(time.perf_counter() - started_at)
+
+    return {
+        'repeat': repeat,
+        'min_s': min(durations_s),
+        'median_s': statistics.median(durations_s),
+        'mean_s': statistics.fmean(durations_s)
+    }
+
+
+def git_revision() -> dict[str, Any]:
+    def git(*args: str):
+        return subprocess.run(('git', *args), cwd=Path(__file__).parent, check=True, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': git('status', '--porcelain', '--untracked-files=no') != ''}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def run_suite(sizes: list[int], repeat: int, work_path: Path) -> list[dict[str, Any]]:
+    config_path = create_config_file(work_path)
+    # the API settings are loaded from CONFIG_PATH when the app is imported
+    os.environ['CONFIG_PATH'] = str(config_path)
+
+    from fastapi.testclient import TestClient
+
+    from movie_pipeline_segments_validator.adapters.http.dependencies import get_settings
+    from movie_pipeline_segments_validator.adapters.http.main import app
+
+    config = get_settings(config_path)
+    results: list[dict[str, Any]] = []
+
+    def record(name: str, medias: Optional[int], fn: Callable[[], Any], repeat=repeat):
+        result = {'name': name, 'medias': medias, **measure(fn, repeat)}
+        results.append(result)
+        print(f"{name:<28} {medias or '':>6} {result['median_s'] * 1000:>12.3f} ms (median of {repeat})")
+
+    def skip(name: str, medias: Optional[int], reason: str):
+        results.append({'name': name, 'medias': medias, 'skipped': reason})
+        print(f"{name:<28} {medias or '':>6} skipped: {reason.splitlines()[0]}")
+
+    video_path = work_path / f'testsrc{MEDIA_EXT}'
+    video_error = create_test_video(video_path)
+
+    if video_error is None:
+        positions = iter(random.Random(42).uniform(0, VIDEO_DURATION_S - 1) for _ in range(repeat))
+        record('extract_frame', None, lambda: extract_frame(ffmpeg.input(str(video_path)), next(positions), vcodec='mjpeg'))
+    else:
+        skip('extract_frame', None, f'unable to create the test video: {video_error}')
+
+    with TestClient(app) as client:
+        for medias in sizes:
+            root_path = work_path / f'PVR-{medias}'
+            media_paths = create_pvr_folder(root_path, medias, video_path if video_error is None else None, random.Random(medias))
+
+            record('list_medias', medias, lambda: list_medias(root_path, config))
+            record('extract_titles', medias, lambda: extract_titles(media_paths, config))
+            record('session_create', medias, lambda: SessionRepository(config).create(root_path))
+
+            session_id = client.post('/sessions/', json={'root_path': str(root_path)}).raise_for_status().json()['id']
+            record('http_session_get', medias, lambda: client.get(f'/sessions/{session_id}', params={'refresh': False}).raise_for_status())
+            record('http_session_refresh', medias, lambda: client.post(f'/sessions/{session_id}/refresh').raise_for_status())
+
+            segments_url = f'/sessions/{session_id}/medias/{media_paths[0].stem}/segments'
+            segment_starts = iter(range(0, 10 * 10 * repeat, 10))
+
+            def segment_edit_round_trip():
+                start = next(segment_starts)
+                client.post(f'{segments_url}/', json={'position': start}).raise_for_status()
+                client.patch(f'{segments_url}/{start}s-{start + 1}s', json={'new_position': start + .5, 'edge': 'end'}).raise_for_status()
+
+            record('http_segment_edit_round_trip', medias, segment_edit_round_trip, repeat=10 * repeat)
+
+            client.delete(f'/sessions/{session_id}').raise_for_status()
+
+    return results
+
+
+def compare(results: list[dict[str, Any]], baseline_results: list[dict[str, Any]], threshold: float) -> bool:
+    """Print median ratios to the baseline, returning whether none exceeds threshold"""
+    baseline_medians = {(result['name'], result['medias']): result['median_s'] for result in baseline_results if 'median_s' in result}
+    passed = True
+
+    for result in results:
+        if 'median_s' not in result or (baseline_median_s := baseline_medians.get((result['name'], result['medias']))) is None:
+            continue
+
+        ratio = result['median_s'] / baseline_median_s
+        regressed = ratio > threshold
+        passed &= not regressed
+        print(f"{result['name']:<28} {result['medias'] or '':>6} {baseline_median_s * 1000:>12.3f} ms -> {result['median_s'] * 1000:>12.3f} ms  x{ratio:.2f}{'  REGRESSION' if regressed else ''}")
+
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='numbers of medias of the synthetic folders')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each measure (x10 for segment edit round trips)')
+    parser.add_argument('--output', type=Path, help='results file, `benchmarks/results/{commit}.json` by default')
+    parser.add_argument('--compare', type=Path, help='results file of a baseline run')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio of a median to the baseline reported as a regression')
+    args = parser.parse_args()
+
+    revision = git_revision()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = run_suite(args.sizes, args.repeat, Path(temp_dir))
+
+    output_path = args.output or RESULTS_PATH / f"{revision['commit'] or 'unknown'}{'-dirty' if revision['dirty'] else ''}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'revision': revision,
+        'python': sys.version,
+        'platform': platform.platform(),
+        'sizes': args.sizes,
+        'results': results
+    }, indent=2), encoding='utf-8')
+    print(f'Results written to {output_path}')
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        print(f"Compared to {baseline['revision']['commit']}")
+
+        if not compare(results, baseline['results'], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
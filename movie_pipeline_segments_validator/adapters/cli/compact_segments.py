@@ -0,0 +1,27 @@
+import argparse
+from pathlib import Path
+
+from ...adapters.http.dependencies import get_config_path, get_settings
+from ...services.import_segments_from_file import compact_segments_journal
+from ...services.media_selector_service import list_medias
+
+
+def run_compaction():
+    parser = argparse.ArgumentParser(
+        description='Cap the reviewed segments history of the medias of a folder (or of a single media), '
+                    'moving the history of `.segments.json` files to their `.segments.jsonl` journal. '
+                    'Do not run it while medias of the folder are being reviewed.'
+    )
+    parser.add_argument('path', type=Path, help='folder of medias or media file')
+    parser.add_argument('--max-results', type=int, help='results kept per media, `SegmentsJournal__max_compacted_results` setting by default')
+    args = parser.parse_args()
+
+    config = get_settings(get_config_path())
+    max_results = args.max_results if args.max_results is not None else config.SegmentsJournal.max_compacted_results
+
+    if max_results < 0:
+        parser.error('--max-results must be positive')
+
+    for media_path in list_medias(args.path, config):
+        if (dropped_results := compact_segments_journal(media_path.path, max_results)) > 0:
+            print(f'{media_path.path.name}: {dropped_results} results dropped')
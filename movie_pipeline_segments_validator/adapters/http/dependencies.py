@@ -1,12 +1,25 @@
 import os
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Optional
 
 from fastapi import Depends, HTTPException, status
 
-from ...adapters.repository.resources import Media, Session
+from ...adapters.repository.session_jobs import SessionCreationJobRunner
 from ...adapters.repository.session_repository import SessionRepository, build_media
-from ...settings import Settings
+from ...adapters.repository.session_watcher import SessionWatcher
+from ...lib.video_player.decoder_video_player import DecoderVideoPlayerPool
+from ...lib.video_player.frame_cache import FrameCache
+from ...lib.video_player.keyframe_index import KeyframeIndexStore
+from ...services.frame_prefetcher import FramePrefetcher
+from ...settings import FrameCacheSettings, FrameExtractionSettings, FramePrefetchSettings, Settings, SettingsLoader, WatcherSettings
+
+settings_loaders: dict[Path, SettingsLoader] = {}
+frame_caches: dict[FrameCacheSettings, FrameCache] = {}
+decoder_pools: dict[FrameExtractionSettings, DecoderVideoPlayerPool] = {}
+keyframe_index_stores: dict[tuple[Path, float], KeyframeIndexStore] = {}
+frame_prefetchers: dict[tuple[FramePrefetchSettings, FrameCacheSettings, FrameExtractionSettings], FramePrefetcher] = {}
+session_watchers: dict[WatcherSettings, SessionWatcher] = {}
+session_creation_job_runners: dict[tuple[int, int], SessionCreationJobRunner] = {}
 
 
 def get_config_path():
@@ -16,19 +29,39 @@ def get_config_path():
         config_path.parent.mkdir(exist_ok=True)
         config_path.write_text('')
 
-    os.chdir(config_path.parent)
-
     return config_path
 
 
-def get_settings(config_path: Annotated[Path, Depends(get_config_path)]):    
-    return Settings(_env_file=config_path, _env_file_encoding='utf-8')  # type: ignore
+def get_settings(config_path: Annotated[Path, Depends(get_config_path)]):
+    if (settings_loader := settings_loaders.get(config_path)) is None:
+        settings_loader = settings_loaders[config_path] = SettingsLoader(config_path)
+
+    return settings_loader.get()
 
 
 def get_session_repository(config: Annotated[Settings, Depends(get_settings)]):
     return SessionRepository(config)
 
 
+def get_session_watcher(config: Annotated[Settings, Depends(get_settings)]):
+    if not config.Watcher.enabled:
+        return None
+
+    if (session_watcher := session_watchers.get(config.Watcher)) is None:
+        session_watcher = session_watchers[config.Watcher] = SessionWatcher(config)
+
+    return session_watcher
+
+
+def get_session_creation_job_runner(config: Annotated[Settings, Depends(get_settings)]):
+    runner_key = (config.SessionBuild.max_background_jobs, config.SessionBuild.max_pending_background_jobs)
+
+    if (session_creation_job_runner := session_creation_job_runners.get(runner_key)) is None:
+        session_creation_job_runner = session_creation_job_runners[runner_key] = SessionCreationJobRunner(*runner_key)
+
+    return session_creation_job_runner
+
+
 def get_session(session_repository: Annotated[SessionRepository, Depends(get_session_repository)], session_id: str):
     try:
         return session_repository.get(session_id)
@@ -36,12 +69,87 @@ def get_session(session_repository: Annotated[SessionRepository, Depends(get_ses
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
     
 
-def get_media(session: Annotated[Session, Depends(get_session)], media_stem: str):
+def get_session_summary(session_repository: Annotated[SessionRepository, Depends(get_session_repository)], session_id: str):
+    try:
+        return session_repository.get_summary(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
+
+
+def get_media(session_repository: Annotated[SessionRepository, Depends(get_session_repository)], session_id: str, media_stem: str):
+    try:
+        return build_media(session_repository.get_media(session_id, media_stem))
+    except KeyError as e:
+        if e.args[0] == session_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Media '{e.args[0]}' not found")
+
+
+def get_segment_validator_context(session_repository: Annotated[SessionRepository, Depends(get_session_repository)], session_id: str, media_stem: str):
     try:
-        return build_media(session.medias[media_stem])
+        return session_repository.get_segment_validator_context(session_id, media_stem)
     except KeyError as e:
+        if e.args[0] == session_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Media '{e.args[0]}' not found")
 
 
-def get_segment_validator_context(media: Annotated[Media, Depends(get_media)], config: Annotated[Settings, Depends(get_settings)]):
-    return media.to_segment_validator_context(config)
+def get_frame_cache(config: Annotated[Settings, Depends(get_settings)]):
+    if (frame_cache := frame_caches.get(config.FrameCache)) is None:
+        frame_cache = frame_caches[config.FrameCache] = FrameCache(
+            disk_path=config.FrameCache.disk_path,
+            memory_max_bytes=config.FrameCache.memory_max_bytes,
+            disk_max_bytes=config.FrameCache.disk_max_bytes,
+            position_step_s=config.FrameCache.position_step_s
+        )
+
+    return frame_cache
+
+
+def get_decoder_pool(config: Annotated[Settings, Depends(get_settings)]):
+    if not config.FrameExtraction.persistent_decoder:
+        return None
+
+    if (decoder_pool := decoder_pools.get(config.FrameExtraction)) is None:
+        decoder_pool = decoder_pools[config.FrameExtraction] = DecoderVideoPlayerPool(
+            idle_timeout_s=config.FrameExtraction.decoder_idle_timeout_s,
+            max_decode_ahead_s=config.FrameExtraction.max_decode_ahead_s,
+            custom_ffmpeg=str(config.ffmpeg_path)
+        )
+
+    return decoder_pool
+
+
+def get_keyframe_index_store(config: Annotated[Settings, Depends(get_settings)]):
+    if not config.FrameExtraction.keyframe_index:
+        return None
+
+    store_key = (config.FrameExtraction.keyframe_index_path, config.FrameExtraction.keyframe_index_timeout_s)
+    if (keyframe_index_store := keyframe_index_stores.get(store_key)) is None:
+        keyframe_index_store = keyframe_index_stores[store_key] = KeyframeIndexStore(*store_key)
+
+    return keyframe_index_store
+
+
+def get_frame_prefetcher(
+        config: Annotated[Settings, Depends(get_settings)],
+        frame_cache: Annotated[FrameCache, Depends(get_frame_cache)],
+        decoder_pool: Annotated[Optional[DecoderVideoPlayerPool], Depends(get_decoder_pool)],
+        keyframe_index_store: Annotated[Optional[KeyframeIndexStore], Depends(get_keyframe_index_store)]
+    ):
+    if not config.FramePrefetch.enabled:
+        return None
+
+    frame_prefetcher_key = (config.FramePrefetch, config.FrameCache, config.FrameExtraction)
+    if (frame_prefetcher := frame_prefetchers.get(frame_prefetcher_key)) is None:
+        frame_prefetcher = frame_prefetchers[frame_prefetcher_key] = FramePrefetcher(
+            frame_cache=frame_cache,
+            window_s=config.FramePrefetch.window_s,
+            step_s=config.FramePrefetch.step_s,
+            max_workers=config.FramePrefetch.max_workers,
+            max_pending=config.FramePrefetch.max_pending,
+            decoder_pool=decoder_pool,
+            keyframe_index_store=keyframe_index_store
+        )
+
+    return frame_prefetcher
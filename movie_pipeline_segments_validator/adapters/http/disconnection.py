@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+# nginx status of requests whose client disconnected before the response was sent
+CLIENT_CLOSED_REQUEST = 499
+
+T = TypeVar('T')
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Await awaitable, cancelling it (and the subprocess it awaits) when the client disconnects meanwhile
+
+    Only meant for requests without body, the request messages being consumed to watch for the disconnection.
+
+    Raises:
+        HTTPException: with status 499 when the client disconnected
+    """
+    task = asyncio.ensure_future(awaitable)
+    disconnected = False
+
+    async def cancel_task_on_disconnect():
+        nonlocal disconnected
+
+        while (await request.receive())['type'] != 'http.disconnect':
+            pass
+
+        disconnected = True
+        task.cancel()
+
+    watcher = asyncio.create_task(cancel_task_on_disconnect())
+
+    try:
+        return await task
+    except asyncio.CancelledError:
+        # the request itself may be cancelled too, eg on server shutdown
+        if disconnected and not asyncio.current_task().cancelling():  # type: ignore
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail='Client closed request')
+        raise
+    finally:
+        watcher.cancel()
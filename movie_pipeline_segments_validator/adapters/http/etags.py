@@ -0,0 +1,51 @@
+from typing import Annotated, Optional
+
+from fastapi import Header, HTTPException, Response, status
+
+from ...adapters.repository.resources import Media
+from ...adapters.repository.session_repository import SessionRepository
+from ...domain.context import SegmentValidatorContext
+
+
+def format_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_etags(header: str) -> list[str]:
+    """Opaque tags of an `If-Match` or `If-None-Match` header, weakness ignored"""
+    return [etag.strip().removeprefix('W/').strip('"') for etag in header.split(',') if etag.strip()]
+
+
+def is_not_modified(if_none_match: Optional[str], version: int) -> bool:
+    return if_none_match is not None and (if_none_match.strip() == '*' or str(version) in parse_etags(if_none_match))
+
+
+def not_modified_response(version: int) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': format_etag(version)})
+
+
+def get_expected_version(if_match: Annotated[Optional[str], Header(description='session `ETag` the change is based on')] = None) -> Optional[int]:
+    """Session version required by `If-Match`, None when any version is fine"""
+    if if_match is None or if_match.strip() == '*':
+        return None
+
+    try:
+        [version] = parse_etags(if_match)
+        return int(version)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=f'Unsupported If-Match {if_match!r}')
+
+
+def update_media(
+        session_repository: SessionRepository,
+        session_id: str,
+        segment_validator_context: SegmentValidatorContext,
+        response: Response,
+        expected_version: Optional[int] = None
+    ) -> Media:
+    """Store the media like `SessionRepository.update_media`, setting the `ETag` of the resulting session version"""
+    with session_repository.lock(session_id):
+        media = session_repository.update_media(session_id, segment_validator_context, expected_version)
+        response.headers['ETag'] = format_etag(session_repository.get_version(session_id))
+
+    return media
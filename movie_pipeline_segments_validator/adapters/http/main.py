@@ -5,15 +5,27 @@ from pathlib import Path
 from typing import Optional
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-
-from ...adapters.http.dependencies import get_config_path, get_settings
+from fastapi.responses import JSONResponse
+
+from ...adapters.http.dependencies import (
+    decoder_pools,
+    frame_prefetchers,
+    get_config_path,
+    get_settings,
+    keyframe_index_stores,
+    session_creation_job_runners,
+    session_watchers
+)
 from ...adapters.http.routers import session_media_segments
-from ...adapters.repository.session_repository import SessionRepository
+from ...adapters.http.etags import format_etag
+from ...adapters.http.timing import TimingMiddleware, metrics_registry
+from ...adapters.repository.session_repository import SessionRepository, SessionVersionConflict, media_build_pool
+from ...lib.subprocesses import SubprocessSlotsExhausted, subprocess_slots
 from ...settings import Settings
-from .routers import session_medias, sessions
+from .routers import caches, metrics, session_medias, sessions
 
 
 config: Optional[Settings] = None
@@ -25,9 +37,11 @@ def get_config():
     if config is not None:
         return config
 
-    cwd = os.getcwd()
     config = get_settings(get_config_path())
-    os.chdir(Path(__file__).parent.parent.parent if config.Server.DEBUG_MODE else cwd)
+
+    if config.Server.DEBUG_MODE:
+        os.chdir(Path(__file__).parent.parent.parent)
+
     return config
 
 
@@ -44,8 +58,31 @@ def run_server():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     config = get_config()
+    subprocess_slots.configure(config.Subprocesses.max_running, config.Subprocesses.max_waiting, config.Subprocesses.wait_timeout_s)
+    media_build_pool.configure(config.SessionBuild)
     yield
+    for session_creation_job_runner in session_creation_job_runners.values():
+        session_creation_job_runner.close()
+    session_creation_job_runners.clear()
+
+    for session_watcher in session_watchers.values():
+        session_watcher.close()
+    session_watchers.clear()
+
     SessionRepository(config).close()
+    media_build_pool.close()
+
+    for frame_prefetcher in frame_prefetchers.values():
+        frame_prefetcher.close()
+    frame_prefetchers.clear()
+
+    for decoder_pool in decoder_pools.values():
+        decoder_pool.close()
+    decoder_pools.clear()
+
+    for keyframe_index_store in keyframe_index_stores.values():
+        keyframe_index_store.close()
+    keyframe_index_stores.clear()
 
 
 app = FastAPI(
@@ -56,9 +93,34 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-app.add_middleware(CORSMiddleware, allow_origins=get_config().Server.ALLOW_ORIGINS, allow_methods=('*',))
+app.add_middleware(CORSMiddleware, allow_origins=get_config().Server.ALLOW_ORIGINS, allow_methods=('*',), allow_headers=('*',), expose_headers=('ETag', 'Server-Timing', 'Retry-After'))
 app.add_middleware(GZipMiddleware)
 
+if get_config().Metrics.enabled:
+    # added last to wrap the other middlewares, timing compression included
+    app.add_middleware(TimingMiddleware, registry=metrics_registry)
+
+
+@app.exception_handler(SessionVersionConflict)
+def handle_session_version_conflict(request: Request, e: SessionVersionConflict):
+    return JSONResponse(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        content={'detail': str(e)},
+        headers={'ETag': format_etag(e.actual_version)}
+    )
+
+
+@app.exception_handler(SubprocessSlotsExhausted)
+def handle_subprocess_slots_exhausted(request: Request, e: SubprocessSlotsExhausted):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': str(e)},
+        headers={'Retry-After': '1'}
+    )
+
+
 app.include_router(sessions.router)
 app.include_router(session_medias.router)
 app.include_router(session_media_segments.router)
+app.include_router(caches.router)
+app.include_router(metrics.router)
@@ -0,0 +1,29 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+
+from ....adapters.http.dependencies import get_frame_cache
+from ....adapters.http.timing import TimedRoute
+from ....lib.video_player.frame_cache import FrameCache
+
+router = APIRouter(
+    prefix='/caches',
+    tags=['caches'],
+    route_class=TimedRoute
+)
+
+
+class FrameCacheStatsOut(BaseModel):
+    memory_hits: Annotated[int, Field(description='frames served from the in-memory tier')]
+    disk_hits: Annotated[int, Field(description='frames served from the disk tier')]
+    misses: Annotated[int, Field(description='frames extracted with ffmpeg')]
+    memory_entries: Annotated[int, Field(description='frames held in the in-memory tier')]
+    memory_bytes: Annotated[int, Field(description='size of the in-memory tier in bytes')]
+    disk_entries: Annotated[int, Field(description='frames held in the disk tier')]
+    disk_bytes: Annotated[int, Field(description='size of the disk tier in bytes')]
+
+
+@router.get('/frames')
+def show_frame_cache_stats(frame_cache: Annotated[FrameCache, Depends(get_frame_cache)]) -> FrameCacheStatsOut:
+    return FrameCacheStatsOut.model_validate(frame_cache.stats, from_attributes=True)
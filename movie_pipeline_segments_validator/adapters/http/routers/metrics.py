@@ -0,0 +1,23 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from ....adapters.http.dependencies import get_settings
+from ....adapters.http.timing import TimedRoute, metrics_registry
+from ....settings import Settings
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['metrics'],
+    route_class=TimedRoute
+)
+
+
+@router.get('', response_class=PlainTextResponse)
+def show_metrics(config: Annotated[Settings, Depends(get_settings)]) -> PlainTextResponse:
+    """Request metrics in the Prometheus text format"""
+    if not config.Metrics.enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Metrics are disabled')
+
+    return PlainTextResponse(metrics_registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
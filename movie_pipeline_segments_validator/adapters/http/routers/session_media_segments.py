@@ -1,19 +1,24 @@
-from typing import Annotated, Literal
+from typing import Annotated, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Response, status
 from pydantic import BaseModel, Field
 from pydantic.types import NonNegativeFloat
 
-from ....adapters.http.dependencies import get_segment_validator_context, get_session, get_session_repository
-from ....adapters.repository.resources import Media, Segment, Session
+from ....adapters.http import etags
+from ....adapters.http.dependencies import get_frame_prefetcher, get_segment_validator_context, get_session_repository
+from ....adapters.http.etags import get_expected_version
+from ....adapters.http.timing import TimedRoute
+from ....adapters.repository.resources import Media, Segment
 from ....adapters.repository.session_repository import SessionRepository
 from ....domain.context import SegmentValidatorContext
 from ....domain.segment_container import Segment as SegmentContainerSegment
 from ....services import detector_service, segment_service
+from ....services.frame_prefetcher import FramePrefetcher
 
 router = APIRouter(
     prefix='/sessions/{session_id}/medias/{media_stem}/segments',
-    tags=['segments']
+    tags=['segments'],
+    route_class=TimedRoute
 )
 
 
@@ -29,12 +34,14 @@ def load_imported_segments(
         )
     ],
     session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)],
+    session_id: Annotated[str, Path(title='session id')],
     segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)]
 ) -> Media:
     try:
         detector_service.import_segments_from_selected_detector(segment_validator_context, detector_key)
-        return session_repository.update_media(session.id, segment_validator_context).medias[media_stem]
+        return etags.update_media(session_repository, session_id, segment_validator_context, response, expected_version)
 
     except KeyError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Detector key {e.args[0]} not found for {media_stem}")
@@ -49,13 +56,15 @@ def create_segment(
     body: SegmentCreateBody,
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)],
+    session_id: Annotated[str, Path(title='session id')],
     segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)]
 ) -> Media:
     segment_validator_context.media_player.set_position(body.position)
     segment_service.add_segment(segment_validator_context)
 
-    return session_repository.update_media(session.id, segment_validator_context).medias[media_stem]
+    return etags.update_media(session_repository, session_id, segment_validator_context, response, expected_version)
 
 
 class SegmentEditBody(BaseModel):
@@ -70,15 +79,21 @@ def edit_segment(
     body: SegmentEditBody,
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
-    session: Annotated[Session, Depends(get_session)],
-    segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)]
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)],
+    session_id: Annotated[str, Path(title='session id')],
+    segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)],
+    frame_prefetcher: Annotated[Optional[FramePrefetcher], Depends(get_frame_prefetcher)]
 ) -> Media:
     try:
         segment_validator_context.selected_segments = [SegmentContainerSegment(start, end)]
         segment_validator_context.media_player.set_position(body.new_position)
         segment_service.edit_segment(segment_validator_context, body.edge)
 
-        return session_repository.update_media(session.id, segment_validator_context).medias[media_stem]
+        if frame_prefetcher is not None:
+            frame_prefetcher.prefetch_around(segment_validator_context.filepath, body.new_position)
+
+        return etags.update_media(session_repository, session_id, segment_validator_context, response, expected_version)
 
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.args[0])
@@ -93,13 +108,15 @@ def delete_segments(
     body: SegmentsDeleteBody,
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)],
+    session_id: Annotated[str, Path(title='session id')],
     segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)] 
 )-> Media:
     segment_validator_context.selected_segments = [SegmentContainerSegment(segment.start, segment.end) for segment in body.segments]
     segment_service.delete_selected_segments(segment_validator_context)
 
-    return session_repository.update_media(session.id, segment_validator_context).medias[media_stem]
+    return etags.update_media(session_repository, session_id, segment_validator_context, response, expected_version)
 
 
 class SegmentsMergeBody(BaseModel):
@@ -111,10 +128,128 @@ def merge_segments(
     body: SegmentsMergeBody,
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)],
+    session_id: Annotated[str, Path(title='session id')],
     segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)] 
 ) -> Media:
     segment_validator_context.selected_segments = [SegmentContainerSegment(segment.start, segment.end) for segment in body.segments]
     segment_service.merge_selected_segments(segment_validator_context)
 
-    return session_repository.update_media(session.id, segment_validator_context).medias[media_stem]
+    return etags.update_media(session_repository, session_id, segment_validator_context, response, expected_version)
+
+
+class SegmentCreateOperation(SegmentCreateBody):
+    op: Literal['create']
+
+
+class SegmentEditOperation(SegmentEditBody):
+    op: Literal['edit']
+    start: Annotated[NonNegativeFloat, Field(description='segment start position in seconds')]
+    end: Annotated[NonNegativeFloat, Field(description='segment end position in seconds')]
+
+
+class SegmentsDeleteOperation(SegmentsDeleteBody):
+    op: Literal['delete']
+
+
+class SegmentsMergeOperation(SegmentsMergeBody):
+    op: Literal['merge']
+
+
+class SegmentsImportOperation(BaseModel):
+    op: Literal['import']
+    detector_key: Annotated[str, Field(description='See `Show Media` / `imported_segments` keys for a list of valid detector keys.')]
+
+
+SegmentOperation = Annotated[
+    SegmentCreateOperation | SegmentEditOperation | SegmentsDeleteOperation | SegmentsMergeOperation | SegmentsImportOperation,
+    Field(discriminator='op')
+]
+
+
+class SegmentOperationsBody(BaseModel):
+    operations: Annotated[list[SegmentOperation], Field(description='operations to apply in order, like their dedicated endpoint')]
+
+
+class SegmentOperationResult(BaseModel):
+    index: Annotated[int, Field(description='operation index')]
+    status: Annotated[
+        Literal['applied', 'ignored', 'failed', 'skipped'],
+        Field(description=(
+            '`ignored` when the operation left segments unchanged (eg overlapping segment), '
+            '`skipped` when a previous operation failed'
+        ))
+    ]
+    detail: Annotated[Optional[str], Field(description='failure reason (`failed`)')] = None
+
+
+class SegmentOperationsOut(BaseModel):
+    media: Annotated[Media, Field(description='media with the resulting segments')]
+    results: Annotated[list[SegmentOperationResult], Field(description='result of each operation')]
+
+
+def apply_segment_operation(segment_validator_context: SegmentValidatorContext, operation: SegmentOperation):
+    match operation:
+        case SegmentCreateOperation():
+            segment_validator_context.media_player.set_position(operation.position)
+            segment_service.add_segment(segment_validator_context)
+        case SegmentEditOperation():
+            segment_validator_context.selected_segments = [SegmentContainerSegment(operation.start, operation.end)]
+            segment_validator_context.media_player.set_position(operation.new_position)
+            segment_service.edit_segment(segment_validator_context, operation.edge)
+        case SegmentsDeleteOperation():
+            segment_validator_context.selected_segments = [SegmentContainerSegment(segment.start, segment.end) for segment in operation.segments]
+            segment_service.delete_selected_segments(segment_validator_context)
+        case SegmentsMergeOperation():
+            segment_validator_context.selected_segments = [SegmentContainerSegment(segment.start, segment.end) for segment in operation.segments]
+            segment_service.merge_selected_segments(segment_validator_context)
+        case SegmentsImportOperation():
+            detector_service.import_segments_from_selected_detector(segment_validator_context, operation.detector_key)
+
+
+@router.post(
+    '/batch',
+    description='Apply segment operations in order and save the result once, or nothing if any operation fails',
+    responses={status.HTTP_422_UNPROCESSABLE_ENTITY: {'description': 'Result of each operation, none being saved'}}
+)
+def apply_segment_operations(
+    body: SegmentOperationsBody,
+    media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)],
+    session_id: Annotated[str, Path(title='session id')],
+    segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)],
+    frame_prefetcher: Annotated[Optional[FramePrefetcher], Depends(get_frame_prefetcher)]
+) -> SegmentOperationsOut:
+    results: list[SegmentOperationResult] = []
+    failed = False
+
+    for index, operation in enumerate(body.operations):
+        if failed:
+            results.append(SegmentOperationResult(index=index, status='skipped'))
+            continue
+
+        previous_segments = segment_validator_context.segment_container.segments
+
+        try:
+            apply_segment_operation(segment_validator_context, operation)
+        except (KeyError, ValueError) as e:
+            failed = True
+            detail = f'{e.args[0]} not found' if isinstance(e, KeyError) else str(e.args[0])
+            results.append(SegmentOperationResult(index=index, status='failed', detail=detail))
+            continue
+
+        changed = segment_validator_context.segment_container.segments != previous_segments
+        results.append(SegmentOperationResult(index=index, status='applied' if changed else 'ignored'))
+
+    if failed:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=[result.model_dump() for result in results])
+
+    if frame_prefetcher is not None:
+        for operation in body.operations:
+            if isinstance(operation, SegmentEditOperation):
+                frame_prefetcher.prefetch_around(segment_validator_context.filepath, operation.new_position)
+
+    return SegmentOperationsOut(media=etags.update_media(session_repository, session_id, segment_validator_context, response, expected_version), results=results)
@@ -1,24 +1,85 @@
-from typing import Annotated, Optional
+import asyncio
+import itertools
+from typing import Annotated, Literal, Optional
 
 import ffmpeg
-from fastapi import APIRouter, Depends, HTTPException, Path, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request, Response, status
 from pydantic import BaseModel, Field, computed_field
 from pydantic.types import FilePath, NonNegativeFloat
 
-from ....adapters.http.dependencies import get_segment_validator_context, get_session_repository
-from ....adapters.repository.resources import Media, MediaMetadata, StrSegment
-from ....adapters.repository.session_repository import SessionRepository, build_media
+from ....adapters.http.dependencies import get_decoder_pool, get_frame_cache, get_frame_prefetcher, get_keyframe_index_store, get_media, get_segment_validator_context, get_session_repository
+from ....adapters.http import etags
+from ....adapters.http.disconnection import cancel_on_disconnect
+from ....adapters.http.etags import format_etag, get_expected_version, is_not_modified, not_modified_response
+from ....adapters.http.timing import TimedRoute
+from ....adapters.repository.resources import Media, MediaMetadata, MediaPage, MediaProbe, StrSegment
+from ....adapters.repository.session_repository import MediaSortKey, SessionRepository, SessionVersionConflict, build_media
 from ....domain import FILENAME_REGEX
 from ....domain.context import SegmentValidatorContext
-from ....lib.video_player.simple_video_only_player import extract_frame
-from ....services import segment_service
+from ....domain.media_path import MediaPathState
+from ....domain.movie_segments import MovieSegments
+from ....lib.video_player.decoder_video_player import DecoderVideoPlayerPool
+from ....lib.video_player.frame_cache import FrameCache
+from ....lib.video_player.keyframe_index import KeyframeIndexStore
+from ....services import filmstrip_service, frame_service, segment_service
+from ....services.filmstrip_service import FilmstripLayout
+from ....services.frame_prefetcher import FramePrefetcher
 
 router = APIRouter(
     prefix='/sessions/{session_id}/medias',
-    tags=['medias']
+    tags=['medias'],
+    route_class=TimedRoute
 )
 
 
+@router.get(
+    '',
+    description='Page through the medias of a session, without loading the whole session',
+    responses={status.HTTP_304_NOT_MODIFIED: {'description': 'Session unchanged since `If-None-Match` version'}}
+)
+def list_medias(
+    session_id: Annotated[str, Path(title='session id')],
+    response: Response,
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    state: Annotated[Optional[list[MediaPathState]], Query(description='only medias in one of these states')] = None,
+    channel: Annotated[Optional[str], Query(description='only medias recorded from this channel', examples=['Channel 1'])] = None,
+    title: Annotated[Optional[str], Query(description='only medias whose title contains this text, case insensitive')] = None,
+    has_segments: Annotated[Optional[bool], Query(description='only medias with (or without) segments')] = None,
+    sort: Annotated[MediaSortKey, Query(description='sort key, stem breaking ties')] = 'position',
+    order: Annotated[Literal['asc', 'desc'], Query(description='sort order')] = 'asc',
+    cursor: Annotated[Optional[str], Query(description='`next_cursor` of the previous page')] = None,
+    limit: Annotated[int, Query(ge=1, le=500, description='maximum number of medias of the page')] = 100,
+    fields: Annotated[
+        Optional[str],
+        Query(description='comma separated `Media` fields to include besides `stem`, all by default', examples=['title,state'])
+    ] = None,
+    if_none_match: Annotated[Optional[str], Header(description='`ETag` of the session known by the client')] = None
+) -> MediaPage:
+    try:
+        # version read before the page, so that the ETag never claims a newer page than the returned one
+        version = session_repository.get_version(session_id)
+        if is_not_modified(if_none_match, version):
+            return not_modified_response(version)  # type: ignore
+
+        response.headers['ETag'] = format_etag(version)
+        return session_repository.find_medias(
+            session_id,
+            states=state,
+            channel=channel,
+            title=title,
+            has_segments=has_segments,
+            sort=sort,
+            descending=order == 'desc',
+            cursor=cursor,
+            limit=limit,
+            fields=[field.strip() for field in fields.split(',') if field.strip()] if fields is not None else None
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
 class MediaOut(BaseModel):
     media: Annotated[Media, Field(description='media')]
     imported_segments: Annotated[
@@ -31,12 +92,9 @@ class MediaOut(BaseModel):
             }]
         )
     ]
-    
-    @computed_field(description='media duration in seconds')
-    @property
-    def duration(self) -> float:
-        return self.media.duration
-    
+    duration: Annotated[float, Field(description='media duration in seconds')]
+    probe: Annotated[MediaProbe, Field(description='media streams layout, resolution and frame rate')]
+
     @computed_field(description='media recording metadata')
     @property
     def recording_metadata(self) -> Optional[MediaMetadata]:
@@ -44,24 +102,39 @@ class MediaOut(BaseModel):
 
 
 @router.get('/{media_stem}')
-def show_media(
+async def show_media(
     session_id: Annotated[str, Path(title='session id')],
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)],
-    session_repository: Annotated[SessionRepository, Depends(get_session_repository)]
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    frame_prefetcher: Annotated[Optional[FramePrefetcher], Depends(get_frame_prefetcher)],
+    keyframe_index_store: Annotated[Optional[KeyframeIndexStore], Depends(get_keyframe_index_store)]
 ) -> MediaOut:
     # refresh media state by updating it from segment_validator_context
-    updated_media = session_repository.update_media(session_id, segment_validator_context).medias[media_stem]
+    updated_media = await asyncio.to_thread(session_repository.update_media, session_id, segment_validator_context)
 
     # prefill media.segments from imported_segments if empty
     if len(updated_media.segments) == 0:
         config = segment_validator_context.config
-        updated_media = build_media(updated_media, config, force_load_segments=True, force_load_edl_file_content=True)
-        session_repository.update_media(session_id, updated_media.to_segment_validator_context(config)).medias[media_stem]
+        updated_media = await asyncio.to_thread(build_media, updated_media, config, force_load_segments=True, force_load_edl_file_content=True)
+        await asyncio.to_thread(session_repository.update_media, session_id, updated_media.to_segment_validator_context(config))
+
+    # warm frame cache around segment edges, the next frames a reviewer looks at
+    if frame_prefetcher is not None:
+        imported_segments = (MovieSegments(raw_segments).segments for raw_segments in segment_validator_context.imported_segments.values())
+        await asyncio.to_thread(
+            frame_prefetcher.prefetch_around_edges,
+            updated_media.filepath,
+            itertools.chain([(segment.start, segment.end) for segment in updated_media.segments], *imported_segments)
+        )
+
+    media_probe = await session_repository.get_media_probe_async(updated_media.filepath)
 
     return MediaOut(
         media=updated_media,
-        imported_segments=segment_validator_context.imported_segments
+        imported_segments=segment_validator_context.imported_segments,
+        duration=await frame_service.get_media_duration_async(updated_media.filepath, media_probe.duration, keyframe_index_store),
+        probe=media_probe
     )
 
 
@@ -93,28 +166,124 @@ def validate_media_segments(
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     body: ValidateSegmentsBody,
     segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)],
-    session_repository: Annotated[SessionRepository, Depends(get_session_repository)]
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    response: Response,
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)]
 ) -> ValidateSegmentsOut:
     segment_validator_context.title = body.title
     segment_validator_context.skip_backup = body.skip_backup
 
+    # checked before writing the EDL file, which cannot be rolled back
+    if expected_version is not None and (version := session_repository.get_version(session_id)) != expected_version:
+        raise SessionVersionConflict(session_id, expected_version, version)
+
     if (eld_path := segment_service.validate_segments(segment_validator_context)) is not None:
-        session_repository.update_media(session_id, segment_validator_context) # refresh media state
+        etags.update_media(session_repository, session_id, segment_validator_context, response) # refresh media state
         return ValidateSegmentsOut(edl_path=eld_path)
 
     raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail='EDL content is invalid')
 
 
 @router.get('/{media_stem}/frames/{position_s}s')
-def show_video_frame(
+async def show_video_frame(
+    request: Request,
     media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
     position_s: Annotated[NonNegativeFloat, Path(title='position in seconds')],
-    segment_validator_context: Annotated[SegmentValidatorContext, Depends(get_segment_validator_context)]
+    media: Annotated[Media, Depends(get_media)],
+    frame_cache: Annotated[FrameCache, Depends(get_frame_cache)],
+    decoder_pool: Annotated[Optional[DecoderVideoPlayerPool], Depends(get_decoder_pool)],
+    keyframe_index_store: Annotated[Optional[KeyframeIndexStore], Depends(get_keyframe_index_store)]
 ):
     try:
-        stream = ffmpeg.input(str(segment_validator_context.filepath))
-        frame = extract_frame(stream, position_s, vcodec='mjpeg')
-        return Response(content=frame, media_type='image/jpeg')
+        frame = await cancel_on_disconnect(
+            request,
+            frame_service.get_video_frame_async(media.filepath, position_s, frame_cache, decoder_pool, keyframe_index_store)
+        )
+        return Response(content=frame.content, media_type=frame.media_type)
+
+    except ffmpeg.Error as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=e.stderr)
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.args[0])
+
+
+class FilmstripQuery(BaseModel):
+    tiles: Annotated[int, Field(ge=1, le=400, description='number of thumbnails evenly spread over the media')] = 100
+    columns: Annotated[int, Field(ge=1, le=50, description='number of thumbnails per sprite sheet row')] = 10
+    tile_width: Annotated[int, Field(ge=16, le=640, description='thumbnail width in pixels')] = 160
+    tile_height: Annotated[int, Field(ge=16, le=360, description='thumbnail height in pixels')] = 90
+
+    def to_layout(self):
+        return FilmstripLayout(tiles=self.tiles, columns=self.columns, tile_width=self.tile_width, tile_height=self.tile_height)
+
+
+class FilmstripTileOut(BaseModel):
+    index: Annotated[int, Field(description='tile index, row-major')]
+    position_s: Annotated[float, Field(description='thumbnail position in seconds')]
+    x: Annotated[int, Field(description='tile left offset in the sprite sheet in pixels')]
+    y: Annotated[int, Field(description='tile top offset in the sprite sheet in pixels')]
+
+
+class FilmstripOut(BaseModel):
+    duration: Annotated[float, Field(description='media duration in seconds')]
+    columns: int
+    rows: int
+    tile_width: int
+    tile_height: int
+    tiles: Annotated[list[FilmstripTileOut], Field(description='tiles of the sprite sheet returned by `Show Filmstrip Image`')]
+
+
+@router.get('/{media_stem}/filmstrip', description='Index mapping the tiles of the filmstrip sprite sheet to their timestamps')
+async def show_filmstrip(
+    media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
+    query: Annotated[FilmstripQuery, Query()],
+    media: Annotated[Media, Depends(get_media)],
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    keyframe_index_store: Annotated[Optional[KeyframeIndexStore], Depends(get_keyframe_index_store)]
+) -> FilmstripOut:
+    media_probe = await session_repository.get_media_probe_async(media.filepath)
+    layout, duration = query.to_layout(), await frame_service.get_media_duration_async(media.filepath, media_probe.duration, keyframe_index_store)
+
+    try:
+        tiles = filmstrip_service.build_filmstrip_index(duration, layout)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.args[0])
+
+    return FilmstripOut(
+        duration=duration,
+        columns=layout.columns,
+        rows=layout.rows,
+        tile_width=layout.tile_width,
+        tile_height=layout.tile_height,
+        tiles=[FilmstripTileOut.model_validate(tile, from_attributes=True) for tile in tiles]
+    )
+
+
+@router.get(
+    '/{media_stem}/filmstrip.jpg',
+    description='Sprite sheet of thumbnails evenly spread over the media, generated in a single ffmpeg pass and cached per media',
+    response_class=Response
+)
+async def show_filmstrip_image(
+    request: Request,
+    media_stem: Annotated[str, Path(title='media stem (filename without extension)')],
+    query: Annotated[FilmstripQuery, Query()],
+    media: Annotated[Media, Depends(get_media)],
+    frame_cache: Annotated[FrameCache, Depends(get_frame_cache)],
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    keyframe_index_store: Annotated[Optional[KeyframeIndexStore], Depends(get_keyframe_index_store)]
+):
+    async def get_filmstrip():
+        media_probe = await session_repository.get_media_probe_async(media.filepath)
+        duration = await frame_service.get_media_duration_async(media.filepath, media_probe.duration, keyframe_index_store)
+        return await filmstrip_service.get_filmstrip_async(media.filepath, duration, query.to_layout(), frame_cache)
+
+    try:
+        filmstrip = await cancel_on_disconnect(request, get_filmstrip())
+        return Response(content=filmstrip, media_type='image/jpeg')
 
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.args[0])
     except ffmpeg.Error as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=e.stderr)
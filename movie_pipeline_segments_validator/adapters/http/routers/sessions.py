@@ -1,18 +1,33 @@
-from typing import Annotated
+import asyncio
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, ValidationError
 from pydantic.types import DirectoryPath
 
-from ....adapters.http.dependencies import get_session, get_session_repository, get_settings
-from ....adapters.repository.resources import Session
-from ....adapters.repository.session_repository import SessionRepository, build_media
-from ....services.media_selector_service import list_medias
+from ....adapters.http.dependencies import (
+    get_session_creation_job_runner,
+    get_session_repository,
+    get_session_summary,
+    get_session_watcher,
+    get_settings
+)
+from ....adapters.http.etags import format_etag, get_expected_version, is_not_modified, not_modified_response
+from ....adapters.http.timing import TimedRoute
+from ....adapters.repository.resources import Session, SessionCreationJob, SessionRefresh, SessionSummary
+from ....adapters.repository.session_events import SessionEvent, session_event_bus
+from ....adapters.repository.session_jobs import SessionCreationJobRunner, SessionCreationJobsExhausted
+from ....adapters.repository.session_repository import SessionRepository
+from ....adapters.repository.session_watcher import SessionWatcher
 from ....settings import Settings
 
+SESSION_EVENTS_KEEPALIVE_S = 15.
+
 router = APIRouter(
     prefix='/sessions',
-    tags=['sessions']
+    tags=['sessions'],
+    route_class=TimedRoute
 )
 
 
@@ -20,42 +35,157 @@ class SessionCreateBody(BaseModel):
     root_path: Annotated[DirectoryPath, Field(description='root path for medias', examples=[r'V:\PVR'])]
 
 
-@router.post('/', status_code=status.HTTP_201_CREATED)
+@router.post(
+    '/',
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_202_ACCEPTED: {'model': SessionCreationJob, 'description': 'Session creation job (`background`)'},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {'description': 'Too many session creation jobs waiting for a worker (`background`)'}
+    }
+)
 def create_session(
     body: SessionCreateBody,
-    session_repository: Annotated[SessionRepository, Depends(get_session_repository)]
-) -> Session:
+    response: Response,
+    config: Annotated[Settings, Depends(get_settings)],
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    session_creation_job_runner: Annotated[SessionCreationJobRunner, Depends(get_session_creation_job_runner)],
+    session_watcher: Annotated[Optional[SessionWatcher], Depends(get_session_watcher)],
+    background: Annotated[bool, Query(description='Build medias in background, returning the creation job to follow with `/sessions/jobs/{job_id}`')] = False
+) -> Session | SessionCreationJob:
+    created: Session | SessionCreationJob
+
     try:
-        return session_repository.create(body.root_path)
+        if background:
+            created = session_creation_job_runner.submit(body.root_path, config)
+            response.status_code = status.HTTP_202_ACCEPTED
+        else:
+            created = session_repository.create(body.root_path)
     except ValidationError as e:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.errors())
-    
+    except SessionCreationJobsExhausted as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={'Retry-After': '5'})
+
+    if session_watcher is not None:
+        session_watcher.watch(created.session_id if isinstance(created, SessionCreationJob) else created.id, body.root_path)
+
+    return created
+
 
-@router.get('/{session_id}')
+@router.get('/jobs/{job_id}')
+def show_session_creation_job(
+    job_id: Annotated[str, Path(title='job id')],
+    session_creation_job_runner: Annotated[SessionCreationJobRunner, Depends(get_session_creation_job_runner)]
+) -> SessionCreationJob:
+    try:
+        return session_creation_job_runner.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Job {e.args[0]} not found')
+
+
+@router.get('/{session_id}', responses={status.HTTP_304_NOT_MODIFIED: {'description': 'Session unchanged since `If-None-Match` version'}})
 def show_session(
     session_id: Annotated[str, Path(title='session id')],
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    session_summary: Annotated[SessionSummary, Depends(get_session_summary)],
     session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
-    config: Annotated[Settings, Depends(get_settings)],
-    refresh: Annotated[bool, Query(description='Refresh session medias state')]
+    session_watcher: Annotated[Optional[SessionWatcher], Depends(get_session_watcher)],
+    refresh: Annotated[bool, Query(description='Refresh session medias state')],
+    if_none_match: Annotated[Optional[str], Header(description='`ETag` of the session known by the client')] = None
 ) -> Session:
-    if not refresh:
-        return session
+    # medias state of a watched session are kept up to date in background
+    if session_watcher is not None:
+        session_watcher.watch(session_summary.id, session_summary.root_path)
 
-    medias = {
-        media.path.stem: build_media(media, config)
-        for media in list_medias(session.root_path, config)
-    }
-    return session_repository.set(session.model_copy(update={"medias": medias}))
+    try:
+        if refresh:
+            session = session_repository.refresh(session_id).session
+        elif is_not_modified(if_none_match, session_summary.version):
+            return not_modified_response(session_summary.version)  # type: ignore
+        else:
+            session = session_repository.get(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
+
+    response.headers['ETag'] = format_etag(session.version)
+    return session
+
+
+@router.get('/{session_id}/summary', description='Session without its medias, only counted by state')
+def show_session_summary(
+    session_id: Annotated[str, Path(title='session id')],
+    response: Response,
+    session_summary: Annotated[SessionSummary, Depends(get_session_summary)],
+    if_none_match: Annotated[Optional[str], Header(description='`ETag` of the session known by the client')] = None
+) -> SessionSummary:
+    if is_not_modified(if_none_match, session_summary.version):
+        return not_modified_response(session_summary.version)  # type: ignore
+
+    response.headers['ETag'] = format_etag(session_summary.version)
+    return session_summary
+
+
+@router.post('/{session_id}/refresh', description='Rebuild only the medias added, removed or changed in root_path since the last refresh')
+def refresh_session(
+    session_id: Annotated[str, Path(title='session id')],
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)]
+) -> SessionRefresh:
+    try:
+        return session_repository.refresh(session_id)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
 
 
 @router.delete('/{session_id}')
 def destroy_session(
     session_id: Annotated[str, Path(title='session id')],
-    session_repository: Annotated[SessionRepository, Depends(get_session_repository)]
+    session_repository: Annotated[SessionRepository, Depends(get_session_repository)],
+    session_watcher: Annotated[Optional[SessionWatcher], Depends(get_session_watcher)],
+    expected_version: Annotated[Optional[int], Depends(get_expected_version)]
 ):
     try:
-        session_repository.delete(session_id)
+        session_repository.delete(session_id, expected_version)
+
+        if session_watcher is not None:
+            session_watcher.unwatch(session_id)
+
         return {}
     except KeyError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Session {e.args[0]} not found')
+
+
+async def stream_session_events(session_id: str):
+    with session_event_bus.subscribe(session_id) as events:
+        yield 'retry: 3000\n\n'
+
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), timeout=SESSION_EVENTS_KEEPALIVE_S)
+            except TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+
+            yield f'event: {event.type}\ndata: {event.model_dump_json(exclude_none=True)}\n\n'
+
+            if event.type == 'session_deleted':
+                return
+
+
+@router.get(
+    '/{session_id}/events',
+    description='Server-Sent Events stream of the session changes, with one `SessionEvent` JSON payload per event',
+    response_class=StreamingResponse,
+    responses={status.HTTP_200_OK: {'content': {'text/event-stream': {'schema': SessionEvent.model_json_schema()}}}}
+)
+def show_session_events(
+    session_id: Annotated[str, Path(title='session id')],
+    session_summary: Annotated[SessionSummary, Depends(get_session_summary)],
+    session_watcher: Annotated[Optional[SessionWatcher], Depends(get_session_watcher)]
+):
+    if session_watcher is not None:
+        session_watcher.watch(session_summary.id, session_summary.root_path)
+
+    return StreamingResponse(
+        stream_session_events(session_id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,181 @@
+import functools
+import inspect
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ...lib.timing import SERIALIZATION_PHASE, RequestTimings, mark_endpoint_returned, start_request_timings, stop_request_timings
+
+LATENCY_BUCKETS_S = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10.)
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Endpoint marking when it returns a response to serialize, keeping its signature for FastAPI and whether it is a coroutine function"""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed_async_endpoint(*args, **kwargs):
+            response = await endpoint(*args, **kwargs)
+            mark_endpoint_returned()
+            return response
+
+        return timed_async_endpoint
+
+    @functools.wraps(endpoint)
+    def timed_sync_endpoint(*args, **kwargs):
+        response = endpoint(*args, **kwargs)
+        mark_endpoint_returned()
+        return response
+
+    return timed_sync_endpoint
+
+
+class TimedRoute(APIRoute):
+    """Route whose endpoint return is marked, so that the time spent serializing its response can be told apart"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def format_labels(**labels: str) -> str:
+    return ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels.items())
+
+
+class MetricsRegistry:
+    """Request counts, latency and phase duration histograms by route, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS_S) -> None:
+        self._buckets = buckets
+
+        self._lock = Lock()
+        self._requests: dict[tuple[str, str, int], int] = {}
+        self._latencies: dict[tuple[str, str], Histogram] = {}
+        self._phase_durations: dict[tuple[str, str, str], Histogram] = {}
+
+    def observe(self, method: str, route: str, status_code: int, duration_s: float, request_timings: RequestTimings):
+        with self._lock:
+            self._requests[(method, route, status_code)] = self._requests.get((method, route, status_code), 0) + 1
+            self._latencies.setdefault((method, route), Histogram(self._buckets)).observe(duration_s)
+
+            for phase, (phase_duration_s, _) in request_timings.phases.items():
+                self._phase_durations.setdefault((method, route, phase), Histogram(self._buckets)).observe(phase_duration_s)
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+            self._latencies.clear()
+            self._phase_durations.clear()
+
+    def render(self) -> str:
+        lines = [
+            '# HELP http_requests_total Requests by route and status code.',
+            '# TYPE http_requests_total counter'
+        ]
+
+        with self._lock:
+            lines.extend(
+                f'http_requests_total{{{format_labels(method=method, route=route, status=str(status_code))}}} {count}'
+                for (method, route, status_code), count in sorted(self._requests.items())
+            )
+
+            lines.extend(self._render_histograms(
+                'http_request_duration_seconds',
+                'Request latency by route, until the response is sent.',
+                {format_labels(method=method, route=route): histogram for (method, route), histogram in sorted(self._latencies.items())}
+            ))
+
+            lines.extend(self._render_histograms(
+                'http_request_phase_duration_seconds',
+                'Time spent by requests in a phase (db, subprocess, subprocess_wait, sidecar_io, serialization) by route.',
+                {format_labels(method=method, route=route, phase=phase): histogram for (method, route, phase), histogram in sorted(self._phase_durations.items())}
+            ))
+
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self, name: str, help: str, histograms: dict[str, Histogram]) -> list[str]:
+        lines = [f'# HELP {name} {help}', f'# TYPE {name} histogram']
+
+        for labels, histogram in histograms.items():
+            cumulative_count = 0
+            for bucket, count in zip((*map(repr, histogram.buckets), '+Inf'), histogram.counts):
+                cumulative_count += count
+                lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative_count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative_count}')
+
+        return lines
+
+
+def format_server_timing(request_timings: RequestTimings, total_s: float) -> str:
+    """`Server-Timing` header value of the request phases and of the whole request, durations in milliseconds"""
+    return ', '.join((
+        *(f'{phase};dur={duration_s * 1000:.3f}' for phase, (duration_s, _) in request_timings.phases.items()),
+        f'total;dur={total_s * 1000:.3f}'
+    ))
+
+
+class TimingMiddleware:
+    """Time HTTP requests, adding their phase timings to their response as a `Server-Timing` header
+    and recording them in a metrics registry by route
+
+    Routes are only told apart when their request is routed, so the middleware should wrap the application.
+    """
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started_at = perf_counter()
+        request_timings, token = start_request_timings()
+        status_code = 500
+
+        async def send_with_server_timing(message: Message):
+            nonlocal status_code
+
+            if message['type'] == 'http.response.start':
+                response_started_at = perf_counter()
+                status_code = message['status']
+
+                if request_timings.endpoint_returned_at is not None:
+                    request_timings.add(SERIALIZATION_PHASE, response_started_at - request_timings.endpoint_returned_at)
+
+                headers = MutableHeaders(raw=list(message.get('headers', ())))
+                headers.append('Server-Timing', format_server_timing(request_timings, response_started_at - started_at))
+                message['headers'] = headers.raw
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            stop_request_timings(token)
+            route = getattr(scope.get('route'), 'path', UNMATCHED_ROUTE)
+            self.registry.observe(scope['method'], route, status_code, perf_counter() - started_at, request_timings)
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,124 @@
+import copy
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from ...domain.context import SegmentValidatorContext
+from ...domain.media_path import MediaPath
+from ...services.import_segments_from_file import segments_file_path, segments_journal_path
+from ...settings import Settings
+
+SidecarStamp = tuple[int, int, int]
+
+
+def sidecar_stamp(filepath: Path) -> SidecarStamp:
+    """mtimes of the media folder, changing when a sidecar file is added or removed, and of the segments files"""
+    def mtime_ns(path: Path):
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return -1
+
+    return (mtime_ns(filepath.parent), mtime_ns(segments_file_path(filepath)), mtime_ns(segments_journal_path(filepath)))
+
+
+def copy_segment_validator_context(context: SegmentValidatorContext) -> SegmentValidatorContext:
+    """Copy of a context whose segments and position can be changed independently, without importing its segments files again"""
+    context_copy = copy.copy(context)
+    context_copy.media_player = copy.copy(context.media_player)
+    context_copy.segment_container = context.segment_container.copy()
+    context_copy.selected_segments = list(context.selected_segments)
+    return context_copy
+
+
+@dataclass
+class CachedSegmentValidatorContext:
+    version: int
+    config: Settings
+    sidecar_stamp: SidecarStamp
+    context: SegmentValidatorContext
+    media_path: Optional[MediaPath] = None
+
+
+class SegmentValidatorContextCache:
+    """Least recently used segment validator contexts by session id and media stem
+
+    A context is valid as long as the session stays at the version it was cached at, with the same settings,
+    and the sidecar files of its media are unchanged. Cached contexts are never handed out, only copies of them.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+
+        self._lock = Lock()
+        self._entries: OrderedDict[tuple[str, str], CachedSegmentValidatorContext] = OrderedDict()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, session_id: str, media_stem: str, version: int, config: Settings) -> Optional[SegmentValidatorContext]:
+        entry = self._get_valid_entry(session_id, media_stem)
+
+        if entry is None or entry.version != version or entry.config is not config:
+            return None
+
+        return copy_segment_validator_context(entry.context)
+
+    def get_media_path(self, session_id: str, context: SegmentValidatorContext) -> Optional[MediaPath]:
+        """Media path cached with the context of the same media, as long as the sidecar files of the media are unchanged"""
+        entry = self._get_valid_entry(session_id, context.filepath.stem)
+        return entry.media_path if entry is not None and entry.context.filepath == context.filepath else None
+
+    def put(self, session_id: str, media_stem: str, entry: CachedSegmentValidatorContext):
+        if self._max_entries == 0:
+            return
+
+        with self._lock:
+            self._entries[(session_id, media_stem)] = entry
+            self._entries.move_to_end((session_id, media_stem))
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def write_through(self, session_id: str, context: SegmentValidatorContext, version: int, media_path: MediaPath):
+        """Replace the cached context of a media by the stored one, keeping the sidecar stamp of the cached context
+        because the imported segments of both come from the same sidecar files"""
+        key = (session_id, context.filepath.stem)
+
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries[key] = CachedSegmentValidatorContext(
+                    version=version,
+                    config=entry.config,
+                    sidecar_stamp=entry.sidecar_stamp,
+                    context=copy_segment_validator_context(context),
+                    media_path=media_path
+                )
+
+    def discard(self, session_id: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get_valid_entry(self, session_id: str, media_stem: str) -> Optional[CachedSegmentValidatorContext]:
+        key = (session_id, media_stem)
+
+        with self._lock:
+            if (entry := self._entries.get(key)) is None:
+                return None
+            self._entries.move_to_end(key)
+
+        if entry.sidecar_stamp != sidecar_stamp(entry.context.filepath):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            return None
+
+        return entry
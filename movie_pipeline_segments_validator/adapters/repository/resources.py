@@ -1,7 +1,8 @@
 from pathlib import Path
 import textwrap
 from dataclasses import asdict
-from typing import Annotated, Optional
+from fractions import Fraction
+from typing import Annotated, Any, Literal, Optional
 
 from pydantic import AwareDatetime, BaseModel, Field, TypeAdapter, computed_field
 from pydantic.types import NonNegativeFloat
@@ -12,7 +13,6 @@ from ...domain.media_path import MediaPath, MediaPathState
 from ...domain.segment_container import Segment as SegmentContainerSegment
 from ...domain.segment_container import SegmentContainer
 from ...lib.title_extractor.title_extractor import load_metadata
-from ...lib.util import total_movie_duration
 from ...lib.video_player.simple_video_only_player import NoOpVideoPositionForwarder
 from ...settings import Settings
 
@@ -42,6 +42,46 @@ class MediaMetadata(BaseModel):
     recording_id: Annotated[str, Field(description='Unique ID of recording')]
 
 
+class MediaStream(BaseModel):
+    index: Annotated[int, Field(description='stream index')]
+    codec_type: Annotated[str, Field(description='stream type', examples=['video', 'audio', 'subtitle'])]
+    codec_name: Annotated[Optional[str], Field(description='stream codec', examples=['h264', 'aac'])] = None
+    language: Annotated[Optional[str], Field(description='stream language tag', examples=['fra'])] = None
+
+
+class MediaProbe(BaseModel):
+    duration: Annotated[float, Field(description='media duration in seconds, -1 if unknown')]
+    width: Annotated[Optional[int], Field(description='first video stream width in pixels')] = None
+    height: Annotated[Optional[int], Field(description='first video stream height in pixels')] = None
+    frame_rate: Annotated[Optional[float], Field(description='first video stream average frame rate')] = None
+    streams: Annotated[list[MediaStream], Field(default_factory=list, description='media streams layout')]
+
+    @classmethod
+    def from_ffprobe(cls, probe: dict[str, Any]):
+        """Build from `ffprobe -show_format -show_streams -of json` output,
+        the duration being the one of the first video stream, falling back to the container one"""
+        streams = probe.get('streams', [])
+        video_stream = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+        duration = next((duration for duration in (video_stream.get('duration'), probe.get('format', {}).get('duration')) if duration not in (None, 'N/A')), -1)
+        frame_rate = Fraction(video_stream.get('avg_frame_rate', '0/1').replace('0/0', '0/1'))
+
+        return cls(
+            duration=float(duration),
+            width=video_stream.get('width'),
+            height=video_stream.get('height'),
+            frame_rate=round(float(frame_rate), 3) if frame_rate else None,
+            streams=[
+                MediaStream(
+                    index=stream['index'],
+                    codec_type=stream.get('codec_type', 'unknown'),
+                    codec_name=stream.get('codec_name'),
+                    language=stream.get('tags', {}).get('language')
+                )
+                for stream in streams
+            ]
+        )
+
+
 class Media(BaseModel):
     filepath: Annotated[
         Path,
@@ -72,10 +112,6 @@ class Media(BaseModel):
     skip_backup: Annotated[bool, Field(default=False, description='skip backup step')]
     segments: Annotated[list[Segment], Field(default_factory=list, description='segments for edit decision list output')]
 
-    @property
-    def duration(self) -> float:
-        return total_movie_duration(self.filepath)
-
     @property
     def metadata(self) -> Optional[MediaMetadata]:
         metadata = load_metadata(self.filepath, cache_busting_key=int(self.filepath.stat().st_mtime))
@@ -83,9 +119,7 @@ class Media(BaseModel):
 
     def to_segment_validator_context(self, config: Settings):
         segment_container = SegmentContainer()
-
-        for segment in self.segments:
-            segment_container.add(SegmentContainerSegment(segment.start, segment.end))
+        segment_container.add_many(SegmentContainerSegment(segment.start, segment.end) for segment in self.segments)
 
         return SegmentValidatorContext(
             filepath=self.filepath,
@@ -97,10 +131,10 @@ class Media(BaseModel):
         )
 
     @classmethod
-    def from_segment_validator_context(cls, context: SegmentValidatorContext):
+    def from_segment_validator_context(cls, context: SegmentValidatorContext, media_path: Optional[MediaPath] = None):
         return cls(
             filepath=context.filepath,
-            state=MediaPath(context.filepath).state,
+            state=(media_path or MediaPath(context.filepath)).state,
             title=context.title,
             skip_backup=context.skip_backup,
             segments=[Segment(**asdict(segment)) for segment in context.segment_container.segments]
@@ -112,7 +146,51 @@ class Session(BaseModel):
     created_at: AwareDatetime
     updated_at: AwareDatetime
     root_path: Annotated[Path, Field(description='root path for medias', examples=[r'V:\PVR'])]
+    version: Annotated[int, Field(description='incremented on every change of the session, exposed as `ETag`')] = 0
     medias: Annotated[dict[str, Media], Field(
         description='medias to process in root_path indexed by stem (filename without extension).\n\n'
             '`imported_segments` and `segments` is empty unless you query media from `medias` or `segments` endpoints'
     )]
+
+
+class SessionSummary(BaseModel):
+    id: Annotated[str, Field(description='session id')]
+    created_at: AwareDatetime
+    updated_at: AwareDatetime
+    root_path: Annotated[Path, Field(description='root path for medias', examples=[r'V:\PVR'])]
+    version: Annotated[int, Field(description='incremented on every change of the session, exposed as `ETag`')]
+    media_count: Annotated[int, Field(description='number of medias')]
+    media_states: Annotated[
+        dict[MediaPathState, int],
+        Field(description='number of medias per state', examples=[{'no_segment': 12, 'segment_reviewed': 3}])
+    ]
+
+
+class MediaPage(BaseModel):
+    medias: Annotated[
+        list[dict[str, Any]],
+        Field(description='medias of the page, with their `stem` and the requested `fields` only')
+    ]
+    next_cursor: Annotated[Optional[str], Field(description='cursor of the next page, None on the last page')] = None
+
+
+class SessionRefresh(BaseModel):
+    session: Annotated[Session, Field(description='refreshed session')]
+    added: Annotated[list[str], Field(description='stems of the medias found in root_path since the last refresh')]
+    removed: Annotated[list[str], Field(description='stems of the medias no longer in root_path')]
+    changed: Annotated[list[str], Field(description='stems of the medias rebuilt because the media or one of its sidecar files changed')]
+
+
+class SessionCreationJob(BaseModel):
+    id: Annotated[str, Field(description='job id')]
+    session_id: Annotated[str, Field(description='id of the session being created, already queryable with the medias built so far')]
+    status: Annotated[
+        Literal['pending', 'running', 'completed', 'failed'],
+        Field(description='`completed` once every media of root_path is built')
+    ]
+    created_at: AwareDatetime
+    finished_at: Optional[AwareDatetime] = None
+    done: Annotated[int, Field(description='number of built medias')] = 0
+    total: Annotated[int, Field(description='number of medias to build')] = 0
+    current_file: Annotated[Optional[Path], Field(description='first media of the batch being built')] = None
+    error: Annotated[Optional[str], Field(description='failure reason (`failed`)')] = None
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Annotated, Iterator, Literal, Optional
+
+from pydantic import AwareDatetime, BaseModel, Field
+
+from ...domain.media_path import MediaPathState
+
+logger = logging.getLogger(__name__)
+
+SessionEventType = Literal['session_updated', 'session_deleted', 'media_updated', 'medias_refreshed', 'resync']
+
+
+class SessionEvent(BaseModel):
+    type: Annotated[
+        SessionEventType,
+        Field(description='`resync` means events were dropped for a slow client, which must refetch the session')
+    ]
+    session_id: Annotated[str, Field(description='session id')]
+    emitted_at: AwareDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    media_stem: Annotated[Optional[str], Field(description='updated media stem (`media_updated`)')] = None
+    state: Annotated[Optional[MediaPathState], Field(description='updated media state (`media_updated`)')] = None
+    title: Annotated[Optional[str], Field(description='updated media title (`media_updated`)')] = None
+    added: Annotated[Optional[list[str]], Field(description='added media stems (`medias_refreshed`)')] = None
+    removed: Annotated[Optional[list[str]], Field(description='removed media stems (`medias_refreshed`)')] = None
+    changed: Annotated[Optional[list[str]], Field(description='changed media stems (`medias_refreshed`)')] = None
+
+
+class SessionEventBus:
+    """Fan out the events of a session, published from any thread, to the asyncio queues of its subscribers"""
+
+    def __init__(self, max_queued_events=256) -> None:
+        self._max_queued_events = max_queued_events
+
+        self._lock = Lock()
+        self._subscribers: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue[SessionEvent]]]] = {}
+
+    def subscriber_count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(session_id, []))
+
+    @contextmanager
+    def subscribe(self, session_id: str) -> Iterator[asyncio.Queue[SessionEvent]]:
+        """Subscribe to the events of a session from the running event loop until the context exits"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue[SessionEvent](maxsize=self._max_queued_events))
+
+        with self._lock:
+            self._subscribers.setdefault(session_id, []).append(subscriber)
+
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers[session_id].remove(subscriber)
+
+                if len(self._subscribers[session_id]) == 0:
+                    del self._subscribers[session_id]
+
+    def publish(self, event: SessionEvent):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event.session_id, []))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._enqueue, queue, event)
+            except RuntimeError:
+                logger.debug(f'Skip event for closed event loop of session {event.session_id} subscriber')
+
+    @staticmethod
+    def _enqueue(queue: asyncio.Queue[SessionEvent], event: SessionEvent):
+        if queue.full():
+            # the client is too slow to keep up, drop its backlog and ask it to refetch the session
+            while not queue.empty():
+                queue.get_nowait()
+            event = SessionEvent(type='resync', session_id=event.session_id)
+
+        queue.put_nowait(event)
+
+
+session_event_bus = SessionEventBus()
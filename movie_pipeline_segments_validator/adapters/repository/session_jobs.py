@@ -0,0 +1,130 @@
+import logging
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import batched
+from threading import Lock
+
+from pydantic.types import DirectoryPath
+
+from ...adapters.repository.resources import Session, SessionCreationJob
+from ...adapters.repository.session_repository import SessionRepository, build_medias, fingerprint_medias
+from ...domain.media_path import MediaPath
+from ...services.media_selector_service import list_medias
+from ...settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCreationJobsExhausted(Exception):
+    pass
+
+
+class SessionCreationJobRunner:
+    """Create sessions in background: the session is stored empty right away, then its medias are built
+    and added in batches of `SessionBuild.batch_size`, so that they can be queried while the rest is built
+
+    Jobs are only kept in memory, the `max_finished_jobs` most recent finished ones remaining queryable.
+    Beyond the `max_workers` running jobs, at most `max_pending_jobs` wait for a worker.
+    """
+
+    def __init__(self, max_workers: int, max_pending_jobs: int, max_finished_jobs=100) -> None:
+        self._max_unfinished_jobs = max_workers + max_pending_jobs
+        self._max_finished_jobs = max_finished_jobs
+
+        self._lock = Lock()
+        self._jobs: OrderedDict[str, SessionCreationJob] = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='session-creator')
+
+    def submit(self, root_path: DirectoryPath, config: Settings) -> SessionCreationJob:
+        """Raises SessionCreationJobsExhausted when `max_pending_jobs` jobs already wait for a worker"""
+        job = SessionCreationJob(
+            id=uuid.uuid4().hex,
+            session_id=uuid.uuid4().hex,
+            status='pending',
+            created_at=datetime.now(timezone.utc)
+        )
+
+        # reserve the job before listing medias, the costly part of the request
+        with self._lock:
+            unfinished_jobs_count = sum(1 for other_job in self._jobs.values() if other_job.finished_at is None)
+            if unfinished_jobs_count >= self._max_unfinished_jobs:
+                raise SessionCreationJobsExhausted(f'{unfinished_jobs_count} session creation jobs unfinished, retry later')
+
+            self._jobs[job.id] = job
+            self._forget_finished_jobs()
+
+        try:
+            media_paths = list_medias(root_path, config)
+            SessionRepository(config).set(Session(
+                id=job.session_id,
+                created_at=datetime.now(timezone.utc),
+                updated_at=datetime.now(timezone.utc),
+                root_path=root_path,
+                medias={}
+            ))
+        except BaseException:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+
+        self._update(job.id, total=len(media_paths))
+        self._executor.submit(self._run, job.id, media_paths, config)
+        return self.get(job.id)
+
+    def get(self, job_id: str) -> SessionCreationJob:
+        """Raises KeyError with job_id if the job does not exist"""
+        with self._lock:
+            return self._jobs[job_id].model_copy()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _update(self, job_id: str, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            self._jobs[job_id] = job.model_copy(update=changes)
+
+    def _run(self, job_id: str, media_paths: list[MediaPath], config: Settings):
+        session_id = self.get(job_id).session_id
+        session_repository = SessionRepository(config)
+        self._update(job_id, status='running')
+
+        try:
+            done = 0
+            for batch in batched(enumerate(media_paths), config.SessionBuild.batch_size):
+                positions, batch_media_paths = zip(*batch)
+                self._update(job_id, current_file=batch_media_paths[0].path)
+
+                medias = build_medias(list(batch_media_paths), config)
+                fingerprints = fingerprint_medias(list(batch_media_paths), config)
+                session_repository.add_medias(session_id, (
+                    (position, media_path.path.stem, media, fingerprint)
+                    for position, media_path, media, fingerprint in zip(positions, batch_media_paths, medias, fingerprints)
+                ))
+
+                done += len(batch)
+                self._update(job_id, done=done)
+        except Exception as e:
+            if isinstance(e, KeyError) and e.args == (session_id,):
+                error = f'Session {session_id} deleted during its creation'
+            else:
+                logger.exception(f'Unable to create session {session_id}')
+                error = str(e)
+
+            self._finish(job_id, status='failed', error=error)
+        else:
+            self._finish(job_id, status='completed')
+
+    def _finish(self, job_id: str, **changes):
+        self._update(job_id, finished_at=datetime.now(timezone.utc), current_file=None, **changes)
+
+        with self._lock:
+            self._forget_finished_jobs()
+
+    def _forget_finished_jobs(self):
+        finished_job_ids = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+
+        for job_id in finished_job_ids[:max(len(finished_job_ids) - self._max_finished_jobs, 0)]:
+            del self._jobs[job_id]
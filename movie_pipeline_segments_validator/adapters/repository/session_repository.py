@@ -1,25 +1,37 @@
-from contextlib import contextmanager
-import dbm
-import dbm.sqlite3
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from functools import partial
+import base64
+import json
 import logging
+import os
+from operator import attrgetter
 from pathlib import Path
-from threading import Lock
+import sqlite3
+from threading import Lock, RLock
 import uuid
+from weakref import WeakValueDictionary
 from datetime import datetime, timezone
 from itertools import islice
-from typing import Any, Optional
+from typing import Any, Callable, Iterable, Literal, Optional, TypeVar
 
 import yaml
-from pydantic import TypeAdapter
+from pydantic import TypeAdapter, ValidationError
 from pydantic.types import DirectoryPath
 
-from ...adapters.repository.resources import Media, Segment, Session
+from ...adapters.repository.context_cache import (CachedSegmentValidatorContext, SegmentValidatorContextCache, copy_segment_validator_context,
+                                                  sidecar_stamp)
+from ...adapters.repository.resources import Media, MediaPage, MediaProbe, Segment, Session, SessionRefresh, SessionSummary
+from ...adapters.repository.session_events import SessionEvent, session_event_bus
 from ...domain.context import SegmentValidatorContext, import_media_segments
-from ...domain.media_path import MediaPath
+from ...domain.media_path import MediaPath, MediaPathState
 from ...domain.movie_segments import MovieSegments
+from ...lib.timing import DB_PHASE, SIDECAR_IO_PHASE, timed
+from ...lib.util import probe_movie, probe_movie_async
 from ...services.edit_decision_file_dumper import extract_title
 from ...services.media_selector_service import list_medias
-from ...settings import Settings
+from ...settings import ContextCacheSettings, SessionBuildSettings, Settings
 
 logger = logging.getLogger(__name__)
 
@@ -49,8 +61,10 @@ def build_media(
     Returns:
         Media: Media filled with title, state, skip_backup and imported segments
     """
+    max_imported_results = config.SegmentsJournal.max_imported_results if config is not None else None
+
     if isinstance(source, Media):
-        imported_segments = import_media_segments(source.filepath) if force_load_segments else {}
+        imported_segments = import_media_segments(source.filepath, max_imported_results) if force_load_segments else {}
         imported_detector_segments = source.segments or import_detector_segments(imported_segments)
         filepath, state, title, skip_backup = source.filepath, source.state, source.title, source.skip_backup
 
@@ -58,7 +72,7 @@ def build_media(
         if config is None:
             raise ValueError('Missing config when source is instance of MediaPath')
 
-        imported_segments = import_media_segments(source.path) if force_load_segments else {}
+        imported_segments = import_media_segments(source.path, max_imported_results) if force_load_segments else {}
         imported_detector_segments = import_detector_segments(imported_segments)
         filepath, state = source.path, source.state
         title, skip_backup = extract_title(filepath, config), False # default value
@@ -68,8 +82,9 @@ def build_media(
         if config is None:
             raise ValueError('Missing config when force_load_edl_file_content is True')
 
-        edl_files = list(islice(filepath.parent.glob(f'{filepath.name}*.*yml*'), 1))
-        eld_file_content: dict[str, Any] = yaml.safe_load(edl_files[0].read_text(encoding='utf-8')) if len(edl_files) == 1 else {}
+        with timed(SIDECAR_IO_PHASE):
+            edl_files = list(islice(filepath.parent.glob(f'{filepath.name}*.*yml*'), 1))
+            eld_file_content: dict[str, Any] = yaml.safe_load(edl_files[0].read_text(encoding='utf-8')) if len(edl_files) == 1 else {}
         title: str = eld_file_content.get('filename', extract_title(filepath, config))
         skip_backup: bool = eld_file_content.get('skip_backup', False)
 
@@ -82,62 +97,772 @@ def build_media(
     )
 
 
+T = TypeVar('T')
+
+
+class MediaBuildPool:
+    """Process pool building medias, kept across calls as spawning worker processes costs more than building a batch
+
+    The pool is replaced when `SessionBuild.max_workers` changes, its worker processes only being started on first use.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._max_workers = 0
+
+    def configure(self, build_settings: SessionBuildSettings):
+        """Create the pool upfront if build_settings use it"""
+        if build_settings.use_process_pool:
+            self.get(build_settings)
+
+    def get(self, build_settings: SessionBuildSettings) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._max_workers != build_settings.max_workers:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+
+                self._executor = ProcessPoolExecutor(max_workers=build_settings.max_workers)
+                self._max_workers = build_settings.max_workers
+
+            return self._executor
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+media_build_pool = MediaBuildPool()
+
+
+def map_media_paths(fn: Callable[[MediaPath], T], media_paths: list[MediaPath], build_settings: SessionBuildSettings, cpu_bound=False) -> list[T]:
+    """Apply fn to every media path in a worker pool, keeping the order of media_paths
+
+    Args:
+        fn (Callable[[MediaPath], T]): function to apply, must be picklable when cpu_bound
+        media_paths (list[MediaPath]): media paths, run serially when fewer than `min_parallel_medias`
+        build_settings (SessionBuildSettings): pool size and kind
+        cpu_bound (bool): run in the shared `media_build_pool` instead of a thread pool if `use_process_pool` is enabled
+
+    Returns:
+        list[T]: results in the order of media_paths, the same as `[fn(media_path) for media_path in media_paths]`
+    """
+    if build_settings.max_workers == 1 or len(media_paths) < build_settings.min_parallel_medias:
+        return [fn(media_path) for media_path in media_paths]
+
+    if cpu_bound and build_settings.use_process_pool:
+        # media paths only carry the entries of their own media to worker processes, see `MediaPath.__getstate__`
+        return list(media_build_pool.get(build_settings).map(fn, media_paths, chunksize=build_settings.chunk_size))
+
+    with ThreadPoolExecutor(max_workers=build_settings.max_workers, thread_name_prefix='media-builder') as executor:
+        return list(executor.map(fn, media_paths, chunksize=build_settings.chunk_size))
+
+
+def build_medias(media_paths: list[MediaPath], config: Settings) -> list[Media]:
+    """Build medias from media paths like `build_media`, in parallel according to `config.SessionBuild`"""
+    return map_media_paths(partial(build_media, config=config), media_paths, config.SessionBuild, cpu_bound=True)
+
+
+def fingerprint_medias(media_paths: list[MediaPath], config: Settings) -> list[str]:
+    return map_media_paths(attrgetter('fingerprint'), media_paths, config.SessionBuild)
+
+
+MediaSortKey = Literal['position', 'title', 'state', 'stem']
+
+
+def escape_like(value: str) -> str:
+    """Escape the LIKE wildcards of value, for patterns declaring `ESCAPE '\\'`"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def encode_cursor(sort_value: Any, stem: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_value, stem]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> tuple[Any, str]:
+    """Raises ValueError if cursor was not built by `encode_cursor`"""
+    try:
+        sort_value, stem = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor {cursor!r}') from e
+
+    return sort_value, stem
+
+
+DB_BUSY_TIMEOUT_S = 30.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    root_path TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS medias (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    stem TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    filepath TEXT NOT NULL,
+    state TEXT NOT NULL,
+    title TEXT NOT NULL,
+    skip_backup INTEGER NOT NULL,
+    fingerprint TEXT,
+    PRIMARY KEY (session_id, stem)
+);
+
+CREATE TABLE IF NOT EXISTS segments (
+    session_id TEXT NOT NULL,
+    media_stem TEXT NOT NULL,
+    start_s REAL NOT NULL,
+    end_s REAL NOT NULL,
+    FOREIGN KEY (session_id, media_stem) REFERENCES medias (session_id, stem) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS segments_media_index ON segments (session_id, media_stem);
+
+CREATE INDEX IF NOT EXISTS medias_position_index ON medias (session_id, position);
+
+CREATE TABLE IF NOT EXISTS media_probes (
+    filepath TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    probe TEXT NOT NULL
+);
+"""
+
+
+class SessionVersionConflict(Exception):
+    """The session changed since the version the client based its change on"""
+
+    def __init__(self, session_id: str, expected_version: int, actual_version: int) -> None:
+        super().__init__(session_id, expected_version, actual_version)
+        self.session_id = session_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+    def __str__(self) -> str:
+        return f'Session {self.session_id} is at version {self.actual_version}, not {self.expected_version}'
+
+
 class SessionRepository:
-    __repository_locks: dict[Path, Lock] = {}
-    _session_type_adapter = TypeAdapter(Session)
+    """Sessions stored in SQLite, in WAL mode so that readers never wait for writers
+
+    Every change of a session increments its version. Writes of a same session are serialized by a
+    per-session lock, the ones of different sessions only by SQLite while they commit.
+
+    Segment validator contexts of the recently edited medias are kept in memory and updated when their media is stored,
+    so that back-to-back edits of a media neither read its segments files nor rebuild its segment container.
+    """
+    __initialized_db_paths: set[Path] = set()
+    __session_locks: WeakValueDictionary[tuple[Path, str], RLock] = WeakValueDictionary()
+    __session_locks_lock = Lock()
+    __context_caches: dict[tuple[Path, ContextCacheSettings], SegmentValidatorContextCache] = {}
 
     @property
     def _db_path(self):
         return self._config.Paths.db_path.resolve()
 
     @contextmanager
-    def _get_db(self):
-        with self.__repository_locks[self._db_path]:
-            with dbm.sqlite3.open(self._db_path, 'c') as db:
+    def _get_db(self, write=False):
+        """Run statements in one transaction, taking the database write lock upfront if write"""
+        with timed(DB_PHASE), closing(sqlite3.connect(self._db_path, timeout=DB_BUSY_TIMEOUT_S)) as db:
+            db.execute('PRAGMA foreign_keys = ON')
+            db.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            with db:
                 yield db
 
     def __init__(self, config: Settings) -> None:
         self._config = config
 
-        if self._db_path not in self.__repository_locks:
-            self.__repository_locks[self._db_path] = Lock()
+        if self._db_path not in self.__initialized_db_paths:
+            # executescript commits any pending transaction first: create the (idempotent) schema on its own,
+            # so that the migrations then run as one transaction under the write lock
+            with closing(sqlite3.connect(self._db_path, timeout=DB_BUSY_TIMEOUT_S)) as db:
+                db.execute('PRAGMA journal_mode = WAL')
+                db.executescript(SCHEMA)
+
+            with self._get_db(write=True) as db:
+                migrate_schema(db)
+                migrate_blob_database(db)
+
+            self.__initialized_db_paths.add(self._db_path)
+
+    @property
+    def _context_cache(self):
+        context_cache_key = (self._db_path, self._config.ContextCache)
+
+        with self.__session_locks_lock:
+            if (context_cache := self.__context_caches.get(context_cache_key)) is None:
+                context_cache = self.__context_caches[context_cache_key] = SegmentValidatorContextCache(self._config.ContextCache.max_entries)
+
+        return context_cache
 
     def close(self):
-        del self.__repository_locks[self._db_path]
+        self.__initialized_db_paths.discard(self._db_path)
+
+        with self.__session_locks_lock:
+            for context_cache_key in [key for key in self.__context_caches if key[0] == self._db_path]:
+                del self.__context_caches[context_cache_key]
+
+    @contextmanager
+    def lock(self, session_id: str):
+        """Serialize the changes of a session, the lock being reentrant
+
+        A lock only lives while held or waited for, so that locks of unknown or deleted sessions do not pile up.
+        """
+        with self.__session_locks_lock:
+            session_lock = self.__session_locks.setdefault((self._db_path, session_id), RLock())
+
+        with session_lock:
+            yield
 
     def create(self, root_path: DirectoryPath) -> Session:
+        media_paths = list_medias(root_path, self._config)
+        media_stems = [media.path.stem for media in media_paths]
         new_session = Session(
             id=uuid.uuid4().hex,
             created_at=datetime.now(timezone.utc),
             updated_at=datetime.now(timezone.utc),
             root_path=root_path,
-            medias={
-                media.path.stem: build_media(media, self._config)
-                for media in list_medias(root_path, self._config)
-            }
+            medias=dict(zip(media_stems, build_medias(media_paths, self._config)))
         )
 
-        return self.set(new_session)
+        return self.set(new_session, fingerprints=dict(zip(media_stems, fingerprint_medias(media_paths, self._config))))
 
     def get(self, id: str) -> Session:
         with self._get_db() as db:
-            return self._session_type_adapter.validate_json(db[id])
+            session_row = db.execute('SELECT id, created_at, updated_at, root_path, version FROM sessions WHERE id = ?', (id,)).fetchone()
 
-    def set(self, session: Session) -> Session:
-        session.updated_at = datetime.now(timezone.utc)
+            if session_row is None:
+                raise KeyError(id)
+
+            media_rows = db.execute(
+                'SELECT stem, filepath, state, title, skip_backup FROM medias WHERE session_id = ? ORDER BY position',
+                (id,)
+            ).fetchall()
+            segments = self._select_segments(db, id)
+
+        session_id, created_at, updated_at, root_path, version = session_row
+
+        return Session(
+            id=session_id,
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            root_path=Path(root_path),
+            version=version,
+            medias={media_row[0]: self._to_media(media_row, segments.get(media_row[0], [])) for media_row in media_rows}
+        )
+
+    def get_media(self, session_id: str, media_stem: str) -> Media:
+        """Get a single media of a session without loading the other ones
+
+        Raises:
+            KeyError: with session_id if the session does not exist, with media_stem if the media does not exist
+        """
         with self._get_db() as db:
-            db[session.id] = self._session_type_adapter.dump_json(session)
-        return session
+            return self._select_media(db, session_id, media_stem)
+
+    def get_segment_validator_context(self, session_id: str, media_stem: str) -> SegmentValidatorContext:
+        """Get the segment validator context of a media, from the context cache unless the session
+        or the sidecar files of the media changed since it was cached
+
+        Raises:
+            KeyError: with session_id if the session does not exist, with media_stem if the media does not exist
+        """
+        with self._get_db() as db:
+            version = self._check_version(db, session_id)
+
+            if (segment_validator_context := self._context_cache.get(session_id, media_stem, version, self._config)) is not None:
+                return segment_validator_context
+
+            media = self._select_media(db, session_id, media_stem)
+
+        # stamped before importing the segments files, so that a change while importing them invalidates the context
+        media_sidecar_stamp = sidecar_stamp(media.filepath)
+        segment_validator_context = build_media(media).to_segment_validator_context(self._config)
+
+        self._context_cache.put(session_id, media_stem, CachedSegmentValidatorContext(
+            version=version,
+            config=self._config,
+            sidecar_stamp=media_sidecar_stamp,
+            context=segment_validator_context
+        ))
+        return copy_segment_validator_context(segment_validator_context)
+
+    def get_version(self, id: str) -> int:
+        """Raises KeyError with id if the session does not exist"""
+        with self._get_db() as db:
+            if (version_row := db.execute('SELECT version FROM sessions WHERE id = ?', (id,)).fetchone()) is None:
+                raise KeyError(id)
+
+        return version_row[0]
+
+    def get_summary(self, id: str) -> SessionSummary:
+        """Get a session without its medias, only counting them by state"""
+        with self._get_db() as db:
+            session_row = db.execute('SELECT id, created_at, updated_at, root_path, version FROM sessions WHERE id = ?', (id,)).fetchone()
+
+            if session_row is None:
+                raise KeyError(id)
+
+            media_states = dict(db.execute('SELECT state, COUNT(*) FROM medias WHERE session_id = ? GROUP BY state', (id,)))
+
+        session_id, created_at, updated_at, root_path, version = session_row
+
+        return SessionSummary(
+            id=session_id,
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at),
+            root_path=Path(root_path),
+            version=version,
+            media_count=sum(media_states.values()),
+            media_states=media_states
+        )
+
+    def find_medias(
+            self,
+            session_id: str,
+            states: Optional[Iterable[MediaPathState]] = None,
+            channel: Optional[str] = None,
+            title: Optional[str] = None,
+            has_segments: Optional[bool] = None,
+            sort: MediaSortKey = 'position',
+            descending=False,
+            cursor: Optional[str] = None,
+            limit=100,
+            fields: Optional[Iterable[str]] = None
+        ) -> MediaPage:
+        """Get a page of the medias of a session matching all the given filters
+
+        Pages are keyset paginated on (sort key, stem), so that fetching any page costs the same
+        and medias added or removed meanwhile do not shift the next pages.
+
+        Args:
+            session_id (str): session id
+            states (Optional[Iterable[MediaPathState]]): only medias in one of these states
+            channel (Optional[str]): only medias recorded from this channel (stem prefix before the first `_`)
+            title (Optional[str]): only medias whose title contains this text, case insensitive
+            has_segments (Optional[bool]): only medias with (or without) segments
+            sort (MediaSortKey): sort key, stem breaking ties
+            descending (bool): sort in descending order
+            cursor (Optional[str]): `next_cursor` of the previous page, first page when None
+            limit (int): maximum number of medias of the page
+            fields (Optional[Iterable[str]]): `Media` fields to include besides `stem`, all when None
+
+        Raises:
+            KeyError: with session_id if the session does not exist
+            ValueError: if cursor or fields are invalid
+        """
+        fields = list(Media.model_fields) if fields is None else list(fields)
+        if unknown_fields := set(fields) - set(Media.model_fields):
+            raise ValueError(f'Unknown media fields: {", ".join(sorted(unknown_fields))}')
+
+        conditions, params = ['session_id = ?'], [session_id]
+
+        if states is not None:
+            states = list(states)
+            conditions.append(f'state IN ({", ".join("?" * len(states))})')
+            params += states
+
+        if channel is not None:
+            conditions.append("stem LIKE ? ESCAPE '\\'")
+            params.append(f'{escape_like(channel)}\\_%')
+
+        if title is not None:
+            conditions.append('instr(lower(title), lower(?)) > 0')
+            params.append(title)
 
-    def update_media(self, session_id: str, session_validator_context: SegmentValidatorContext) -> Session:
-        new_media = Media.from_segment_validator_context(session_validator_context)
+        if has_segments is not None:
+            conditions.append(
+                f"{'' if has_segments else 'NOT '}EXISTS (SELECT 1 FROM segments WHERE segments.session_id = medias.session_id AND media_stem = stem)"
+            )
 
-        session = self.get(session_id)
+        if cursor is not None:
+            conditions.append(f'({sort}, stem) {"<" if descending else ">"} (?, ?)')
+            params += decode_cursor(cursor)
+
+        order = 'DESC' if descending else 'ASC'
+
+        with self._get_db() as db:
+            if db.execute('SELECT 1 FROM sessions WHERE id = ?', (session_id,)).fetchone() is None:
+                raise KeyError(session_id)
+
+            media_rows = db.execute(
+                f'SELECT stem, filepath, state, title, skip_backup, {sort} FROM medias '
+                f'WHERE {" AND ".join(conditions)} ORDER BY {sort} {order}, stem {order} LIMIT ?',
+                (*params, limit + 1)
+            ).fetchall()
+
+            page_rows = media_rows[:limit]
+            segments = self._select_segments(db, session_id, [row[0] for row in page_rows]) if 'segments' in fields else {}
+
+        next_cursor = encode_cursor(page_rows[-1][-1], page_rows[-1][0]) if len(media_rows) > limit else None
+
+        return MediaPage(
+            medias=[
+                {'stem': row[0], **self._to_media(row[:5], segments.get(row[0], [])).model_dump(mode='json', include=set(fields))}
+                for row in page_rows
+            ],
+            next_cursor=next_cursor
+        )
+
+    def set(self, session: Session, fingerprints: Optional[dict[str, str]] = None) -> Session:
         session.updated_at = datetime.now(timezone.utc)
-        session.medias[new_media.filepath.stem] = new_media
+        with self.lock(session.id), self._get_db(write=True) as db:
+            version_row = db.execute('SELECT version FROM sessions WHERE id = ?', (session.id,)).fetchone()
+            session.version = (version_row[0] if version_row is not None else session.version) + 1
+
+            db.execute('DELETE FROM sessions WHERE id = ?', (session.id,))
+            self._insert_session(db, session, fingerprints)
+
+        session_event_bus.publish(SessionEvent(type='session_updated', session_id=session.id))
+        return session
+
+    def refresh(self, id: str, media_stems: Optional[Iterable[str]] = None) -> SessionRefresh:
+        """Rebuild only the medias of a session that were added, removed or changed since they were stored
 
-        return self.set(session)
+        A media has changed when the fingerprint of its files (media and sidecars names, sizes and mtimes) differs
+        from the stored one. Only the state of changed medias is refreshed, their reviewed segments, title and
+        skip_backup being kept, while unchanged medias are kept as is.
 
-    def delete(self, id: str) -> None:
+        Args:
+            id (str): session id
+            media_stems (Optional[Iterable[str]]): only look for changes of these medias, all medias when None
+
+        Raises:
+            KeyError: with id if the session does not exist
+        """
+        with self.lock(id):
+            return self._refresh(id, media_stems)
+
+    def _refresh(self, id: str, media_stems: Optional[Iterable[str]] = None) -> SessionRefresh:
         with self._get_db() as db:
-            del db[id]
+            if (session_row := db.execute('SELECT root_path FROM sessions WHERE id = ?', (id,)).fetchone()) is None:
+                raise KeyError(id)
+
+            stored_fingerprints: dict[str, Optional[str]] = dict(db.execute('SELECT stem, fingerprint FROM medias WHERE session_id = ?', (id,)))
+
+        media_paths = {media.path.stem: media for media in list_medias(Path(session_row[0]), self._config)}
+        positions = {stem: position for position, stem in enumerate(media_paths)}
+
+        if media_stems is not None:
+            media_stems = set(media_stems)
+            media_paths = {stem: media for stem, media in media_paths.items() if stem in media_stems}
+            stored_fingerprints = {stem: fingerprint for stem, fingerprint in stored_fingerprints.items() if stem in media_stems}
+
+        fingerprints = dict(zip(media_paths, fingerprint_medias(list(media_paths.values()), self._config)))
+
+        added = [stem for stem in media_paths if stem not in stored_fingerprints]
+        removed = [stem for stem in stored_fingerprints if stem not in media_paths]
+        changed = [stem for stem in media_paths if stem in stored_fingerprints and stored_fingerprints[stem] != fingerprints[stem]]
+        added_medias = dict(zip(added, build_medias([media_paths[stem] for stem in added], self._config)))
+
+        if not (added or removed or changed):
+            return SessionRefresh(session=self.get(id), added=added, removed=removed, changed=changed)
+
+        with self._get_db(write=True) as db:
+            self._bump_version(db, id)
+
+            db.executemany('DELETE FROM medias WHERE session_id = ? AND stem = ?', ((id, stem) for stem in removed))
+            self._insert_medias(db, id, ((positions[stem], stem, media, fingerprints[stem]) for stem, media in added_medias.items()))
+
+            # changed medias keep their stored segments, title and skip_backup, the app writing their sidecars itself
+            db.executemany(
+                'UPDATE medias SET filepath = ?, state = ?, fingerprint = ? WHERE session_id = ? AND stem = ?',
+                ((str(media_paths[stem].path), media_paths[stem].state, fingerprints[stem], id, stem) for stem in changed)
+            )
+
+            if added or removed:
+                db.executemany('UPDATE medias SET position = ? WHERE session_id = ? AND stem = ?', ((position, id, stem) for stem, position in positions.items()))
+
+        session_event_bus.publish(SessionEvent(type='medias_refreshed', session_id=id, added=added, removed=removed, changed=changed))
+        return SessionRefresh(session=self.get(id), added=added, removed=removed, changed=changed)
+
+    def add_medias(self, session_id: str, medias: Iterable[tuple[int, str, Media, Optional[str]]]) -> list[str]:
+        """Add a batch of built medias to a stored session, skipping the ones already stored (eg by a concurrent refresh)
+
+        Args:
+            session_id (str): session id
+            medias (Iterable[tuple[int, str, Media, Optional[str]]]): position, stem, media and fingerprint of each media
+
+        Raises:
+            KeyError: with session_id if the session does not exist
+
+        Returns:
+            list[str]: stems of the added medias
+        """
+        medias = list(medias)
+
+        with self.lock(session_id), self._get_db(write=True) as db:
+            self._bump_version(db, session_id)
+
+            stored_stems = {stem for stem, in db.execute('SELECT stem FROM medias WHERE session_id = ?', (session_id,))}
+            medias = [media for media in medias if media[1] not in stored_stems]
+            self._insert_medias(db, session_id, medias)
+
+        added = [stem for _, stem, _, _ in medias]
+        if added:
+            session_event_bus.publish(SessionEvent(type='medias_refreshed', session_id=session_id, added=added, removed=[], changed=[]))
+
+        return added
+
+    def update_media(self, session_id: str, session_validator_context: SegmentValidatorContext, expected_version: Optional[int] = None) -> Media:
+        """Store the media of a segment validator context, leaving the session version as is when nothing changed
+
+        Raises:
+            KeyError: with session_id if the session does not exist
+            SessionVersionConflict: if expected_version is given and differs from the session version
+        """
+        media_path = self._context_cache.get_media_path(session_id, session_validator_context) or MediaPath(session_validator_context.filepath)
+        new_media = Media.from_segment_validator_context(session_validator_context, media_path)
+        media_stem = new_media.filepath.stem
+        fingerprint = media_path.fingerprint
+
+        with self.lock(session_id):
+            with self._get_db(write=True) as db:
+                version = self._check_version(db, session_id, expected_version)
+                changed = self._store_media(db, session_id, new_media, fingerprint)
+
+            # written through once committed, the cached context then being the stored one
+            self._context_cache.write_through(session_id, session_validator_context, version + 1 if changed else version, media_path)
+
+        if not changed:
+            return new_media
+
+        session_event_bus.publish(SessionEvent(
+            type='media_updated',
+            session_id=session_id,
+            media_stem=media_stem,
+            state=new_media.state,
+            title=new_media.title
+        ))
+        return new_media
+
+    def delete(self, id: str, expected_version: Optional[int] = None) -> None:
+        """Raises KeyError with id if the session does not exist, SessionVersionConflict if expected_version differs"""
+        with self.lock(id), self._get_db(write=True) as db:
+            self._check_version(db, id, expected_version)
+            db.execute('DELETE FROM sessions WHERE id = ?', (id,))
+
+        self._context_cache.discard(id)
+        session_event_bus.publish(SessionEvent(type='session_deleted', session_id=id))
+
+    def get_media_probe(self, filepath: Path) -> MediaProbe:
+        """Get the probe result of a media, only running ffprobe when the media is new or has changed since the last probe"""
+        filepath, stat = filepath.resolve(), filepath.stat()
+
+        if (media_probe := self._select_media_probe(filepath, stat)) is not None:
+            return media_probe
+
+        media_probe = MediaProbe.from_ffprobe(probe_movie(filepath))
+        self._store_media_probe(filepath, stat, media_probe)
+        return media_probe
+
+    async def get_media_probe_async(self, filepath: Path) -> MediaProbe:
+        """Like `get_media_probe`, running ffprobe as an asyncio subprocess, the media stat and the database statements in a worker thread"""
+        def select_media_probe():
+            resolved_filepath, stat = filepath.resolve(), filepath.stat()
+            return resolved_filepath, stat, self._select_media_probe(resolved_filepath, stat)
+
+        filepath, stat, media_probe = await asyncio.to_thread(select_media_probe)
+        if media_probe is not None:
+            return media_probe
+
+        media_probe = MediaProbe.from_ffprobe(await probe_movie_async(filepath))
+        await asyncio.to_thread(self._store_media_probe, filepath, stat, media_probe)
+        return media_probe
+
+    def _select_media_probe(self, filepath: Path, stat: os.stat_result) -> Optional[MediaProbe]:
+        with self._get_db() as db:
+            probe_row = db.execute(
+                'SELECT probe FROM media_probes WHERE filepath = ? AND size = ? AND mtime_ns = ?',
+                (str(filepath), stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+
+        return MediaProbe.model_validate_json(probe_row[0]) if probe_row is not None else None
+
+    def _store_media_probe(self, filepath: Path, stat: os.stat_result, media_probe: MediaProbe):
+        with self._get_db(write=True) as db:
+            db.execute(
+                'INSERT OR REPLACE INTO media_probes (filepath, size, mtime_ns, probe) VALUES (?, ?, ?, ?)',
+                (str(filepath), stat.st_size, stat.st_mtime_ns, media_probe.model_dump_json())
+            )
+
+    @staticmethod
+    def _check_version(db: sqlite3.Connection, session_id: str, expected_version: Optional[int] = None) -> int:
+        if (version_row := db.execute('SELECT version FROM sessions WHERE id = ?', (session_id,)).fetchone()) is None:
+            raise KeyError(session_id)
+
+        if expected_version is not None and version_row[0] != expected_version:
+            raise SessionVersionConflict(session_id, expected_version, version_row[0])
+
+        return version_row[0]
+
+    @staticmethod
+    def _bump_version(db: sqlite3.Connection, session_id: str):
+        if db.execute(
+            'UPDATE sessions SET updated_at = ?, version = version + 1 WHERE id = ?',
+            (datetime.now(timezone.utc).isoformat(), session_id)
+        ).rowcount == 0:
+            raise KeyError(session_id)
+
+    @classmethod
+    def _store_media(cls, db: sqlite3.Connection, session_id: str, media: Media, fingerprint: str) -> bool:
+        """Upsert a media and its segments, bumping the session version, unless it is stored as is"""
+        media_stem = media.filepath.stem
+        stored_media_row = db.execute(
+            'SELECT filepath, state, title, skip_backup, fingerprint FROM medias WHERE session_id = ? AND stem = ?',
+            (session_id, media_stem)
+        ).fetchone()
+        new_media_row = (str(media.filepath), media.state, media.title, int(media.skip_backup), fingerprint)
+
+        if stored_media_row == new_media_row and cls._select_segments(db, session_id, [media_stem]).get(media_stem, []) == media.segments:
+            return False
+
+        cls._bump_version(db, session_id)
+        db.execute(
+            """
+            INSERT INTO medias (session_id, stem, position, filepath, state, title, skip_backup, fingerprint)
+            VALUES (?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM medias WHERE session_id = ?), ?, ?, ?, ?, ?)
+            ON CONFLICT (session_id, stem) DO UPDATE SET
+                filepath = excluded.filepath,
+                state = excluded.state,
+                title = excluded.title,
+                skip_backup = excluded.skip_backup,
+                fingerprint = excluded.fingerprint
+            """,
+            (session_id, media_stem, session_id, str(media.filepath), media.state, media.title, media.skip_backup, fingerprint)
+        )
+        db.execute('DELETE FROM segments WHERE session_id = ? AND media_stem = ?', (session_id, media_stem))
+        cls._insert_segments(db, session_id, media_stem, media.segments)
+        return True
+
+    @classmethod
+    def _select_media(cls, db: sqlite3.Connection, session_id: str, media_stem: str) -> Media:
+        media_row = db.execute(
+            'SELECT stem, filepath, state, title, skip_backup FROM medias WHERE session_id = ? AND stem = ?',
+            (session_id, media_stem)
+        ).fetchone()
+
+        if media_row is None:
+            if db.execute('SELECT 1 FROM sessions WHERE id = ?', (session_id,)).fetchone() is None:
+                raise KeyError(session_id)
+            raise KeyError(media_stem)
+
+        segments = cls._select_segments(db, session_id, [media_stem])
+        return cls._to_media(media_row, segments.get(media_stem, []))
+
+    @staticmethod
+    def _to_media(media_row: tuple, segments: list[Segment]) -> Media:
+        _, filepath, state, title, skip_backup = media_row
+        return Media(filepath=Path(filepath), state=state, title=title, skip_backup=bool(skip_backup), segments=segments)
+
+    @staticmethod
+    def _select_segments(db: sqlite3.Connection, session_id: str, media_stems: Optional[list[str]] = None) -> dict[str, list[Segment]]:
+        query = 'SELECT media_stem, start_s, end_s FROM segments WHERE session_id = ?'
+        params: tuple[str, ...] = (session_id,)
+
+        if media_stems is not None:
+            query += f' AND media_stem IN ({", ".join("?" * len(media_stems))})'
+            params += tuple(media_stems)
+
+        segments: dict[str, list[Segment]] = {}
+        for stem, start, end in db.execute(f'{query} ORDER BY media_stem, rowid', params):
+            segments.setdefault(stem, []).append(Segment(start=start, end=end))
+
+        return segments
+
+    @staticmethod
+    def _insert_segments(db: sqlite3.Connection, session_id: str, media_stem: str, segments: list[Segment]):
+        db.executemany(
+            'INSERT INTO segments (session_id, media_stem, start_s, end_s) VALUES (?, ?, ?, ?)',
+            ((session_id, media_stem, segment.start, segment.end) for segment in segments)
+        )
+
+    @classmethod
+    def _insert_medias(cls, db: sqlite3.Connection, session_id: str, medias: Iterable[tuple[int, str, Media, Optional[str]]]):
+        medias = list(medias)
+        db.executemany(
+            'INSERT INTO medias (session_id, stem, position, filepath, state, title, skip_backup, fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                (session_id, stem, position, str(media.filepath), media.state, media.title, media.skip_backup, fingerprint)
+                for position, stem, media, fingerprint in medias
+            )
+        )
+
+        for _, stem, media, _ in medias:
+            cls._insert_segments(db, session_id, stem, media.segments)
+
+    @classmethod
+    def _insert_session(cls, db: sqlite3.Connection, session: Session, fingerprints: Optional[dict[str, str]] = None):
+        db.execute(
+            'INSERT INTO sessions (id, created_at, updated_at, root_path, version) VALUES (?, ?, ?, ?, ?)',
+            (session.id, session.created_at.isoformat(), session.updated_at.isoformat(), str(session.root_path), session.version)
+        )
+        cls._insert_medias(db, session.id, (
+            (position, stem, media, (fingerprints or {}).get(stem))
+            for position, (stem, media) in enumerate(session.medias.items())
+        ))
+
+
+def migrate_schema(db: sqlite3.Connection):
+    """Add the columns introduced after the normalized schema creation to an existing database"""
+    media_columns = {column_name for _, column_name, *_ in db.execute('PRAGMA table_info(medias)')}
+
+    if 'fingerprint' not in media_columns:
+        db.execute('ALTER TABLE medias ADD COLUMN fingerprint TEXT')
+
+    session_columns = {column_name for _, column_name, *_ in db.execute('PRAGMA table_info(sessions)')}
+
+    if 'version' not in session_columns:
+        db.execute('ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+
+def migrate_blob_database(db: sqlite3.Connection) -> int:
+    """Migrate sessions stored as one pydantic JSON blob (legacy `dbm.sqlite3` `Dict` table) to the normalized schema
+
+    Sessions failing validation are left in a `Dict_unmigrated` table instead of being dropped.
+
+    Args:
+        db (sqlite3.Connection): connection to a database whose normalized schema is already created
+
+    Returns:
+        int: number of migrated sessions
+    """
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Dict'").fetchone() is None:
+        return 0
+
+    session_type_adapter = TypeAdapter(Session)
+    migrated_sessions_count = 0
+
+    for key, value in db.execute('SELECT key, value FROM Dict').fetchall():
+        try:
+            session = session_type_adapter.validate_json(value)
+        except ValidationError:
+            logger.exception(f'Skip migration of invalid session {key!r}')
+            continue
+
+        SessionRepository._insert_session(db, session)
+        db.execute('DELETE FROM Dict WHERE key = ?', (key,))
+        migrated_sessions_count += 1
+
+    logger.info(f'Migrated {migrated_sessions_count} session(s) from blob database')
+
+    if db.execute('SELECT 1 FROM Dict LIMIT 1').fetchone() is None:
+        db.execute('DROP TABLE Dict')
+        return migrated_sessions_count
+
+    # keep the sessions failing validation aside for a manual recovery, out of the way of the next migration
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Dict_unmigrated'").fetchone() is None:
+        db.execute('ALTER TABLE Dict RENAME TO Dict_unmigrated')
+    else:
+        db.execute('INSERT OR REPLACE INTO Dict_unmigrated (key, value) SELECT key, value FROM Dict')
+        db.execute('DROP TABLE Dict')
+
+    logger.warning('Kept unmigrated session(s) of blob database in table Dict_unmigrated')
+
+    return migrated_sessions_count
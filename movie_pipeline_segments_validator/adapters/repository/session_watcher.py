@@ -0,0 +1,99 @@
+import logging
+from pathlib import Path
+from threading import Lock
+
+from ...adapters.repository.session_repository import SessionRepository
+from ...domain.media_path import media_names_of
+from ...lib.directory_watcher import DirectoryWatcher, create_directory_watcher
+from ...settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWatcher:
+    """Keep the media states of open sessions live by watching their root path
+
+    One directory watcher is shared by the sessions of a same root path. On changes, only the medias
+    whose file or sidecar files changed are refreshed.
+    """
+
+    def __init__(self, config: Settings) -> None:
+        self._config = config
+
+        self._lock = Lock()
+        self._watchers: dict[Path, DirectoryWatcher] = {}
+        self._session_ids: dict[Path, set[str]] = {}
+
+    def watch(self, session_id: str, root_path: Path):
+        root_path = root_path.resolve()
+
+        with self._lock:
+            if session_id in self._session_ids.get(root_path, set()):
+                return
+
+            self._session_ids.setdefault(root_path, set()).add(session_id)
+
+            if root_path not in self._watchers:
+                logger.info(f'Watch {root_path}')
+                self._watchers[root_path] = create_directory_watcher(
+                    root_path,
+                    on_change=lambda names: self._refresh(root_path, names),
+                    debounce_s=self._config.Watcher.debounce_s,
+                    max_delay_s=self._config.Watcher.max_delay_s,
+                    poll_interval_s=self._config.Watcher.poll_interval_s,
+                    force_polling=self._config.Watcher.force_polling
+                )
+
+    def unwatch(self, session_id: str):
+        with self._lock:
+            unwatched_root_paths = [root_path for root_path, session_ids in self._session_ids.items() if session_id in session_ids]
+            watchers = []
+
+            for root_path in unwatched_root_paths:
+                self._session_ids[root_path].discard(session_id)
+
+                if len(self._session_ids[root_path]) == 0:
+                    del self._session_ids[root_path]
+                    watchers.append(self._watchers.pop(root_path))
+
+        for watcher in watchers:
+            logger.info(f'Stop watching {watcher.path}')
+            watcher.close()
+
+    def close(self):
+        with self._lock:
+            watchers = list(self._watchers.values())
+            self._watchers.clear()
+            self._session_ids.clear()
+
+        for watcher in watchers:
+            watcher.close()
+
+    def _refresh(self, root_path: Path, changed_names: set[str]):
+        media_ext = self._config.MediaSelector.media_extension
+        media_stems = {
+            Path(media_name).stem
+            for name in changed_names
+            for media_name in media_names_of(name, media_ext)
+        }
+
+        if len(changed_names) > 0 and len(media_stems) == 0:
+            return
+
+        with self._lock:
+            session_ids = list(self._session_ids.get(root_path, set()))
+
+        session_repository = SessionRepository(self._config)
+
+        for session_id in session_ids:
+            try:
+                session_refresh = session_repository.refresh(session_id, media_stems or None)
+            except KeyError:
+                self.unwatch(session_id)
+                continue
+
+            if session_refresh.added or session_refresh.removed or session_refresh.changed:
+                logger.info(
+                    f'Refreshed session {session_id}: '
+                    f'added={session_refresh.added} removed={session_refresh.removed} changed={session_refresh.changed}'
+                )
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Optional, cast
 
 from movie_pipeline_segments_validator.services.edit_decision_file_dumper import extract_title
 
@@ -10,10 +10,10 @@ from ..services.import_segments_from_file import import_segments
 from ..settings import Settings
 
 
-def import_media_segments(filepath: Path):
+def import_media_segments(filepath: Path, max_results: Optional[int] = None):
     return { 
         k: f"{v.removesuffix(',')}," 
-        for k, v in import_segments(filepath).items()
+        for k, v in import_segments(filepath, max_results).items()
         if v != ''
     }
 
@@ -30,7 +30,7 @@ class SegmentValidatorContext:
     selected_segments: list[Segment] = field(default_factory=list)
 
     def __post_init__(self):
-        self.imported_segments = import_media_segments(self.filepath)
+        self.imported_segments = import_media_segments(self.filepath, self.config.SegmentsJournal.max_imported_results)
 
         if self.title == '':
             self.title = extract_title(self.filepath, self.config)
@@ -1,6 +1,6 @@
 from typing import TypedDict
 
-from ..lib.util import seconds_to_position
+from ..lib.timestamp_codec import encode_segments
 
 
 class SimpleSegment(TypedDict):
@@ -14,10 +14,7 @@ class DetectedSegment(TypedDict):
 
 
 def humanize_segments(segments: list[SimpleSegment]) -> str:
-    return ','.join([
-        '-'.join(map(seconds_to_position, [segment['start'], segment['end']]))
-        for segment in segments
-    ])
+    return encode_segments((segment['start'], segment['end']) for segment in segments)
 
 
 def merge_adjacent_segments(segments: list[DetectedSegment], min_gap=0.1, min_duration=1200.) -> list[DetectedSegment]:
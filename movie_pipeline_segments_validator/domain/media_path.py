@@ -1,8 +1,10 @@
-import itertools
-import re
+import hashlib
+import os
 from dataclasses import dataclass, field
-from pathlib import Path
-from typing import Literal
+from pathlib import Path, PurePath
+from typing import Literal, Optional, cast
+
+from ..lib.timing import SIDECAR_IO_PHASE, timed
 
 MediaPathState = Literal[
     'waiting_metadata',
@@ -14,42 +16,115 @@ MediaPathState = Literal[
 ]
 
 
-def cache_media_dir_entries(root_path: Path, media_ext: str):
-    if not root_path.is_dir():
-        raise ValueError('root_path is not a directory')
+def media_names_of(entry_name: str, media_ext: str) -> list[str]:
+    """Names of the medias an entry belongs to: the entry itself when it is a media,
+    and every media its name starts with when it is a sidecar, ie `a.ts.b.ts.yml` belongs to `a.ts` and `a.ts.b.ts`"""
+    normalized_name, normalized_media_ext = os.path.normcase(entry_name), os.path.normcase(media_ext)
+    media_names = []
+
+    position = normalized_name.find(normalized_media_ext)
+    while position != -1:
+        media_name_end = position + len(media_ext)
+
+        if media_name_end == len(entry_name) or entry_name[media_name_end] == '.':
+            media_names.append(entry_name[:media_name_end])
+
+        position = normalized_name.find(normalized_media_ext, position + 1)
 
-    return set(
-        itertools.chain(
-            root_path.glob(f'*{media_ext}'),
-            root_path.glob(f'*{media_ext}.metadata.json'),
-            root_path.glob(f'*{media_ext}.segments.json'),
-            root_path.glob(f'*{media_ext}.*yml*'),
-        )
-    )
+    return media_names
 
 
 @dataclass
-class MediaPath:
-    path: Path
-    cached_media_dir_entries: set[Path] = field(repr=False, default_factory=set)
+class MediaDirIndex:
+    """Entries of a media directory, listed in one pass, with sidecar files grouped under their media name
 
-    def __post_init__(self):
-        if not len(self.cached_media_dir_entries):
-            self.cached_media_dir_entries = cache_media_dir_entries(self.path.parent, self.path.suffix)
+    A sidecar is any entry named `{media name}.{suffix}` (`.metadata.json`, `.segments.json`, `.yml`, `.yml.done`, ...)
+    """
+    root_path: Path
+    media_ext: str
+    media_names: list[str] = field(default_factory=list)
+    sidecar_suffixes: dict[str, set[str]] = field(default_factory=dict)
+
+    @classmethod
+    def scan(cls, root_path: Path, media_ext: str):
+        if not root_path.is_dir():
+            raise ValueError('root_path is not a directory')
+
+        index = cls(root_path, media_ext)
+
+        with timed(SIDECAR_IO_PHASE), os.scandir(root_path) as entries:
+            for entry in entries:
+                name = entry.name
+
+                for media_name in media_names_of(name, media_ext):
+                    if len(media_name) == len(name):
+                        index.media_names.append(name)
+                    else:
+                        index.sidecar_suffixes.setdefault(os.path.normcase(media_name), set()).add(name[len(media_name):])
+
+        return index
+
+    def media_index(self, media_path: Path) -> 'MediaDirIndex':
+        """Index restricted to a media and its sidecar files, giving the same state and fingerprint of this media"""
+        media_key = os.path.normcase(media_path.name)
+        sidecar_suffixes = {media_key: self.sidecar_suffixes[media_key]} if media_key in self.sidecar_suffixes else {}
+
+        return MediaDirIndex(self.root_path, self.media_ext, [media_path.name], sidecar_suffixes)
 
     @property
-    def state(self) -> MediaPathState:
-        media_processing_suffix_regex = re.compile(fr'{re.escape(self.path.name)}\..*yml.*')
+    def media_paths(self) -> list[Path]:
+        return [self.root_path / media_name for media_name in self.media_names]
+
+    def fingerprint(self, media_path: Path) -> str:
+        """Digest of the names, sizes and mtimes of the media and its sidecar files,
+        changing whenever one of them is added, removed or modified"""
+        digest = hashlib.blake2b(digest_size=16)
+        suffixes = self.sidecar_suffixes.get(os.path.normcase(media_path.name), set())
 
-        if self.path.with_suffix(f'{self.path.suffix}.yml.done') in self.cached_media_dir_entries:
+        for name in sorted([media_path.name, *(f'{media_path.name}{suffix}' for suffix in suffixes)]):
+            try:
+                stat = (media_path.parent / name).stat()
+            except OSError:
+                continue
+            digest.update(f'{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def state(self, media_path: Path) -> MediaPathState:
+        suffixes = self.sidecar_suffixes.get(os.path.normcase(media_path.name), set())
+        normalized_suffixes = {os.path.normcase(suffix) for suffix in suffixes}
+
+        if '.yml.done' in normalized_suffixes:
             return 'media_processed'
-        elif self.path.with_suffix(f'{self.path.suffix}.yml') in self.cached_media_dir_entries:
+        elif '.yml' in normalized_suffixes:
             return 'segment_reviewed'
-        elif self.path.with_suffix(f'{self.path.suffix}.metadata.json') not in self.cached_media_dir_entries:
+        elif '.metadata.json' not in normalized_suffixes:
             return 'waiting_metadata'
-        elif self.path.with_suffix(f'{self.path.suffix}.segments.json') not in self.cached_media_dir_entries:
+        elif '.segments.json' not in normalized_suffixes:
             return 'no_segment'
-        elif any(segment_file_edl.suffix != '.txt' for segment_file_edl in self.cached_media_dir_entries if media_processing_suffix_regex.match(segment_file_edl.name)):
+        elif any('yml' in suffix[1:] and PurePath(f'{media_path.name}{suffix}').suffix != '.txt' for suffix in suffixes):
             return 'media_processing'
         else:
             return 'waiting_segment_review'
+
+
+@dataclass
+class MediaPath:
+    path: Path
+    media_dir_index: Optional[MediaDirIndex] = field(repr=False, default=None)
+
+    def __post_init__(self):
+        if self.media_dir_index is None:
+            self.media_dir_index = MediaDirIndex.scan(self.path.parent, self.path.suffix)
+
+    def __getstate__(self):
+        # pickled for worker processes: only send the directory entries of this media, not the whole directory
+        return {**self.__dict__, 'media_dir_index': cast(MediaDirIndex, self.media_dir_index).media_index(self.path)}
+
+    @property
+    def state(self) -> MediaPathState:
+        return cast(MediaDirIndex, self.media_dir_index).state(self.path)
+
+    @property
+    def fingerprint(self) -> str:
+        return cast(MediaDirIndex, self.media_dir_index).fingerprint(self.path)
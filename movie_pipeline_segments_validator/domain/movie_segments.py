@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import cast
 
-from ..lib.util import position_in_seconds
+from ..lib.timestamp_codec import decode_segments
 
 
 segment_t = tuple[float, float]
@@ -12,12 +12,7 @@ class MovieSegments:
     segments: list[segment_t]
 
     def __init__(self, raw_segments: str) -> None:
-        splitted_raw_segments = raw_segments.removesuffix(',').split(',')
-
-        self.segments = [
-            cast(segment_t, tuple(position_in_seconds(x) for x in segment.split('-', 2)))
-            for segment in splitted_raw_segments
-        ] if splitted_raw_segments != [''] else []
+        self.segments = cast(list[segment_t], decode_segments(raw_segments))
 
     @property
     def total_seconds(self) -> float:
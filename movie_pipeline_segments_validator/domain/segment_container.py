@@ -1,7 +1,10 @@
-from pydantic import TypeAdapter
+import bisect
+import math
+from typing import Iterable, Optional
+
 from pydantic.dataclasses import dataclass
 
-from ..domain.detected_segments import humanize_segments
+from ..lib.timestamp_codec import encode_segments
 from ..lib.util import seconds_to_position
 
 
@@ -32,35 +35,98 @@ class Segment:
 
 
 class SegmentContainer:
+    """Segments kept sorted by (start, end), with their ends also sorted apart
+
+    A new segment overlaps the container when the start or the end of another segment falls within it,
+    which the two sorted arrays answer with four bisections instead of a scan of every segment.
+    """
+
     def __init__(self) -> None:
         self._segments: set[Segment] = set()
+        self._keys: list[tuple[float, float]] = []
+        self._sorted_segments: list[Segment] = []
+        self._ends: list[float] = []
+        self._segments_view: Optional[tuple[Segment, ...]] = None
 
     @property
     def segments(self):
-        return tuple(sorted(self._segments))
+        if self._segments_view is None:
+            self._segments_view = tuple(self._sorted_segments)
+
+        return self._segments_view
 
     @staticmethod
     def check_validity(segments, new_segment: Segment):
         return not any(segment.is_overlapping(new_segment) for segment in segments)
 
+    def is_valid(self, new_segment: Segment, ignored_segments: Iterable[Segment] = ()) -> bool:
+        """Same as `check_validity(segments, new_segment)` for the contained segments but ignored_segments"""
+        start, end = new_segment.start, new_segment.end
+        ignored_segments = {new_segment, *ignored_segments} & self._segments
+
+        starts_within = bisect.bisect_right(self._keys, (end, math.inf)) - bisect.bisect_left(self._keys, (start, -math.inf))
+        ends_within = bisect.bisect_right(self._ends, end) - bisect.bisect_left(self._ends, start)
+        ignored_bounds_within = sum(
+            (start <= segment.start <= end) + (start <= segment.end <= end)
+            for segment in ignored_segments
+        )
+
+        return starts_within + ends_within - ignored_bounds_within == 0
+
     def __repr__(self) -> str:
-        return humanize_segments(list(map(TypeAdapter(Segment).dump_python, self.segments)))
+        return encode_segments((segment.start, segment.end) for segment in self.segments)
 
     def add(self, segment: Segment):
-        if self.check_validity(self._segments, segment):
-            self._segments.add(segment)
+        if self.is_valid(segment):
+            self._insert(segment)
+
+    def add_many(self, segments: Iterable[Segment]):
+        """Add segments in order, skipping the ones overlapping the container like `add`"""
+        for segment in segments:
+            self.add(segment)
+
+    def copy(self) -> 'SegmentContainer':
+        """Independent container with the same segments, without checking their validity again"""
+        segment_container = SegmentContainer()
+        segment_container._segments = set(self._segments)
+        segment_container._keys = list(self._keys)
+        segment_container._sorted_segments = list(self._sorted_segments)
+        segment_container._ends = list(self._ends)
+        segment_container._segments_view = self._segments_view
+        return segment_container
 
     def remove(self, segment: Segment):
         self._segments.remove(segment)
+        self._delete(segment)
 
     def edit(self, old_segment: Segment, new_segment: Segment):
-        if self.check_validity([segment for segment in self._segments if segment != old_segment], new_segment):
-            self._segments.remove(old_segment)
-            self._segments.add(new_segment)
+        if self.is_valid(new_segment, ignored_segments=(old_segment,)):
+            self.remove(old_segment)
+            self._insert(new_segment)
 
     def merge(self, segments: list[Segment]):
-        self._segments -= set(segments)
+        for segment in set(segments) & self._segments:
+            self.remove(segment)
 
         sorted_segments = sorted(segments)
         merged_segment = Segment(sorted_segments[0].start, sorted_segments[-1].end)
-        self._segments.add(merged_segment)
+        self._insert(merged_segment)
+
+    def _insert(self, segment: Segment):
+        if segment in self._segments:
+            return
+
+        self._segments.add(segment)
+        key = (segment.start, segment.end)
+        index = bisect.bisect_left(self._keys, key)
+        self._keys.insert(index, key)
+        self._sorted_segments.insert(index, segment)
+        bisect.insort(self._ends, segment.end)
+        self._segments_view = None
+
+    def _delete(self, segment: Segment):
+        index = bisect.bisect_left(self._keys, (segment.start, segment.end))
+        del self._keys[index]
+        del self._sorted_segments[index]
+        del self._ends[bisect.bisect_left(self._ends, segment.end)]
+        self._segments_view = None
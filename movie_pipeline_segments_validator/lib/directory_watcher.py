@@ -0,0 +1,264 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Event, Thread, current_thread
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+ChangeCallback = Callable[[set[str]], None]
+
+NETWORK_FILESYSTEM_TYPES = ('cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'afs', '9p', 'ceph', 'fuse.sshfs', 'fuse.rclone')
+
+# cf inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class DirectoryWatcher(ABC):
+    """Watch the entries of a directory (not recursively) from a background thread
+
+    Changed entry names are reported in batches to `on_change` once no change happened for `debounce_s`,
+    or at the latest `max_delay_s` after the first change of the batch. An empty batch means the changes
+    are unknown (ie the event queue overflowed) and the whole directory must be considered changed.
+    """
+
+    def __init__(self, path: Path, on_change: ChangeCallback, debounce_s: float, max_delay_s: float) -> None:
+        self._path = path
+        self._on_change = on_change
+        self._debounce_s = debounce_s
+        self._max_delay_s = max_delay_s
+
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def start(self):
+        self._thread = Thread(target=self._run, name=f'directory-watcher-{self._path.name}', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+
+        if self._thread is not None and self._thread is not current_thread():
+            self._thread.join(timeout=5)
+
+    def _release(self):
+        """Release resources held by the watch once its thread stopped"""
+        pass
+
+    @abstractmethod
+    def _read_changes(self, timeout_s: float) -> Optional[set[str]]:
+        """Wait at most timeout_s for changes, returning changed entry names, None if changes are unknown"""
+        ...
+
+    def _run(self):
+        try:
+            self._watch()
+        finally:
+            self._release()
+
+    def _watch(self):
+        pending_changes: set[str] = set()
+        unknown_changes = False
+        first_change_at = last_change_at = 0.
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            has_pending_changes = unknown_changes or len(pending_changes) > 0
+            timeout_s = min(last_change_at + self._debounce_s, first_change_at + self._max_delay_s) - now if has_pending_changes else 1.
+
+            try:
+                changes = self._read_changes(max(timeout_s, 0.))
+            except OSError:
+                logger.exception(f'Unable to watch {self._path}')
+                self._stop.wait(self._debounce_s)
+                continue
+
+            now = time.monotonic()
+            if changes is None or len(changes) > 0:
+                if not has_pending_changes:
+                    first_change_at = now
+                last_change_at = now
+                unknown_changes = unknown_changes or changes is None
+                pending_changes |= changes or set()
+
+            if (unknown_changes or len(pending_changes) > 0) \
+                    and (now - last_change_at >= self._debounce_s or now - first_change_at >= self._max_delay_s):
+                try:
+                    self._on_change(set() if unknown_changes else pending_changes)
+                except Exception:
+                    logger.exception(f'Unable to handle changes in {self._path}')
+
+                pending_changes, unknown_changes = set(), False
+
+
+class PollingDirectoryWatcher(DirectoryWatcher):
+    """Detect changes by comparing the size and mtime of the directory entries every `poll_interval_s`,
+    the only reliable option on network shares where remote writes do not raise local notifications"""
+
+    def __init__(self, path: Path, on_change: ChangeCallback, debounce_s: float, max_delay_s: float, poll_interval_s: float) -> None:
+        super().__init__(path, on_change, debounce_s, max_delay_s)
+        self._poll_interval_s = poll_interval_s
+        self._snapshot = self._take_snapshot()
+        self._next_poll_at = time.monotonic() + poll_interval_s
+
+    def _take_snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+
+        with os.scandir(self._path) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+        return snapshot
+
+    def _read_changes(self, timeout_s: float) -> Optional[set[str]]:
+        if self._stop.wait(max(min(timeout_s, self._next_poll_at - time.monotonic()), 0.)):
+            return set()
+
+        if time.monotonic() < self._next_poll_at:
+            return set()
+
+        self._next_poll_at = time.monotonic() + self._poll_interval_s
+        snapshot, previous_snapshot = self._take_snapshot(), self._snapshot
+        self._snapshot = snapshot
+
+        return {
+            name for name in snapshot.keys() | previous_snapshot.keys()
+            if snapshot.get(name) != previous_snapshot.get(name)
+        }
+
+
+class InotifyDirectoryWatcher(DirectoryWatcher):
+    """Detect changes from inotify events (Linux only)"""
+
+    def __init__(self, path: Path, on_change: ChangeCallback, debounce_s: float, max_delay_s: float) -> None:
+        super().__init__(path, on_change, debounce_s, max_delay_s)
+
+        libc = _load_libc()
+        if libc is None:
+            raise OSError('inotify is not available')
+
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), IN_WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f'inotify_add_watch failed for {path}')
+
+    def _release(self):
+        os.close(self._fd)
+
+    def _read_changes(self, timeout_s: float) -> Optional[set[str]]:
+        readable, _, _ = select.select([self._fd], [], [], timeout_s)
+        if not readable:
+            return set()
+
+        try:
+            buffer = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changes: set[str] = set()
+        offset = 0
+
+        while offset + _INOTIFY_EVENT.size <= len(buffer):
+            _, mask, _, name_length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += _INOTIFY_EVENT.size
+            name = buffer[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                return None
+
+            if name:
+                changes.add(os.fsdecode(name))
+
+        return changes
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+
+    if not hasattr(libc, 'inotify_init1'):
+        return None
+
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    return libc
+
+
+def is_network_filesystem(path: Path) -> bool:
+    """Whether path is on a network filesystem according to /proc/mounts, False when unknown"""
+    try:
+        mounts = Path('/proc/mounts').read_text(encoding='utf-8').splitlines()
+    except OSError:
+        return False
+
+    resolved_path = str(path.resolve())
+    mount_points = (
+        (mount_point.replace('\\040', ' '), filesystem_type)
+        for _, mount_point, filesystem_type, *_ in (mount.split() for mount in mounts if len(mount.split()) >= 3)
+    )
+    matching_mount_points = [
+        (mount_point, filesystem_type) for mount_point, filesystem_type in mount_points
+        if resolved_path == mount_point or resolved_path.startswith(mount_point.rstrip('/') + '/')
+    ]
+
+    if not matching_mount_points:
+        return False
+
+    _, filesystem_type = max(matching_mount_points, key=lambda mount: len(mount[0]))
+    return filesystem_type in NETWORK_FILESYSTEM_TYPES
+
+
+def create_directory_watcher(
+        path: Path,
+        on_change: ChangeCallback,
+        debounce_s: float,
+        max_delay_s: float,
+        poll_interval_s: float,
+        force_polling=False
+    ) -> DirectoryWatcher:
+    """Create a started watcher, backed by inotify when available and path is local, else by stat polling"""
+    watcher: DirectoryWatcher
+
+    if force_polling or is_network_filesystem(path):
+        watcher = PollingDirectoryWatcher(path, on_change, debounce_s, max_delay_s, poll_interval_s)
+    else:
+        try:
+            watcher = InotifyDirectoryWatcher(path, on_change, debounce_s, max_delay_s)
+        except OSError:
+            logger.debug(f'Fallback to polling to watch {path}', exc_info=True)
+            watcher = PollingDirectoryWatcher(path, on_change, debounce_s, max_delay_s, poll_interval_s)
+
+    watcher.start()
+    return watcher
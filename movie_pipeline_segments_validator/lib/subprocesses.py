@@ -0,0 +1,189 @@
+import asyncio
+import os
+import subprocess
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager, suppress
+from threading import Event, Lock, Timer
+from typing import Callable, Iterator, Optional, Sequence
+
+from .timing import SUBPROCESS_PHASE, SUBPROCESS_WAIT_PHASE, timed
+
+
+class SubprocessSlotsExhausted(Exception):
+    pass
+
+
+class _Waiter:
+    __slots__ = ('wake', 'granted')
+
+    def __init__(self, wake: Callable[[], None]) -> None:
+        self.wake = wake
+        self.granted = False
+
+
+def _set_result_unless_done(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SubprocessSlots:
+    """Admission limit of concurrently running subprocesses, shared by threads and event loops
+
+    Beyond `max_running` (the CPU count by default), callers wait for a slot first come first served,
+    at most `max_waiting` of them and for `wait_timeout_s`, SubprocessSlotsExhausted being raised otherwise.
+    """
+
+    def __init__(self, max_running: Optional[int] = None, max_waiting=64, wait_timeout_s=10.) -> None:
+        self._lock = Lock()
+        self._running = 0
+        self._waiters: deque[_Waiter] = deque()
+        self.configure(max_running, max_waiting, wait_timeout_s)
+
+    def configure(self, max_running: Optional[int] = None, max_waiting=64, wait_timeout_s=10.):
+        with self._lock:
+            self.max_running = max_running or os.cpu_count() or 1
+            self.max_waiting = max_waiting
+            self.wait_timeout_s = wait_timeout_s
+            self._grant_waiters()
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @contextmanager
+    def acquire(self):
+        """Hold a slot, blocking the thread while waiting for it"""
+        event = Event()
+        waiter = _Waiter(event.set)
+
+        if not self._admit(waiter):
+            with timed(SUBPROCESS_WAIT_PHASE):
+                if not event.wait(self.wait_timeout_s) and not self._abandon(waiter):
+                    raise self._exhausted()
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def acquire_async(self):
+        """Hold a slot, waiting for it without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(_set_result_unless_done, future))
+
+        if not self._admit(waiter):
+            with timed(SUBPROCESS_WAIT_PHASE):
+                try:
+                    await asyncio.wait_for(future, self.wait_timeout_s)
+                except TimeoutError:
+                    if not self._abandon(waiter):
+                        raise self._exhausted() from None
+                except asyncio.CancelledError:
+                    if self._abandon(waiter):
+                        self._release()
+                    raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _admit(self, waiter: _Waiter) -> bool:
+        """Take a slot right away, otherwise queue waiter, returning whether a slot was taken"""
+        with self._lock:
+            if self._running < self.max_running and not self._waiters:
+                self._running += 1
+                return True
+
+            if len(self._waiters) >= self.max_waiting:
+                raise self._exhausted()
+
+            self._waiters.append(waiter)
+            return False
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Stop waiting, returning whether waiter was granted a slot meanwhile, then held by the caller"""
+        with self._lock:
+            if waiter.granted:
+                return True
+
+            self._waiters.remove(waiter)
+            return False
+
+    def _release(self):
+        with self._lock:
+            self._running -= 1
+            self._grant_waiters()
+
+    def _grant_waiters(self):
+        while self._waiters and self._running < self.max_running:
+            waiter = self._waiters.popleft()
+            try:
+                waiter.wake()
+            except RuntimeError:
+                continue  # event loop of the waiter closed, nobody is left to take the slot
+
+            waiter.granted = True
+            self._running += 1
+
+    def _exhausted(self):
+        return SubprocessSlotsExhausted(f'{self._running} subprocesses running and {len(self._waiters)} waiting, retry later')
+
+
+subprocess_slots = SubprocessSlots()
+
+
+def run_subprocess(cmd: Sequence[str]) -> subprocess.CompletedProcess[bytes]:
+    """Run cmd once a subprocess slot is available, capturing its output"""
+    with subprocess_slots.acquire(), timed(SUBPROCESS_PHASE):
+        return subprocess.run(cmd, capture_output=True)
+
+
+@contextmanager
+def open_subprocess(cmd: Sequence[str], timeout_s: float) -> Iterator[subprocess.Popen[str]]:
+    """Start cmd once a subprocess slot is available, holding the slot while its text output is streamed
+
+    Raises:
+        subprocess.TimeoutExpired: when the subprocess was killed after running for timeout_s
+    """
+    timed_out = Event()
+
+    with subprocess_slots.acquire(), timed(SUBPROCESS_PHASE):
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as process:
+            def kill():
+                timed_out.set()
+                process.kill()
+
+            timer = Timer(timeout_s, kill)
+            timer.start()
+
+            try:
+                yield process
+            finally:
+                timer.cancel()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout_s)
+
+
+async def run_subprocess_async(cmd: Sequence[str]) -> subprocess.CompletedProcess[bytes]:
+    """Run cmd like `run_subprocess` without holding a thread, killing the subprocess when cancelled"""
+    async with subprocess_slots.acquire_async():
+        with timed(SUBPROCESS_PHASE):
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+
+            try:
+                stdout, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                with suppress(ProcessLookupError):
+                    process.kill()
+                await process.wait()
+                raise
+
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
@@ -0,0 +1,101 @@
+"""Encode and decode `HH:MM:SS.mmm` positions and `start-end,start-end` segment strings
+
+Outputs are the same, byte for byte, as the historical implementations: `time.gmtime` based encoding,
+hours wrapping every 24 hours and `'1.000'` carry when the fractional part rounds up to one second
+(eg `'00:00:051.000'` for 5.9999 seconds), and `timedelta` based decoding, rounded to the microsecond.
+
+The bulk functions run on NumPy arrays, falling back to the scalar functions for the values the
+vectorized path cannot reproduce exactly (fractional parts within rounding error of a half millisecond,
+positions not shaped like `HH:MM:SS.mmm` or `HH:MM:SS.mm`).
+"""
+import math
+import re
+from typing import Iterable, Sequence
+
+import numpy as np
+
+BULK_MIN_SIZE = 16
+
+_DAY_S = 86400
+_HALF_MILLISECOND_TIE_TOLERANCE = 1e-9
+_FIXED_POSITION_REGEX = re.compile(r'[0-9]{2}:[0-9]{2}:[0-9]{2}\.[0-9]{2,3}')
+_ZERO = ord('0')
+
+
+def encode_position(seconds: float) -> str:
+    whole_seconds = math.floor(seconds)
+    hours, remaining_seconds = divmod(whole_seconds % _DAY_S, 3600)
+    minutes, secs = divmod(remaining_seconds, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{f'{seconds % 1:.3f}'.removeprefix('0')}"
+
+
+def decode_position(position: str) -> float:
+    hours, minutes, seconds = position.split(':', maxsplit=3)
+    fractional_seconds, whole_seconds = math.modf(float(seconds))
+    microseconds = (int(hours) * 3600 + int(minutes) * 60 + int(whole_seconds)) * 1_000_000 + round(fractional_seconds * 1e6)
+    return microseconds / 1_000_000
+
+
+def encode_positions(seconds: Sequence[float]) -> list[str]:
+    """Same as `[encode_position(s) for s in seconds]`"""
+    if len(seconds) < BULK_MIN_SIZE:
+        return [encode_position(s) for s in seconds]
+
+    values = np.asarray(seconds, dtype=np.float64)
+    if not np.isfinite(values).all():
+        return [encode_position(s) for s in seconds]
+
+    whole_seconds = np.floor(values).astype(np.int64)
+    hours, remaining_seconds = np.divmod(np.mod(whole_seconds, _DAY_S), 3600)
+    minutes, secs = np.divmod(remaining_seconds, 60)
+
+    scaled_fractions = np.mod(values, 1.) * 1000.
+    milliseconds = np.rint(scaled_fractions).astype(np.int64)
+    near_ties = np.abs(np.abs(scaled_fractions - np.floor(scaled_fractions)) - .5) < _HALF_MILLISECOND_TIE_TOLERANCE
+
+    positions = [
+        f'{h:02d}:{m:02d}:{s:02d}.{ms:03d}' if ms < 1000 else f'{h:02d}:{m:02d}:{s:02d}1.000'
+        for h, m, s, ms in zip(hours.tolist(), minutes.tolist(), secs.tolist(), milliseconds.tolist())
+    ]
+
+    for index in np.flatnonzero(near_ties).tolist():
+        positions[index] = encode_position(float(values[index]))
+
+    return positions
+
+
+def decode_positions(positions: Sequence[str]) -> list[float]:
+    """Same as `[decode_position(p) for p in positions]`"""
+    if len(positions) < BULK_MIN_SIZE:
+        return [decode_position(position) for position in positions]
+
+    lengths = {len(position) for position in positions}
+    if len(lengths) != 1 or not all(_FIXED_POSITION_REGEX.fullmatch(position) for position in positions):
+        return [decode_position(position) for position in positions]
+
+    digits = np.frombuffer(''.join(positions).encode('ascii'), dtype=np.uint8).reshape(len(positions), -1).astype(np.int64) - _ZERO
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 3] * 10 + digits[:, 4]
+    secs = digits[:, 6] * 10 + digits[:, 7]
+    milliseconds = digits[:, 9] * 100 + digits[:, 10] * 10 + (digits[:, 11] if digits.shape[1] == 12 else 0)
+
+    # total milliseconds are exact integers, so that one division rounds like timedelta to the microsecond
+    return (((hours * 3600 + minutes * 60 + secs) * 1000 + milliseconds) / 1000.).tolist()
+
+
+def encode_segments(segments: Iterable[tuple[float, float]]) -> str:
+    """Format segments as `start-end,start-end`, like `humanize_segments`"""
+    bounds = [bound for segment in segments for bound in segment]
+    positions = encode_positions(bounds)
+    return ','.join(f'{start}-{end}' for start, end in zip(positions[::2], positions[1::2]))
+
+
+def decode_segments(raw_segments: str) -> list[tuple[float, ...]]:
+    """Parse `start-end,start-end` segments (trailing comma allowed), like `MovieSegments`"""
+    splitted_raw_segments = raw_segments.removesuffix(',').split(',')
+    if splitted_raw_segments == ['']:
+        return []
+
+    raw_bounds = [raw_segment.split('-', 2) for raw_segment in splitted_raw_segments]
+    bounds = iter(decode_positions([raw_bound for segment_raw_bounds in raw_bounds for raw_bound in segment_raw_bounds]))
+    return [tuple(next(bounds) for _ in segment_raw_bounds) for segment_raw_bounds in raw_bounds]
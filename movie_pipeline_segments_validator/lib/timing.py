@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from time import perf_counter
+from typing import Optional
+
+DB_PHASE = 'db'
+SUBPROCESS_PHASE = 'subprocess'
+SUBPROCESS_WAIT_PHASE = 'subprocess_wait'
+SIDECAR_IO_PHASE = 'sidecar_io'
+SERIALIZATION_PHASE = 'serialization'
+
+
+class RequestTimings:
+    """Time spent by a request in each phase, accumulated over the calls of the phase"""
+
+    def __init__(self) -> None:
+        self.phases: dict[str, list[float]] = {}
+        self.endpoint_returned_at: Optional[float] = None
+
+    def add(self, phase: str, duration_s: float):
+        if (phase_timings := self.phases.get(phase)) is None:
+            self.phases[phase] = [duration_s, 1]
+        else:
+            phase_timings[0] += duration_s
+            phase_timings[1] += 1
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def start_request_timings() -> tuple[RequestTimings, Token]:
+    request_timings = RequestTimings()
+    return request_timings, _request_timings.set(request_timings)
+
+
+def stop_request_timings(token: Token):
+    _request_timings.reset(token)
+
+
+def mark_endpoint_returned():
+    """Record the end of the endpoint call, the response serialization starting from there"""
+    if (request_timings := _request_timings.get()) is not None:
+        request_timings.endpoint_returned_at = perf_counter()
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the time spent in the block to `phase` of the current request timings, if any
+
+    Timings are only recorded in the context of a timed request, so the block is run as is otherwise,
+    as well as in threads not started with a copy of the request context.
+    """
+    if (request_timings := _request_timings.get()) is None:
+        yield
+        return
+
+    started_at = perf_counter()
+    try:
+        yield
+    finally:
+        request_timings.add(phase, perf_counter() - started_at)
@@ -4,6 +4,7 @@ from pathlib import Path
 import json
 import re
 
+from ..timing import SIDECAR_IO_PHASE, timed
 from .strategy import expanded_subtitle_title, naive_title, subtitle_aware_title
 from .title_cleaner import TitleCleaner
 
@@ -15,8 +16,9 @@ forbidden_char_pattern = re.compile(r'[\/:*?<>|"]')
 def load_metadata(movie_path: Path, cache_busting_key: int):
     movie_metadata_path = movie_path.with_suffix(f'{movie_path.suffix}.metadata.json')
 
-    if movie_metadata_path.exists():
-        return json.loads(movie_metadata_path.read_text(encoding='utf-8'))
+    with timed(SIDECAR_IO_PHASE):
+        if movie_metadata_path.exists():
+            return json.loads(movie_metadata_path.read_text(encoding='utf-8'))
 
 
 class ITitleExtractor(ABC):
@@ -5,6 +5,9 @@ from ...lib.util import remove_diacritics
 ExtractorParams = tuple[str, re.Pattern[str]]
 serie_hints = ['Série', 'Saison', 'Mini-série']
 serie_hints_location = ['description', 'title', 'sub_title']
+serie_episode_pattern = re.compile(r'S\d{2}E\d{2,3}')
+serie_episode_title_pattern = re.compile(r'(?P<showtitle>^.+)__(?P<title>.+)')
+quoted_serie_episode_title_pattern = re.compile(r"(?P<showtitle>[\w&àéèï'!., ()\[\]#-]+) '(?P<title>.+)'")
 
 
 def extract_serie_field(metadata, extractor_params: ExtractorParams):
@@ -24,11 +27,10 @@ def is_serie_from_supplied_value(supplied_value: str | dict):
 
 
 def extract_title_serie_episode_from_metadata(normalized_title_series_extracted_metadata: dict[str, dict[str, dict[str, str]]], extracted_title: str):
-    if re.search(r'S\d{2}E\d{2,3}', extracted_title) is not None:
+    if serie_episode_pattern.search(extracted_title) is not None:
         return extracted_title
 
-    m = re.match(r'(?P<showtitle>^.+)__(?P<title>.+)', extracted_title) \
-        or re.match(r"(?P<showtitle>[\w&àéèï'!., ()\[\]#-]+) '(?P<title>.+)'", extracted_title)
+    m = serie_episode_title_pattern.match(extracted_title) or quoted_serie_episode_title_pattern.match(extracted_title)
 
     if m is not None:
         show_title, episode_title = m.group('showtitle'), remove_diacritics(m.group('title').lower())
@@ -1,35 +1,34 @@
+import json
 import re
 import subprocess
-import time
 import unicodedata
-from datetime import timedelta
 from pathlib import Path
 
+from .timestamp_codec import encode_position
+from .subprocesses import run_subprocess, run_subprocess_async
 
-def position_in_seconds(time: str) -> float:
-    hours, mins, secs = time.split(':', maxsplit=3)
 
-    return timedelta(
-        hours=int(hours),
-        minutes=int(mins),
-        seconds=float(secs)
-    ).total_seconds()
+def seconds_to_position(seconds: float) -> str:
+    return encode_position(seconds)
 
 
-def seconds_to_position(seconds: float) -> str:
-    formatted_time = time.strftime('%H:%M:%S', time.gmtime(seconds))
-    formatted_decimal_part = f'{(seconds % 1):.3f}'.removeprefix('0')
-    return f"{formatted_time}{formatted_decimal_part}"
+def _probe_movie_cmd(movie_file_path: Path | str):
+    return ('ffprobe', '-v', 'quiet', '-show_format', '-show_streams', '-of', 'json', str(movie_file_path))
+
+
+def _check_output(process: subprocess.CompletedProcess[bytes]) -> bytes:
+    process.check_returncode()
+    return process.stdout
+
 
+def probe_movie(movie_file_path: Path | str) -> dict:
+    """Format and streams of a movie from a single ffprobe call"""
+    return json.loads(_check_output(run_subprocess(_probe_movie_cmd(movie_file_path))))
 
-def total_movie_duration(movie_file_path: Path | str) -> float:
-    # cf https://trac.ffmpeg.org/wiki/FFprobeTips#Duration
-    cmds = [
-        ('ffprobe', '-v', 'quiet', '-select_streams', 'v:0', '-show_entries', 'stream=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(movie_file_path)),
-        ('ffprobe', '-v', 'quiet', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(movie_file_path))
-    ]
 
-    return float(next((duration for cmd in cmds if (duration := subprocess.check_output(cmd).splitlines()[0]) != b'N/A'), -1))
+async def probe_movie_async(movie_file_path: Path | str) -> dict:
+    """Like `probe_movie`, without holding a thread while ffprobe runs"""
+    return json.loads(_check_output(await run_subprocess_async(_probe_movie_cmd(movie_file_path))))
 
 
 def remove_diacritics(text: str) -> str:
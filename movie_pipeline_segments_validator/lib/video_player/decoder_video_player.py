@@ -0,0 +1,148 @@
+import json
+import logging
+import time
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Optional
+
+import numpy as np
+from deffcode import FFdecoder
+
+from .video_player import IVideoPlayer
+
+logger = logging.getLogger(__name__)
+
+
+class DecoderVideoPlayer(IVideoPlayer):
+    """Video player keeping a deffcode decoder open between frame reads
+
+    The decoder keeps its demuxer state, so a nearby forward position is served by decoding ahead
+    instead of re-opening, re-probing and re-seeking the media.
+    """
+
+    def __init__(self, source: Path, max_decode_ahead_s=5., custom_ffmpeg='') -> None:
+        super().__init__(source)
+        self._max_decode_ahead_s = max_decode_ahead_s
+        self._custom_ffmpeg = custom_ffmpeg
+
+        self._lock = Lock()
+        self._decoder: Optional[FFdecoder] = None
+        self._frames = iter(())
+        self._frame_duration = 1 / 25
+        self._next_frame_position = 0.
+        self._last_frame: Optional[np.ndarray] = None
+        self._last_frame_position = 0.
+        self.last_used_at = time.monotonic()
+
+    def touch(self):
+        self.last_used_at = time.monotonic()
+
+    def read_frame(self, position: float) -> np.ndarray:
+        """Read the rgb24 frame displayed at position, decoding ahead when position is shortly after the last read frame"""
+        with self._lock:
+            self.touch()
+            self.set_position(position)
+
+            if self._last_frame is not None and abs(position - self._last_frame_position) < self._frame_duration / 2:
+                return self._last_frame
+
+            min_position = self._next_frame_position - self._frame_duration / 2
+            if self._decoder is None or not min_position <= position <= self._next_frame_position + self._max_decode_ahead_s:
+                self._open(position)
+
+            while True:
+                if (frame := next(self._frames, None)) is None:
+                    self._close_decoder()
+                    raise ValueError(f'No frame at {position}s in {self._source}')
+
+                frame_position = self._next_frame_position
+                self._next_frame_position += self._frame_duration
+
+                if frame_position + self._frame_duration / 2 > position:
+                    break
+
+            self._last_frame, self._last_frame_position = frame, frame_position
+            return frame
+
+    def close(self):
+        with self._lock:
+            self._close_decoder()
+
+    def _open(self, position: float):
+        self._close_decoder()
+        logger.debug(f'Open decoder for {self._source} at {position}s')
+
+        self._decoder = FFdecoder(
+            str(self._source),
+            frame_format='rgb24',
+            custom_ffmpeg=self._custom_ffmpeg,
+            **{'-ffprefixes': ['-ss', str(position)]}
+        ).formulate()
+
+        metadata = json.loads(self._decoder.metadata)
+        framerate = metadata.get('output_framerate') or metadata.get('source_video_framerate') or 25
+        self._frame_duration = 1 / framerate
+        self._duration = float(metadata.get('source_duration_sec') or 0)
+
+        self._frames = self._decoder.generateFrame()
+        self._next_frame_position = position
+
+    def _close_decoder(self):
+        if self._decoder is not None:
+            self._decoder.terminate()
+
+        self._decoder = None
+        self._frames = iter(())
+        self._last_frame = None
+
+
+class DecoderVideoPlayerPool:
+    """Long-lived decoder per open media, reaped after an idle timeout"""
+
+    def __init__(self, idle_timeout_s: float, max_decode_ahead_s: float, custom_ffmpeg='') -> None:
+        self._idle_timeout_s = idle_timeout_s
+        self._max_decode_ahead_s = max_decode_ahead_s
+        self._custom_ffmpeg = custom_ffmpeg
+
+        self._lock = Lock()
+        self._players: dict[Path, DecoderVideoPlayer] = {}
+        self._stop_reaper = Event()
+        self._reaper: Optional[Thread] = None
+
+    def get(self, source: Path) -> DecoderVideoPlayer:
+        with self._lock:
+            if (player := self._players.get(source)) is None:
+                player = self._players[source] = DecoderVideoPlayer(source, self._max_decode_ahead_s, self._custom_ffmpeg)
+
+            player.touch()
+
+            if self._reaper is None:
+                self._reaper = Thread(target=self._reap_periodically, name='decoder-reaper', daemon=True)
+                self._reaper.start()
+
+        return player
+
+    def reap_idle(self):
+        now = time.monotonic()
+
+        with self._lock:
+            idle_sources = [source for source, player in self._players.items() if now - player.last_used_at > self._idle_timeout_s]
+            idle_players = {source: self._players.pop(source) for source in idle_sources}
+
+        for source, player in idle_players.items():
+            logger.debug(f'Reap idle decoder for {source}')
+            player.close()
+
+    def close(self):
+        self._stop_reaper.set()
+
+        with self._lock:
+            players = list(self._players.values())
+            self._players.clear()
+
+        for player in players:
+            player.close()
+
+    def _reap_periodically(self):
+        while not self._stop_reaper.wait(self._idle_timeout_s / 2):
+            self.reap_idle()
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FrameCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_entries: int = 0
+    memory_bytes: int = 0
+    disk_entries: int = 0
+    disk_bytes: int = 0
+
+
+class FrameCache:
+    """Two-tier LRU cache of encoded video frames: a bounded in-memory tier backed by a size-bounded directory"""
+
+    def __init__(self, disk_path: Path, memory_max_bytes: int, disk_max_bytes: int, position_step_s: float) -> None:
+        self._disk_path = disk_path
+        self._memory_max_bytes = memory_max_bytes
+        self._disk_max_bytes = disk_max_bytes
+        self._position_step_s = position_step_s
+
+        self._lock = Lock()
+        self._memory_entries: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_entries: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._stats = FrameCacheStats()
+
+        if self._disk_max_bytes > 0:
+            self._disk_path.mkdir(parents=True, exist_ok=True)
+            self._load_disk_entries()
+
+    @property
+    def stats(self) -> FrameCacheStats:
+        with self._lock:
+            return FrameCacheStats(
+                memory_hits=self._stats.memory_hits,
+                disk_hits=self._stats.disk_hits,
+                misses=self._stats.misses,
+                memory_entries=len(self._memory_entries),
+                memory_bytes=self._memory_bytes,
+                disk_entries=len(self._disk_entries),
+                disk_bytes=self._disk_bytes
+            )
+
+    def quantize(self, position_s: float) -> float:
+        return round(round(position_s / self._position_step_s) * self._position_step_s, 6)
+
+    def key(self, filepath: Path, position_s: float, **output_options) -> str:
+        """Key a frame on media identity (path, mtime, size), quantized position and output options"""
+        stat = filepath.stat()
+        raw_key = json.dumps(
+            [str(filepath.resolve()), stat.st_mtime_ns, stat.st_size, self.quantize(position_s), output_options],
+            sort_keys=True
+        )
+        return hashlib.sha256(raw_key.encode('utf-8')).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._memory_entries or key in self._disk_entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if (frame := self._memory_entries.get(key)) is not None:
+                self._memory_entries.move_to_end(key)
+                self._stats.memory_hits += 1
+                return frame
+
+            if key in self._disk_entries:
+                try:
+                    entry_path = self._disk_entry_path(key)
+                    frame = entry_path.read_bytes()
+                    os.utime(entry_path)  # keep LRU order across restarts
+                except OSError:
+                    self._forget_disk_entry(key)
+                else:
+                    self._disk_entries.move_to_end(key)
+                    self._store_in_memory(key, frame)
+                    self._stats.disk_hits += 1
+                    return frame
+
+            self._stats.misses += 1
+            return None
+
+    def set(self, key: str, frame: bytes) -> None:
+        with self._lock:
+            self._store_in_memory(key, frame)
+            self._store_on_disk(key, frame)
+
+    def get_or_extract(self, filepath: Path, position_s: float, extract: Callable[[float], bytes], **output_options) -> bytes:
+        """Return the cached frame at quantized position or extract it with `extract` and cache it"""
+        key = self.key(filepath, position_s, **output_options)
+
+        if (frame := self.get(key)) is not None:
+            return frame
+
+        frame = extract(self.quantize(position_s))
+        self.set(key, frame)
+        return frame
+
+    async def get_async(self, filepath: Path, position_s: float, **output_options) -> tuple[str, Optional[bytes]]:
+        """Key and cached frame at quantized position like `key` and `get`, run in a worker thread so that
+        neither a slow disk nor the cache lock held by other threads blocks the event loop"""
+        def get() -> tuple[str, Optional[bytes]]:
+            key = self.key(filepath, position_s, **output_options)
+            return key, self.get(key)
+
+        return await asyncio.to_thread(get)
+
+    async def set_async(self, key: str, frame: bytes) -> None:
+        """Like `set`, run in a worker thread"""
+        await asyncio.to_thread(self.set, key, frame)
+
+    async def get_or_extract_async(self, filepath: Path, position_s: float, extract: Callable[[float], Awaitable[bytes]], **output_options) -> bytes:
+        """Like `get_or_extract`, awaiting `extract` on cache miss, the cache being looked up and filled in a worker thread"""
+        key, frame = await self.get_async(filepath, position_s, **output_options)
+
+        if frame is not None:
+            return frame
+
+        frame = await extract(self.quantize(position_s))
+        await self.set_async(key, frame)
+        return frame
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory_entries.clear()
+            self._memory_bytes = 0
+
+            for key in list(self._disk_entries):
+                self._disk_entry_path(key).unlink(missing_ok=True)
+                self._forget_disk_entry(key)
+
+    def _disk_entry_path(self, key: str) -> Path:
+        return self._disk_path / f'{key}.frame'
+
+    def _load_disk_entries(self):
+        entries = sorted(
+            (stat.st_mtime_ns, entry.name.removesuffix('.frame'), stat.st_size)
+            for entry in os.scandir(self._disk_path)
+            if entry.is_file() and entry.name.endswith('.frame') and (stat := entry.stat())
+        )
+
+        for _, key, size in entries:
+            self._disk_entries[key] = size
+            self._disk_bytes += size
+
+        self._evict_from_disk()
+
+    def _store_in_memory(self, key: str, frame: bytes):
+        if len(frame) > self._memory_max_bytes:
+            return
+
+        if (previous_frame := self._memory_entries.pop(key, None)) is not None:
+            self._memory_bytes -= len(previous_frame)
+
+        self._memory_entries[key] = frame
+        self._memory_bytes += len(frame)
+
+        while self._memory_bytes > self._memory_max_bytes:
+            _, evicted_frame = self._memory_entries.popitem(last=False)
+            self._memory_bytes -= len(evicted_frame)
+
+    def _store_on_disk(self, key: str, frame: bytes):
+        if len(frame) > self._disk_max_bytes or key in self._disk_entries:
+            return
+
+        entry_path = self._disk_entry_path(key)
+        tmp_entry_path = entry_path.with_suffix('.tmp')
+
+        try:
+            tmp_entry_path.write_bytes(frame)
+            os.replace(tmp_entry_path, entry_path)
+        except OSError:
+            logger.exception(f'Unable to write frame cache entry {entry_path}')
+            return
+
+        self._disk_entries[key] = len(frame)
+        self._disk_bytes += len(frame)
+        self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        while self._disk_bytes > self._disk_max_bytes:
+            key = next(iter(self._disk_entries))
+            self._disk_entry_path(key).unlink(missing_ok=True)
+            self._forget_disk_entry(key)
+
+    def _forget_disk_entry(self, key: str):
+        self._disk_bytes -= self._disk_entries.pop(key)
@@ -0,0 +1,21 @@
+import struct
+import zlib
+
+import numpy as np
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+
+def encode_png(frame: np.ndarray, compress_level=1) -> bytes:
+    """Encode a rgb24 frame (height x width x 3 uint8 array) to PNG without any imaging library"""
+    height, width, _ = frame.shape
+    scanlines = np.hstack((np.zeros((height, 1), dtype=np.uint8), frame.reshape(height, width * 3)))
+
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        _png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), compress_level)),
+        _png_chunk(b'IEND', b'')
+    ))
@@ -0,0 +1,173 @@
+import bisect
+import hashlib
+import logging
+import os
+import struct
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from ..subprocesses import open_subprocess
+
+logger = logging.getLogger(__name__)
+
+INDEXABLE_SUFFIXES = ('.ts', '.m2ts', '.mts')
+
+_HEADER = struct.Struct('<4sHqqddI')
+_MAGIC, _VERSION = b'KFIX', 1
+
+
+@dataclass
+class KeyframeIndex:
+    """Keyframe PTS (in seconds) to byte offset mapping of the first video stream of a media"""
+    size: int
+    mtime_ns: int
+    start_pts: float
+    end_pts: float
+    pts: array = field(default_factory=lambda: array('d'))
+    positions: array = field(default_factory=lambda: array('q'))
+
+    @property
+    def duration(self) -> float:
+        return self.end_pts - self.start_pts
+
+    def is_valid_for(self, filepath: Path) -> bool:
+        stat = filepath.stat()
+        return (self.size, self.mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+    def seek_point(self, position_s: float) -> tuple[float, int]:
+        """Absolute PTS and byte offset of the last keyframe at or before position (relative to media start)"""
+        index = max(bisect.bisect_right(self.pts, self.start_pts + position_s) - 1, 0)
+        return self.pts[index], self.positions[index]
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(_MAGIC, _VERSION, self.size, self.mtime_ns, self.start_pts, self.end_pts, len(self.pts))
+        return header + self.pts.tobytes() + self.positions.tobytes()
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> 'KeyframeIndex':
+        magic, version, size, mtime_ns, start_pts, end_pts, count = _HEADER.unpack_from(content)
+
+        if (magic, version) != (_MAGIC, _VERSION):
+            raise ValueError('Unsupported keyframe index format')
+
+        pts, positions = array('d'), array('q')
+        pts_offset = _HEADER.size
+        positions_offset = pts_offset + count * pts.itemsize
+        pts.frombytes(content[pts_offset:positions_offset])
+        positions.frombytes(content[positions_offset:positions_offset + count * positions.itemsize])
+
+        return cls(size, mtime_ns, start_pts, end_pts, pts, positions)
+
+
+def scan_keyframes(filepath: Path, timeout_s=300.) -> KeyframeIndex:
+    """Build the keyframe index of a media from one packet-level scan (no decoding), ffprobe being killed after timeout_s"""
+    stat = filepath.stat()
+    index = KeyframeIndex(size=stat.st_size, mtime_ns=stat.st_mtime_ns, start_pts=float('inf'), end_pts=0.)
+
+    cmd = (
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,duration_time,pos,flags', '-of', 'compact=p=0', str(filepath)
+    )
+
+    with open_subprocess(cmd, timeout_s) as process:
+        for line in process.stdout or ():
+            packet = dict(entry.split('=', 1) for entry in line.strip().split('|') if '=' in entry)
+
+            if (pts_time := packet.get('pts_time', 'N/A')) == 'N/A':
+                continue
+
+            pts = float(pts_time)
+            duration = float(duration_time) if (duration_time := packet.get('duration_time', 'N/A')) != 'N/A' else 0.
+            index.start_pts = min(index.start_pts, pts)
+            index.end_pts = max(index.end_pts, pts + duration)
+
+            if packet.get('flags', '').startswith('K') and packet.get('pos', 'N/A') != 'N/A':
+                index.pts.append(pts)
+                index.positions.append(int(packet['pos']))
+
+    if process.returncode != 0 or len(index.pts) == 0:
+        raise ValueError(f'Unable to index keyframes of {filepath}')
+
+    # packets are in decoding order, keep keyframes sorted by presentation time for bisection
+    keyframes = sorted(zip(index.pts, index.positions))
+    index.pts, index.positions = array('d', (pts for pts, _ in keyframes)), array('q', (pos for _, pos in keyframes))
+
+    return index
+
+
+class KeyframeIndexStore:
+    """Keyframe indexes stored as compact binary files keyed by media path, invalidated on media size/mtime change"""
+
+    def __init__(self, index_path: Path, scan_timeout_s=300.) -> None:
+        self._index_path = index_path
+        self._scan_timeout_s = scan_timeout_s
+        self._index_path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = Lock()
+        self._indexes: dict[Path, KeyframeIndex] = {}
+        self._pending: set[Path] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='keyframe-indexer')
+
+    @staticmethod
+    def is_indexable(filepath: Path) -> bool:
+        return filepath.suffix.lower() in INDEXABLE_SUFFIXES
+
+    def get(self, filepath: Path) -> Optional[KeyframeIndex]:
+        with self._lock:
+            index = self._indexes.get(filepath)
+
+        try:
+            if index is None and (index_file_path := self._index_file_path(filepath)).is_file():
+                index = KeyframeIndex.from_bytes(index_file_path.read_bytes())
+
+            if index is None or not index.is_valid_for(filepath):
+                return None
+        except (OSError, ValueError, struct.error):
+            logger.debug(f'Invalid keyframe index for {filepath}', exc_info=True)
+            return None
+
+        with self._lock:
+            self._indexes[filepath] = index
+
+        return index
+
+    def build(self, filepath: Path) -> KeyframeIndex:
+        index = scan_keyframes(filepath, self._scan_timeout_s)
+
+        index_file_path = self._index_file_path(filepath)
+        tmp_index_file_path = index_file_path.with_suffix('.tmp')
+        tmp_index_file_path.write_bytes(index.to_bytes())
+        os.replace(tmp_index_file_path, index_file_path)
+
+        with self._lock:
+            self._indexes[filepath] = index
+
+        return index
+
+    def schedule_build(self, filepath: Path) -> None:
+        """Build the keyframe index of the media in background if not already scheduled"""
+        with self._lock:
+            if filepath in self._pending:
+                return
+            self._pending.add(filepath)
+
+        self._executor.submit(self._build_in_background, filepath)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _build_in_background(self, filepath: Path):
+        try:
+            self.build(filepath)
+        except Exception:
+            logger.warning(f'Unable to build keyframe index for {filepath}', exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.discard(filepath)
+
+    def _index_file_path(self, filepath: Path) -> Path:
+        return self._index_path / f'{hashlib.sha256(str(filepath.resolve()).encode("utf-8")).hexdigest()}.kfidx'
@@ -1,18 +1,78 @@
 import logging
+import math
+import subprocess
 
+import ffmpeg
+
+from ..subprocesses import run_subprocess, run_subprocess_async
 from .video_player import IVideoPlayer
 
 logger = logging.getLogger(__name__)
 
 
-def extract_frame(stream, position_s, **kwargs):
-    out, _ = (
+def _check_ffmpeg_output(process: subprocess.CompletedProcess[bytes]) -> bytes:
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', process.stdout, process.stderr)
+
+    return process.stdout
+
+
+def extract_frame_cmd(stream, position_s, **kwargs) -> list[str]:
+    return (
         stream
         .output('pipe:', format='rawvideo', pix_fmt='rgb24', vframes=1, **kwargs)
-        .run(cmd=['ffmpeg', '-hide_banner', '-ss', str(position_s)], capture_stdout=True, capture_stderr=True)
+        .compile(cmd=['ffmpeg', '-hide_banner', '-ss', str(position_s)])
     )
 
-    return out
+
+def extract_frame(stream, position_s, **kwargs):
+    return _check_ffmpeg_output(run_subprocess(extract_frame_cmd(stream, position_s, **kwargs)))
+
+
+async def extract_frame_async(stream, position_s, **kwargs):
+    return _check_ffmpeg_output(await run_subprocess_async(extract_frame_cmd(stream, position_s, **kwargs)))
+
+
+def extract_frame_from_keyframe_cmd(stream, frame_pts: float, **kwargs) -> list[str]:
+    """Command extracting the frame at absolute `frame_pts` from a stream opened at its preceding keyframe
+
+    `stream` should be opened at the keyframe byte offset (`skip_initial_bytes`), so ffmpeg neither
+    probes nor bisects the whole media and only decodes from the keyframe to the requested frame.
+    """
+    return (
+        stream
+        .output('pipe:', format='rawvideo', pix_fmt='rgb24', vframes=1, ss=frame_pts, **kwargs)
+        .global_args('-copyts')
+        .compile(cmd=['ffmpeg', '-hide_banner'])
+    )
+
+
+def extract_frame_from_keyframe(stream, frame_pts: float, **kwargs):
+    return _check_ffmpeg_output(run_subprocess(extract_frame_from_keyframe_cmd(stream, frame_pts, **kwargs)))
+
+
+async def extract_frame_from_keyframe_async(stream, frame_pts: float, **kwargs):
+    return _check_ffmpeg_output(await run_subprocess_async(extract_frame_from_keyframe_cmd(stream, frame_pts, **kwargs)))
+
+
+def extract_filmstrip_cmd(stream, duration_s: float, tiles: int, columns: int, tile_width: int, tile_height: int, **kwargs) -> list[str]:
+    """Command extracting `tiles` letterboxed thumbnails evenly spread over the media, tiled in a single image, in one decode pass
+
+    `stream` should be opened with `skip_frame='nokey'` to only decode keyframes.
+    """
+    return (
+        stream
+        .filter('fps', fps=f'{tiles}/{duration_s:.3f}')
+        .filter('scale', tile_width, tile_height, force_original_aspect_ratio='decrease')
+        .filter('pad', tile_width, tile_height, '(ow-iw)/2', '(oh-ih)/2')
+        .filter('tile', f'{columns}x{math.ceil(tiles / columns)}')
+        .output('pipe:', format='image2', vframes=1, **kwargs)
+        .compile(cmd=['ffmpeg', '-hide_banner'])
+    )
+
+
+async def extract_filmstrip_async(stream, duration_s: float, tiles: int, columns: int, tile_width: int, tile_height: int, **kwargs):
+    return _check_ffmpeg_output(await run_subprocess_async(extract_filmstrip_cmd(stream, duration_s, tiles, columns, tile_width, tile_height, **kwargs)))
 
 
 class NoOpVideoPositionForwarder(IVideoPlayer):
@@ -10,6 +10,4 @@ def import_segments_from_selected_detector(context: SegmentValidatorContext, det
     context.segment_container = SegmentContainer()
 
     imported_detector_segments = MovieSegments(raw_segments=context.imported_segments[detector_key])
-
-    for segment in imported_detector_segments.segments:
-        context.segment_container.add(Segment(*segment))
+    context.segment_container.add_many(Segment(*segment) for segment in imported_detector_segments.segments)
@@ -1,28 +1,21 @@
-import importlib
 from pathlib import Path
+from typing import Iterable
 
 import yaml
 
 from ..domain import edl_content_schema
 from ..domain.segment_container import SegmentContainer
-from .edl_scaffolder import MovieProcessedFileGenerator, channel_pattern, get_title_strategy_context
+from ..lib.timing import SIDECAR_IO_PHASE, timed
+from .edl_scaffolder import get_title_extraction_engine
 from ..settings import Settings
 
 
 def extract_title(source_path: Path, config: Settings):
-    title_strategy_context = get_title_strategy_context(config)
+    return get_title_extraction_engine(config).extract_title(source_path)
 
-    matches = channel_pattern.search(source_path.stem)
 
-    if not matches:
-        return 'Nom du fichier converti.mp4'
-
-    channel = matches.group(1)
-    title_strategy_name = title_strategy_context.titles_strategies.get(channel) or 'NaiveTitleExtractor'
-    mod = importlib.import_module('movie_pipeline_segments_validator.lib.title_extractor.title_extractor')
-    title_strategy = getattr(mod, title_strategy_name)(title_strategy_context.title_cleaner)
-
-    return MovieProcessedFileGenerator(source_path, title_strategy, title_strategy_context.normalized_title_series_extracted_metadata).extract_title()
+def extract_titles(source_paths: Iterable[Path], config: Settings):
+    return get_title_extraction_engine(config).extract_titles(source_paths)
 
 
 def dump_decision_file(title: str, source_path: Path, segment_container: SegmentContainer, skip_backup: bool):
@@ -35,7 +28,8 @@ def dump_decision_file(title: str, source_path: Path, segment_container: Segment
     }
 
     if edl_content_schema.is_valid(decision_file_content):
-        decision_file_path.write_text(yaml.safe_dump(decision_file_content), encoding='utf-8')
+        with timed(SIDECAR_IO_PHASE):
+            decision_file_path.write_text(yaml.safe_dump(decision_file_content), encoding='utf-8')
         return decision_file_path
 
     return None
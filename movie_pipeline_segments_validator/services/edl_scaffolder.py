@@ -2,13 +2,15 @@ import logging
 import re
 from dataclasses import dataclass
 from pathlib import Path
+from threading import Lock
 from types import SimpleNamespace
-from typing import cast
+from typing import Iterable, Optional, cast
 
 from schema import Schema
 
 from ..lib.title_extractor.title_cleaner import TitleCleaner
-from ..lib.title_extractor.title_extractor import ITitleExtractor
+from ..lib.title_extractor import title_extractor
+from ..lib.title_extractor.title_extractor import ITitleExtractor, NaiveTitleExtractor
 from ..lib.title_extractor.title_serie_extractor import extract_title_serie_episode_from_metadata
 from ..lib.util import remove_diacritics
 from ..settings import Settings
@@ -62,3 +64,57 @@ def get_title_strategy_context(config: Settings) -> TitleStrategyContext:
     title_cleaner = TitleCleaner(blacklist_path)
 
     return TitleStrategyContext(titles_strategies, series_extracted_metadata, title_cleaner)
+
+
+class TitleExtractionEngine:
+    """Extract output titles of medias, reusing one title extractor per channel,
+    the compiled blacklist and the normalized series metadata of a title strategy context
+
+    Title extractors are created on the first media of their channel, so that an invalid strategy only fails its channel medias.
+    """
+
+    def __init__(self, title_strategy_context: TitleStrategyContext) -> None:
+        self._titles_strategies = title_strategy_context.titles_strategies
+        self._title_cleaner = title_strategy_context.title_cleaner
+        self._series_extracted_metadata = title_strategy_context.normalized_title_series_extracted_metadata
+        self._default_title_extractor = NaiveTitleExtractor(title_strategy_context.title_cleaner)
+
+        self._lock = Lock()
+        self._title_extractors: dict[str, ITitleExtractor] = {}
+
+    def extract_title(self, source_path: Path) -> str:
+        matches = channel_pattern.search(source_path.stem)
+
+        if not matches:
+            return 'Nom du fichier converti.mp4'
+
+        channel_title_extractor = self._get_title_extractor(matches.group(1))
+        return MovieProcessedFileGenerator(source_path, channel_title_extractor, self._series_extracted_metadata).extract_title()
+
+    def extract_titles(self, source_paths: Iterable[Path]) -> list[str]:
+        return [self.extract_title(source_path) for source_path in source_paths]
+
+    def _get_title_extractor(self, channel: str) -> ITitleExtractor:
+        if (title_strategy_name := self._titles_strategies.get(channel)) is None:
+            return self._default_title_extractor
+
+        with self._lock:
+            if (channel_title_extractor := self._title_extractors.get(channel)) is None:
+                channel_title_extractor = self._title_extractors[channel] = getattr(title_extractor, title_strategy_name)(self._title_cleaner)
+
+        return channel_title_extractor
+
+
+_title_extraction_engine_lock = Lock()
+_title_extraction_engine: Optional[tuple[Settings, TitleExtractionEngine]] = None
+
+
+def get_title_extraction_engine(config: Settings) -> TitleExtractionEngine:
+    """Title extraction engine of the given settings, only rebuilt when settings are reloaded"""
+    global _title_extraction_engine
+
+    with _title_extraction_engine_lock:
+        if _title_extraction_engine is None or _title_extraction_engine[0] is not config:
+            _title_extraction_engine = (config, TitleExtractionEngine(get_title_strategy_context(config)))
+
+        return _title_extraction_engine[1]
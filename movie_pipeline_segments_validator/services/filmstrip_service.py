@@ -0,0 +1,67 @@
+import math
+from dataclasses import dataclass
+from pathlib import Path
+
+import ffmpeg
+
+from ..lib.video_player.frame_cache import FrameCache
+from ..lib.video_player.simple_video_only_player import extract_filmstrip_async
+
+
+@dataclass(frozen=True)
+class FilmstripLayout:
+    tiles: int
+    columns: int
+    tile_width: int
+    tile_height: int
+
+    @property
+    def rows(self) -> int:
+        return math.ceil(self.tiles / self.columns)
+
+
+@dataclass(frozen=True)
+class FilmstripTile:
+    index: int
+    position_s: float
+    x: int
+    y: int
+
+
+def check_duration(duration_s: float):
+    """Raises ValueError if duration_s is not positive, eg when the media duration could not be probed"""
+    if duration_s <= 0:
+        raise ValueError(f'Unable to build the filmstrip of a media without duration ({duration_s}s)')
+
+
+def build_filmstrip_index(duration_s: float, layout: FilmstripLayout) -> list[FilmstripTile]:
+    """Raises ValueError if duration_s is not positive"""
+    check_duration(duration_s)
+    interval_s = duration_s / layout.tiles
+
+    return [
+        FilmstripTile(
+            index=index,
+            position_s=round(index * interval_s, 3),
+            x=(index % layout.columns) * layout.tile_width,
+            y=(index // layout.columns) * layout.tile_height
+        )
+        for index in range(layout.tiles)
+    ]
+
+
+async def get_filmstrip_async(filepath: Path, duration_s: float, layout: FilmstripLayout, frame_cache: FrameCache) -> bytes:
+    """Get the filmstrip sprite sheet of the media from the frame cache, generating it in a single ffmpeg pass on cache miss,
+    run as an asyncio subprocess
+
+    Raises ValueError if duration_s is not positive"""
+    check_duration(duration_s)
+
+    async def extract(_: float) -> bytes:
+        stream = ffmpeg.input(str(filepath), skip_frame='nokey')
+        return await extract_filmstrip_async(stream, duration_s, layout.tiles, layout.columns, layout.tile_width, layout.tile_height, vcodec='mjpeg')
+
+    return await frame_cache.get_or_extract_async(
+        filepath, 0, extract,
+        filmstrip=True, tiles=layout.tiles, columns=layout.columns, tile_width=layout.tile_width, tile_height=layout.tile_height, vcodec='mjpeg'
+    )
@@ -0,0 +1,85 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, Optional
+
+from ..lib.video_player.decoder_video_player import DecoderVideoPlayerPool
+from ..lib.video_player.frame_cache import FrameCache
+from ..lib.video_player.keyframe_index import KeyframeIndexStore
+from . import frame_service
+
+logger = logging.getLogger(__name__)
+
+
+def positions_around(position_s: float, window_s: float, step_s: float) -> list[float]:
+    """Positions within window around position, nearest first"""
+    steps = int(window_s // step_s)
+    offsets = sorted((step * step_s for step in range(-steps, steps + 1)), key=abs)
+
+    return [round(position_s + offset, 3) for offset in offsets if position_s + offset >= 0]
+
+
+class FramePrefetcher:
+    """Warm the frame cache around segment edges with a bounded worker pool
+
+    At most `max_pending` frames are queued, extra requests are dropped, so that prefetching
+    never holds more than `max_workers` decoders busy nor delays interactive frame requests for long.
+    """
+
+    def __init__(
+            self,
+            frame_cache: FrameCache,
+            window_s: float,
+            step_s: float,
+            max_workers: int,
+            max_pending: int,
+            decoder_pool: Optional[DecoderVideoPlayerPool] = None,
+            keyframe_index_store: Optional[KeyframeIndexStore] = None
+        ) -> None:
+        self._frame_cache = frame_cache
+        self._window_s = window_s
+        self._step_s = step_s
+        self._max_pending = max_pending
+        self._decoder_pool = decoder_pool
+        self._keyframe_index_store = keyframe_index_store
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='frame-prefetcher')
+        self._lock = Lock()
+        self._pending: set[tuple[Path, float]] = set()
+
+    def prefetch_around_edges(self, filepath: Path, segments: Iterable[tuple[float, float]]) -> int:
+        edges = sorted({edge for segment in segments for edge in segment})
+        return sum(self.prefetch_around(filepath, edge) for edge in edges)
+
+    def prefetch_around(self, filepath: Path, position_s: float) -> int:
+        """Schedule frame extraction around position, returning the number of scheduled frames"""
+        scheduled_count = 0
+
+        for position in positions_around(position_s, self._window_s, self._step_s):
+            task_key = (filepath, self._frame_cache.quantize(position))
+
+            with self._lock:
+                if task_key in self._pending or len(self._pending) >= self._max_pending:
+                    continue
+                self._pending.add(task_key)
+
+            self._executor.submit(self._prefetch, task_key)
+            scheduled_count += 1
+
+        return scheduled_count
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch(self, task_key: tuple[Path, float]):
+        filepath, position_s = task_key
+
+        try:
+            if not frame_service.is_video_frame_cached(filepath, position_s, self._frame_cache, self._decoder_pool):
+                frame_service.get_video_frame(filepath, position_s, self._frame_cache, self._decoder_pool, self._keyframe_index_store)
+        except Exception:
+            logger.debug(f'Unable to prefetch frame at {position_s}s of {filepath}', exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.discard(task_key)
@@ -0,0 +1,126 @@
+import asyncio
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import ffmpeg
+
+from ..lib.timing import SUBPROCESS_PHASE, timed
+from ..lib.video_player.decoder_video_player import DecoderVideoPlayerPool
+from ..lib.video_player.frame_cache import FrameCache
+from ..lib.video_player.image_encoder import encode_png
+from ..lib.video_player.keyframe_index import KeyframeIndexStore
+from ..lib.video_player.simple_video_only_player import extract_frame, extract_frame_async, extract_frame_from_keyframe, extract_frame_from_keyframe_async
+
+
+class EncodedFrame(NamedTuple):
+    content: bytes
+    media_type: str
+
+
+def _output_options(decoder_pool: Optional[DecoderVideoPlayerPool]) -> dict[str, str]:
+    return {'decoder': 'persistent', 'format': 'png'} if decoder_pool is not None else {'vcodec': 'mjpeg'}
+
+
+def _extract_jpeg_frame(filepath: Path, position_s: float, keyframe_index_store: Optional[KeyframeIndexStore]) -> bytes:
+    if keyframe_index_store is not None and keyframe_index_store.is_indexable(filepath):
+        if (keyframe_index := keyframe_index_store.get(filepath)) is not None:
+            _, byte_offset = keyframe_index.seek_point(position_s)
+            stream = ffmpeg.input(str(filepath), skip_initial_bytes=byte_offset)
+            return extract_frame_from_keyframe(stream, keyframe_index.start_pts + position_s, vcodec='mjpeg')
+
+        keyframe_index_store.schedule_build(filepath)
+
+    return extract_frame(ffmpeg.input(str(filepath)), position_s, vcodec='mjpeg')
+
+
+async def _extract_jpeg_frame_async(filepath: Path, position_s: float, keyframe_index_store: Optional[KeyframeIndexStore]) -> bytes:
+    if keyframe_index_store is not None and keyframe_index_store.is_indexable(filepath):
+        # the index is loaded from disk on first use
+        if (keyframe_index := await asyncio.to_thread(keyframe_index_store.get, filepath)) is not None:
+            _, byte_offset = keyframe_index.seek_point(position_s)
+            stream = ffmpeg.input(str(filepath), skip_initial_bytes=byte_offset)
+            return await extract_frame_from_keyframe_async(stream, keyframe_index.start_pts + position_s, vcodec='mjpeg')
+
+        keyframe_index_store.schedule_build(filepath)
+
+    return await extract_frame_async(ffmpeg.input(str(filepath)), position_s, vcodec='mjpeg')
+
+
+def get_media_duration(filepath: Path, probed_duration: float, keyframe_index_store: Optional[KeyframeIndexStore] = None) -> float:
+    """Exact media duration from its keyframe index when available, otherwise the (cached) ffprobe one"""
+    if keyframe_index_store is not None and (keyframe_index := keyframe_index_store.get(filepath)) is not None:
+        return round(keyframe_index.duration, 3)
+
+    return probed_duration
+
+
+async def get_media_duration_async(filepath: Path, probed_duration: float, keyframe_index_store: Optional[KeyframeIndexStore] = None) -> float:
+    """Like `get_media_duration`, the keyframe index being loaded in a worker thread"""
+    return await asyncio.to_thread(get_media_duration, filepath, probed_duration, keyframe_index_store)
+
+
+def is_video_frame_cached(
+        filepath: Path,
+        position_s: float,
+        frame_cache: FrameCache,
+        decoder_pool: Optional[DecoderVideoPlayerPool] = None
+    ) -> bool:
+    return frame_cache.key(filepath, position_s, **_output_options(decoder_pool)) in frame_cache
+
+
+def get_video_frame(
+        filepath: Path,
+        position_s: float,
+        frame_cache: FrameCache,
+        decoder_pool: Optional[DecoderVideoPlayerPool] = None,
+        keyframe_index_store: Optional[KeyframeIndexStore] = None
+    ) -> EncodedFrame:
+    """Get the frame at position from the frame cache, only decoding the media on cache miss
+
+    Args:
+        filepath (Path): media file path
+        position_s (float): frame position in seconds
+        frame_cache (FrameCache): frame cache to look up first
+        decoder_pool (Optional[DecoderVideoPlayerPool]):
+            When given, decode with the long-lived decoder of the media and encode the frame to PNG,
+            otherwise start a new ffmpeg process encoding the frame to JPEG
+        keyframe_index_store (Optional[KeyframeIndexStore]):
+            When given, ffmpeg seeks MPEG-TS medias at the byte offset of the preceding keyframe,
+            the index being built in background on first use
+
+    Returns:
+        EncodedFrame: encoded frame content and its media type
+    """
+    if decoder_pool is not None:
+        def decode(quantized_position_s: float) -> bytes:
+            with timed(SUBPROCESS_PHASE):
+                frame = decoder_pool.get(filepath).read_frame(quantized_position_s)
+            return encode_png(frame)
+
+        return EncodedFrame(frame_cache.get_or_extract(filepath, position_s, decode, **_output_options(decoder_pool)), 'image/png')
+
+    def extract(quantized_position_s: float) -> bytes:
+        return _extract_jpeg_frame(filepath, quantized_position_s, keyframe_index_store)
+
+    return EncodedFrame(frame_cache.get_or_extract(filepath, position_s, extract, **_output_options(decoder_pool)), 'image/jpeg')
+
+
+async def get_video_frame_async(
+        filepath: Path,
+        position_s: float,
+        frame_cache: FrameCache,
+        decoder_pool: Optional[DecoderVideoPlayerPool] = None,
+        keyframe_index_store: Optional[KeyframeIndexStore] = None
+    ) -> EncodedFrame:
+    """Like `get_video_frame`, running ffmpeg as an asyncio subprocess on cache miss instead of holding a thread while it runs
+
+    The long-lived decoder of the media being read in a blocking way, frames are still decoded in a worker thread
+    when decoder_pool is given.
+    """
+    if decoder_pool is not None:
+        return await asyncio.to_thread(get_video_frame, filepath, position_s, frame_cache, decoder_pool, keyframe_index_store)
+
+    async def extract(quantized_position_s: float) -> bytes:
+        return await _extract_jpeg_frame_async(filepath, quantized_position_s, keyframe_index_store)
+
+    return EncodedFrame(await frame_cache.get_or_extract_async(filepath, position_s, extract, **_output_options(decoder_pool)), 'image/jpeg')
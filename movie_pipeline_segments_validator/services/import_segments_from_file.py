@@ -1,30 +1,133 @@
 import json
-from datetime import datetime
 import logging
+import os
+from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 from ..domain.segment_container import SegmentContainer
+from ..lib.timing import SIDECAR_IO_PHASE, timed
 
 
 logger = logging.getLogger(__name__)
 
+JOURNAL_READ_BLOCK_SIZE = 64 * 1024
+RESULT_KEY_PREFIX = 'result_'
+
+
+def segments_file_path(source_path: Path):
+    return source_path.with_suffix(f'{source_path.suffix}.segments.json')
+
+
+def segments_journal_path(source_path: Path):
+    return source_path.with_suffix(f'{source_path.suffix}.segments.jsonl')
+
+
+def read_latest_results(source_path: Path, max_results: Optional[int] = None) -> list[tuple[str, str]]:
+    """Latest reviewed segments saved in the journal, newest first
+
+    Only the end of the journal holding the `max_results` last lines is read (all of it when None).
+    Unreadable lines, like one truncated by a crash, are skipped.
+    """
+    try:
+        with segments_journal_path(source_path).open('rb') as journal:
+            position = journal.seek(0, os.SEEK_END)
+            content = b''
+
+            while position > 0 and (max_results is None or content.count(b'\n') <= max_results):
+                read_size = min(JOURNAL_READ_BLOCK_SIZE, position)
+                position -= read_size
+                journal.seek(position)
+                content = journal.read(read_size) + content
+    except IOError:
+        return []
+
+    # unless the journal is read from its start, the first line may be partial
+    lines = content.splitlines()[0 if position == 0 else 1:]
+
+    results = []
+    for line in reversed(lines):
+        if max_results is not None and len(results) >= max_results:
+            break
+
+        try:
+            [(key, raw_segments)] = json.loads(line).items()
+            results.append((key, raw_segments))
+        except (ValueError, AttributeError):
+            logger.warning(f'Skip unreadable line of segments journal of "{str(source_path)}"')
+
+    return results
+
+
+def import_segments(source_path: Path, max_results: Optional[int] = None):
+    """Segments of the journal (the `max_results` latest ones, all when None), newest first,
+    followed by the segments of `.segments.json` (detectors results and history saved before the journal)"""
+    with timed(SIDECAR_IO_PHASE):
+        try:
+            segments_content = json.loads(segments_file_path(source_path).read_text(encoding='utf-8'))
+        except IOError:
+            segments_content = {}
+
+        return { **dict(read_latest_results(source_path, max_results)), **segments_content }
+
+
+def append_last_segments_to_segment_journal(source_path: Path, segment_container: SegmentContainer):
+    segments_path = segments_file_path(source_path)
+    line = json.dumps({ f'{RESULT_KEY_PREFIX}{datetime.now().isoformat()}': repr(segment_container) }).encode('utf-8') + b'\n'
+
+    with timed(SIDECAR_IO_PHASE):
+        if not segments_path.is_file():
+            logger.warning(f'Missing segments file for "{str(source_path)}"')
+            segments_path.write_text(json.dumps({ }), encoding='utf-8')
+
+        with segments_journal_path(source_path).open('a+b') as journal:
+            # terminate a line left truncated by a crash, so that it does not corrupt the appended one
+            if journal.seek(0, os.SEEK_END) > 0:
+                journal.seek(-1, os.SEEK_END)
+                if journal.read(1) != b'\n':
+                    line = b'\n' + line
+
+            journal.write(line)
+
+
+def compact_segments_journal(source_path: Path, max_results: int) -> int:
+    """Keep the `max_results` latest results of the journal, first moving there the history saved in `.segments.json`
+
+    Detectors results stay in `.segments.json`. Files are replaced atomically, but results appended
+    during the compaction are lost: do not run it while medias are being reviewed.
+
+    Returns:
+        int: number of dropped results
+    """
+    segments_path = segments_file_path(source_path)
 
-def import_segments(source_path: Path):
-    segments_path = source_path.with_suffix(f'{source_path.suffix}.segments.json')
     try:
-        return json.loads(segments_path.read_text(encoding='utf-8'))
+        segments_content: dict[str, str] = json.loads(segments_path.read_text(encoding='utf-8'))
     except IOError:
-        return {}
+        segments_content = {}
+
+    legacy_results = [(key, value) for key, value in segments_content.items() if key.startswith(RESULT_KEY_PREFIX)]
+    results = [*read_latest_results(source_path), *legacy_results]
+    kept_results = results[:max_results]
+
+    if len(kept_results) == len(results) and len(legacy_results) == 0:
+        return 0
 
+    write_atomically(
+        segments_journal_path(source_path),
+        ''.join(f'{json.dumps({ key: value })}\n' for key, value in reversed(kept_results))
+    )
 
-def prepend_last_segments_to_segment_file(source_path: Path, segment_container: SegmentContainer):
-    segments_path = source_path.with_suffix(f'{source_path.suffix}.segments.json')
+    if len(legacy_results) > 0:
+        write_atomically(
+            segments_path,
+            json.dumps({ key: value for key, value in segments_content.items() if not key.startswith(RESULT_KEY_PREFIX) }, indent=2)
+        )
 
-    if not segments_path.is_file():
-        logger.warning(f'Missing segments file for "{str(source_path)}"')
-        segments_path.write_text(json.dumps({ }), encoding='utf-8')
+    return len(results) - len(kept_results)
 
-    segments_content = json.loads(segments_path.read_text(encoding='utf-8'))
-    content = { f'result_{datetime.now().isoformat()}': repr(segment_container), **segments_content }
 
-    segments_path.write_text(json.dumps(content, indent=2))
+def write_atomically(path: Path, content: str):
+    temporary_path = path.with_name(f'.{path.name}.tmp')
+    temporary_path.write_text(content, encoding='utf-8')
+    os.replace(temporary_path, path)
@@ -1,9 +1,9 @@
 from pathlib import Path
 
 from ..domain.context import SegmentValidatorContext
-from ..domain.media_path import MediaPath, cache_media_dir_entries
+from ..domain.media_path import MediaDirIndex, MediaPath
 from ..settings import Settings
-from .import_segments_from_file import prepend_last_segments_to_segment_file
+from .import_segments_from_file import append_last_segments_to_segment_journal
 
 
 def has_any_edl(media_path: Path, config: Settings) -> bool:
@@ -14,7 +14,7 @@ def has_any_edl(media_path: Path, config: Settings) -> bool:
 
 
 def flush_segments_of_previous_loaded_media(context: SegmentValidatorContext):
-    prepend_last_segments_to_segment_file(context.filepath, context.segment_container)
+    append_last_segments_to_segment_journal(context.filepath, context.segment_container)
 
 
 def prefill_name(context: SegmentValidatorContext):
@@ -25,11 +25,11 @@ def prefill_name(context: SegmentValidatorContext):
 
 
 def list_medias(filepath: Path, config: Settings) -> list[MediaPath]:
-    paths = [filepath] if filepath.is_file() else filepath.glob(f'*{config.MediaSelector.media_extension}')
     root_path = filepath.parent if filepath.is_file() else filepath
-    cached_media_dir_entries = cache_media_dir_entries(root_path, media_ext=config.MediaSelector.media_extension)
+    media_dir_index = MediaDirIndex.scan(root_path, media_ext=config.MediaSelector.media_extension)
+    paths = [filepath] if filepath.is_file() else media_dir_index.media_paths
 
     return sorted(
-        (MediaPath(path, cached_media_dir_entries) for path in paths),
+        (MediaPath(path, media_dir_index) for path in paths),
         key=lambda media_path: media_path.path.name
     )
@@ -1,10 +1,13 @@
+import contextlib
 import json
 import shutil
+import time
 from pathlib import Path
+from threading import Lock
 from typing import Any, Optional
 
 import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from pydantic.types import DirectoryPath, FilePath
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -28,6 +31,85 @@ class MediaSelectorSettings(BaseModel):
     media_extension: str = Field(pattern=r'^\.\w+$', default='.ts')
 
 
+class FrameCacheSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    position_step_s: float = Field(gt=0, default=0.04)
+    memory_max_bytes: int = Field(ge=0, default=64 * 1024 ** 2)
+    disk_max_bytes: int = Field(ge=0, default=512 * 1024 ** 2)
+    disk_path: Path = Path.home() / '.movie_pipeline_segments_validator' / 'cache' / 'frames'
+
+
+class FrameExtractionSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    persistent_decoder: bool = False
+    max_decode_ahead_s: float = Field(gt=0, default=5.)
+    decoder_idle_timeout_s: float = Field(gt=0, default=60.)
+    keyframe_index: bool = False
+    keyframe_index_path: Path = Path.home() / '.movie_pipeline_segments_validator' / 'cache' / 'keyframes'
+    keyframe_index_timeout_s: float = Field(gt=0, default=300.)
+
+
+class FramePrefetchSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    enabled: bool = True
+    window_s: float = Field(ge=0, default=1.)
+    step_s: float = Field(gt=0, default=.5)
+    max_workers: int = Field(ge=1, default=2)
+    max_pending: int = Field(ge=1, default=256)
+
+
+class SubprocessSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_running: Optional[int] = Field(ge=1, default=None)  # CPU count when None
+    max_waiting: int = Field(ge=0, default=64)
+    wait_timeout_s: float = Field(gt=0, default=10.)
+
+
+class SessionBuildSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_workers: int = Field(ge=1, default=8)
+    use_process_pool: bool = False
+    chunk_size: int = Field(ge=1, default=32)
+    min_parallel_medias: int = Field(ge=1, default=64)
+    batch_size: int = Field(ge=1, default=64)
+    max_background_jobs: int = Field(ge=1, default=2)  # running at once, the others waiting for a worker
+    max_pending_background_jobs: int = Field(ge=0, default=8)
+
+
+class SegmentsJournalSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_imported_results: int = Field(ge=0, default=20)
+    max_compacted_results: int = Field(ge=0, default=100)
+
+
+class ContextCacheSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    max_entries: int = Field(ge=0, default=32)
+
+
+class MetricsSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    enabled: bool = False
+
+
+class WatcherSettings(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    enabled: bool = False
+    debounce_s: float = Field(gt=0, default=1.)
+    max_delay_s: float = Field(gt=0, default=10.)
+    poll_interval_s: float = Field(gt=0, default=5.)
+    force_polling: bool = False
+
+
 class ServerSettings(BaseModel):
     HOST: str = "0.0.0.0"
     PORT: int = 8000
@@ -39,6 +121,15 @@ class Settings(BaseSettings):
     Paths: PathSettings
     PathsContent: PathContent = PathContent()
     MediaSelector: MediaSelectorSettings = MediaSelectorSettings()
+    FrameCache: FrameCacheSettings = FrameCacheSettings()
+    FrameExtraction: FrameExtractionSettings = FrameExtractionSettings()
+    FramePrefetch: FramePrefetchSettings = FramePrefetchSettings()
+    Subprocesses: SubprocessSettings = SubprocessSettings()
+    SessionBuild: SessionBuildSettings = SessionBuildSettings()
+    SegmentsJournal: SegmentsJournalSettings = SegmentsJournalSettings()
+    ContextCache: ContextCacheSettings = ContextCacheSettings()
+    Watcher: WatcherSettings = WatcherSettings()
+    Metrics: MetricsSettings = MetricsSettings()
     Server: ServerSettings = ServerSettings()
 
     ffmpeg_path: FilePath = shutil.which('ffmpeg')  # type: ignore
@@ -46,6 +137,14 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_nested_delimiter='__')
 
     def model_post_init(self, __context: Any) -> None:
+        # anchor relative paths to the directory the settings are loaded from, so they no longer depend on the cwd
+        for name, path in self.Paths:
+            if isinstance(path, Path):
+                setattr(self.Paths, name, path.absolute())
+
+        self.FrameCache = self.FrameCache.model_copy(update={'disk_path': self.FrameCache.disk_path.absolute()})
+        self.FrameExtraction = self.FrameExtraction.model_copy(update={'keyframe_index_path': self.FrameExtraction.keyframe_index_path.absolute()})
+
         if (title_strategies_path := self.Paths.title_strategies) is not None:
             self.PathsContent.title_strategies = yaml.safe_load(title_strategies_path.read_text(encoding='utf-8'))
 
@@ -54,3 +153,52 @@ class Settings(BaseSettings):
 
         if (series_extracted_metadata_path := self.Paths.series_extracted_metadata) is not None:
             self.PathsContent.series_extracted_metadata = json.loads(series_extracted_metadata_path.read_text(encoding='utf-8'))
+
+    @property
+    def referenced_paths(self) -> list[Path]:
+        """Files whose content is loaded in `PathsContent`"""
+        return [
+            path for path in (self.Paths.title_strategies, self.Paths.title_re_blacklist, self.Paths.series_extracted_metadata)
+            if path is not None
+        ]
+
+
+class SettingsLoader:
+    """Settings loaded once from an env file and only reloaded when the env file or a file it references changes
+
+    Relative paths of the env file are resolved from its directory. Files mtime are checked at most every `ttl_s`.
+    """
+
+    def __init__(self, config_path: Path, ttl_s: float = 2.) -> None:
+        self._config_path = config_path
+        self._ttl_s = ttl_s
+
+        self._lock = Lock()
+        self._settings: Optional[Settings] = None
+        self._fingerprint: tuple[tuple[Path, int], ...] = ()
+        self._checked_at = 0.
+
+    def get(self) -> Settings:
+        if self._settings is not None and time.monotonic() - self._checked_at < self._ttl_s:
+            return self._settings
+
+        with self._lock:
+            if self._settings is None or self._fingerprint != self._compute_fingerprint(self._settings):
+                self._settings = self._load()
+                self._fingerprint = self._compute_fingerprint(self._settings)
+
+            self._checked_at = time.monotonic()
+            return self._settings
+
+    def _load(self) -> Settings:
+        with contextlib.chdir(self._config_path.parent):
+            return Settings(_env_file=self._config_path, _env_file_encoding='utf-8')  # type: ignore
+
+    def _compute_fingerprint(self, settings: Settings) -> tuple[tuple[Path, int], ...]:
+        def mtime_ns(path: Path):
+            try:
+                return path.stat().st_mtime_ns
+            except OSError:
+                return -1
+
+        return tuple((path, mtime_ns(path)) for path in (self._config_path, *settings.referenced_paths))
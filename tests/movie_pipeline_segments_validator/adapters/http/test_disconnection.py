@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+
+from fastapi import HTTPException, Request
+
+from movie_pipeline_segments_validator.adapters.http.disconnection import CLIENT_CLOSED_REQUEST, cancel_on_disconnect
+
+
+class TestCancelOnDisconnect(unittest.IsolatedAsyncioTestCase):
+    def build_request(self, disconnected: asyncio.Event) -> Request:
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        return Request({'type': 'http', 'method': 'GET', 'headers': []}, receive)
+
+    async def test_return_result(self):
+        self.assertEqual(42, await cancel_on_disconnect(self.build_request(asyncio.Event()), asyncio.sleep(0, 42)))
+
+    async def test_cancel_on_disconnect(self):
+        disconnected, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def extract():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        asyncio.get_running_loop().call_later(.05, disconnected.set)
+
+        with self.assertRaises(HTTPException) as cm:
+            await cancel_on_disconnect(self.build_request(disconnected), extract())
+
+        self.assertEqual(CLIENT_CLOSED_REQUEST, cm.exception.status_code)
+        self.assertTrue(cancelled.is_set())
+
+
+if __name__ == '__main__':
+    unittest.main()
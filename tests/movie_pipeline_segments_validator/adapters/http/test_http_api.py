@@ -1,8 +1,10 @@
 import json
 import os
 import shutil
+import time
 import unittest
 from pathlib import Path
+from threading import Event
 from unittest import mock
 
 from fastapi import status
@@ -10,14 +12,19 @@ from fastapi.testclient import TestClient
 from pydantic import TypeAdapter
 import yaml
 
+from movie_pipeline_segments_validator.adapters.http.dependencies import get_session_creation_job_runner
 from movie_pipeline_segments_validator.adapters.http.main import app
-from movie_pipeline_segments_validator.adapters.http.routers.session_medias import MediaOut
+from movie_pipeline_segments_validator.adapters.http.routers.session_medias import FilmstripOut, MediaOut
 from movie_pipeline_segments_validator.adapters.repository.resources import Media, Segment, Session
+from movie_pipeline_segments_validator.adapters.repository import session_jobs
+from movie_pipeline_segments_validator.adapters.repository.session_jobs import SessionCreationJobRunner
 from movie_pipeline_segments_validator.adapters.repository.session_repository import SessionRepository
 from movie_pipeline_segments_validator.domain.detected_segments import humanize_segments
 from movie_pipeline_segments_validator.domain.movie_segments import MovieSegments
+from movie_pipeline_segments_validator.lib.subprocesses import subprocess_slots
+from movie_pipeline_segments_validator.lib.video_player.frame_cache import FrameCache
 
-from ...concerns import copy_files, create_output_movies_directories, get_output_movies_directories, lazy_load_config_file
+from ...concerns import copy_files, create_output_movies_directories, get_output_movies_directories, get_serie_edl_file_content, lazy_load_config_file
 
 
 class TestHttpApi(unittest.TestCase):
@@ -93,6 +100,57 @@ class TestHttpApi(unittest.TestCase):
         self.assertEqual(['no_segment', 'waiting_segment_review'], [media.state for media in actual_session.medias.values()])
 
 
+    def test_create_session_in_background(self):
+        with self.client as client:
+            response = client.post('/sessions', params={'background': True}, json={ 'root_path': str(self.input_dir_path) })
+            self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+
+            job = response.json()
+            self.assertEqual(2, job['total'])
+
+            for _ in range(100):
+                job = client.get(f"/sessions/jobs/{job['id']}").json()
+                if job['status'] in ('completed', 'failed'):
+                    break
+                time.sleep(.05)
+
+            self.assertEqual(('completed', 2, None), (job['status'], job['done'], job['current_file']))
+
+            response = client.get(f"/sessions/{job['session_id']}", params={'refresh': False})
+            actual_session = TypeAdapter(Session).validate_json(response.text)
+            self.assertEqual(['Movie Name, le titre long.mp4', 'Serie Name S01E16.mp4'], [media.title for media in actual_session.medias.values()])
+
+            response = client.get('/sessions/jobs/unknown-job')
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
+    def test_create_session_in_background_jobs_exhausted(self):
+        session_creation_job_runner = SessionCreationJobRunner(max_workers=1, max_pending_jobs=1)
+        app.dependency_overrides[get_session_creation_job_runner] = lambda: session_creation_job_runner
+        build_started, build_released = Event(), Event()
+
+        def build_medias(media_paths, config):
+            build_started.set()
+            build_released.wait(5)
+            return []
+
+        try:
+            with self.client as client, mock.patch.object(session_jobs, 'build_medias', side_effect=build_medias):
+                create_session = lambda: client.post('/sessions', params={'background': True}, json={ 'root_path': str(self.input_dir_path) })
+
+                self.assertEqual(status.HTTP_202_ACCEPTED, create_session().status_code)
+                self.assertTrue(build_started.wait(5))
+                self.assertEqual(status.HTTP_202_ACCEPTED, create_session().status_code)
+
+                response = create_session()
+                self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, response.status_code)
+                self.assertEqual('5', response.headers['Retry-After'])
+        finally:
+            build_released.set()
+            session_creation_job_runner.close()
+            del app.dependency_overrides[get_session_creation_job_runner]
+
+
     def test_show_session_exist_no_refresh(self):
         session = self.session_repository.create(self.input_dir_path)
 
@@ -114,7 +172,66 @@ class TestHttpApi(unittest.TestCase):
         actual_session = TypeAdapter(Session).validate_json(response.text)
         self.assertEqual(session.model_dump(exclude={'updated_at',}), actual_session.model_dump(exclude={'updated_at',}))
 
+
+    def test_refresh_session(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        new_video_path = self.video_path.with_name('Channel 1_Other Movie_2022-12-06-2203-20.mp4')
+        shutil.copyfile(self.video_path, new_video_path)
+        self.serie_path.with_suffix('.mp4.yml').write_text(get_serie_edl_file_content(), encoding='utf-8')
+        self.video_path.unlink()
+
+        with self.client as client:
+            response = client.post(f'/sessions/{session.id}/refresh')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+            response_body = response.json()
+            self.assertEqual([new_video_path.stem], response_body['added'])
+            self.assertEqual([self.video_path.stem], response_body['removed'])
+            self.assertEqual([self.serie_path.stem], response_body['changed'])
+            self.assertEqual(
+                {new_video_path.stem: 'waiting_metadata', self.serie_path.stem: 'segment_reviewed'},
+                {stem: media['state'] for stem, media in response_body['session']['medias'].items()}
+            )
+
+            response = client.post(f'/sessions/{session.id}/refresh')
+            self.assertEqual(([], [], []), (response.json()['added'], response.json()['removed'], response.json()['changed']))
+
+            response = client.post('/sessions/unknown-session/refresh')
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
     
+    def test_show_session_conditional(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        with self.client as client:
+            response = client.get(f'/sessions/{session.id}', params={'refresh': False})
+            etag = response.headers['ETag']
+            self.assertEqual(f'"{session.version}"', etag)
+
+            response = client.get(f'/sessions/{session.id}', params={'refresh': False}, headers={'If-None-Match': etag})
+            self.assertEqual((status.HTTP_304_NOT_MODIFIED, b''), (response.status_code, response.content))
+
+            response = client.get(f'/sessions/{session.id}/medias', headers={'If-None-Match': etag})
+            self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+            segments_url = f'/sessions/{session.id}/medias/{self.video_path.stem}/segments/'
+            response = client.post(segments_url, json={'position': 10}, headers={'If-Match': etag})
+            self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+            new_etag = response.headers['ETag']
+            self.assertNotEqual(etag, new_etag)
+
+            response = client.post(segments_url, json={'position': 20}, headers={'If-Match': etag})
+            self.assertEqual(status.HTTP_412_PRECONDITION_FAILED, response.status_code)
+            self.assertEqual(new_etag, response.headers['ETag'])
+
+            response = client.get(f'/sessions/{session.id}/summary', headers={'If-None-Match': etag})
+            self.assertEqual((status.HTTP_200_OK, new_etag), (response.status_code, response.headers['ETag']))
+
+            response = client.delete(f'/sessions/{session.id}', headers={'If-Match': etag})
+            self.assertEqual(status.HTTP_412_PRECONDITION_FAILED, response.status_code)
+
+
     def test_show_session_not_found(self):
         with self.client as client:
             response = client.get('/sessions/unknown-session')
@@ -134,8 +251,45 @@ class TestHttpApi(unittest.TestCase):
             self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
 
 
+    def test_show_session_summary(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        with self.client as client:
+            response = client.get(f'/sessions/{session.id}/summary')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(2, response.json()['media_count'])
+            self.assertEqual({'no_segment': 1, 'waiting_segment_review': 1}, response.json()['media_states'])
+            self.assertNotIn('medias', response.json())
+
+            response = client.get('/sessions/unknown-session/summary')
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
     # routers/session_medias.py
 
+    def test_list_medias(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        with self.client as client:
+            response = client.get(f'/sessions/{session.id}/medias', params={'limit': 1, 'fields': 'title,state'})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual([{'stem': self.video_path.stem, 'title': 'Movie Name, le titre long.mp4', 'state': 'no_segment'}], response.json()['medias'])
+
+            response = client.get(f'/sessions/{session.id}/medias', params={'limit': 1, 'fields': 'title,state', 'cursor': response.json()['next_cursor']})
+            self.assertEqual([self.serie_path.stem], [media['stem'] for media in response.json()['medias']])
+            self.assertIsNone(response.json()['next_cursor'])
+
+            response = client.get(f'/sessions/{session.id}/medias', params={'channel': 'Channel 2', 'state': ['waiting_segment_review']})
+            self.assertEqual([self.serie_path.stem], [media['stem'] for media in response.json()['medias']])
+            self.assertEqual({'stem', 'filepath', 'state', 'title', 'skip_backup', 'segments'}, response.json()['medias'][0].keys())
+
+            response = client.get(f'/sessions/{session.id}/medias', params={'fields': 'unknown'})
+            self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+
+            response = client.get('/sessions/unknown-session/medias')
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+
     def test_show_video_media(self):
         session = self.session_repository.create(self.input_dir_path)
 
@@ -187,6 +341,42 @@ class TestHttpApi(unittest.TestCase):
         self.assertTrue(edl_content['skip_backup'])
 
 
+    def test_show_filmstrip(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        with self.client as client:
+            response = client.get(f'/sessions/{session.id}/medias/{self.video_path.stem}/filmstrip', params={'tiles': 4, 'columns': 2})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+        actual_filmstrip = TypeAdapter(FilmstripOut).validate_json(response.text)
+        self.assertEqual((2, 2, 160, 90), (actual_filmstrip.columns, actual_filmstrip.rows, actual_filmstrip.tile_width, actual_filmstrip.tile_height))
+        self.assertEqual(
+            [(0, 0, 0), (7.5, 160, 0), (15, 0, 90), (22.5, 160, 90)],
+            [(tile.position_s, tile.x, tile.y) for tile in actual_filmstrip.tiles]
+        )
+
+
+    def test_show_filmstrip_without_duration(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        with self.client as client, \
+             mock.patch('movie_pipeline_segments_validator.services.frame_service.get_media_duration', return_value=-1):
+            for filmstrip_path in ('filmstrip', 'filmstrip.jpg'):
+                response = client.get(f'/sessions/{session.id}/medias/{self.video_path.stem}/{filmstrip_path}', params={'tiles': 4, 'columns': 2})
+                self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code, filmstrip_path)
+
+    def test_show_video_frame_subprocess_slots_exhausted(self):
+        session = self.session_repository.create(self.input_dir_path)
+
+        with self.client as client, \
+             mock.patch.multiple(subprocess_slots, max_running=0, max_waiting=0), \
+             mock.patch.object(FrameCache, 'get', return_value=None):
+            response = client.get(f'/sessions/{session.id}/medias/{self.video_path.stem}/frames/12.5s')
+
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, response.status_code)
+        self.assertEqual('1', response.headers['Retry-After'])
+
+
     # routers/session_media_segments.py
 
     def test_load_imported_segments(self):
@@ -268,6 +458,39 @@ class TestHttpApi(unittest.TestCase):
         self.assertEqual([Segment(start=0, end=5), Segment(start=6, end=10)], actual_media.segments)
 
 
+    def test_apply_segment_operations(self):
+        session = self.session_repository.create(self.input_dir_path)
+        session.medias[self.video_path.stem].segments = [Segment(start=0, end=5), Segment(start=6, end=8), Segment(start=9, end=10)]
+        video_context = session.medias[self.video_path.stem].to_segment_validator_context(self.config)
+        self.session_repository.update_media(session.id, video_context)
+
+        operations = [
+            {'op': 'merge', 'segments': [{'start': 6, 'end': 8}, {'start': 9, 'end': 10}]},
+            {'op': 'edit', 'start': 0, 'end': 5, 'new_position': 4, 'edge': 'end'},
+            {'op': 'create', 'position': 3.5},
+            {'op': 'create', 'position': 20},
+            {'op': 'delete', 'segments': [{'start': 20, 'end': 21}]}
+        ]
+
+        with self.client as client:
+            response = client.post(f'/sessions/{session.id}/medias/{self.video_path.stem}/segments/batch', json={'operations': operations})
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(['applied', 'applied', 'ignored', 'applied', 'applied'], [result['status'] for result in response.json()['results']])
+
+            expected_segments = [Segment(start=0, end=4), Segment(start=6, end=10)]
+            self.assertEqual(expected_segments, TypeAdapter(Media).validate_python(response.json()['media']).segments)
+
+            failing_operations = [
+                {'op': 'create', 'position': 20},
+                {'op': 'delete', 'segments': [{'start': 30, 'end': 31}]},
+                {'op': 'merge', 'segments': [{'start': 0, 'end': 4}]}
+            ]
+            response = client.post(f'/sessions/{session.id}/medias/{self.video_path.stem}/segments/batch', json={'operations': failing_operations})
+            self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+            self.assertEqual(['applied', 'failed', 'skipped'], [result['status'] for result in response.json()['detail']])
+            self.assertEqual(expected_segments, self.session_repository.get_media(session.id, self.video_path.stem).segments)
+
+
     def tearDown(self) -> None:
         shutil.rmtree(self.input_dir_path)
         shutil.rmtree(self.output_dir_path)
@@ -0,0 +1,96 @@
+import re
+import unittest
+
+from fastapi import APIRouter, FastAPI, HTTPException, status
+from fastapi.testclient import TestClient
+
+from movie_pipeline_segments_validator.adapters.http.timing import MetricsRegistry, TimedRoute, TimingMiddleware
+from movie_pipeline_segments_validator.lib.timing import DB_PHASE, SUBPROCESS_PHASE, RequestTimings, timed
+
+
+class TestTiming(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry(buckets=(.1, 1.))
+
+        router = APIRouter(prefix='/items', route_class=TimedRoute)
+
+        @router.get('/{item_id}')
+        def show_item(item_id: int) -> dict[str, int]:
+            with timed(DB_PHASE):
+                pass
+            with timed(DB_PHASE):
+                pass
+
+            if item_id == 0:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+            return {'id': item_id}
+
+        @router.post('/')
+        async def create_item() -> dict[str, int]:
+            with timed(SUBPROCESS_PHASE):
+                pass
+
+            return {'id': 1}
+
+        app = FastAPI()
+        app.include_router(router)
+        app.add_middleware(TimingMiddleware, registry=self.registry)
+        self.client = TestClient(app)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/items/42')
+
+        self.assertEqual({'id': 42}, response.json())
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=\d+\.\d{3}, serialization;dur=\d+\.\d{3}, total;dur=\d+\.\d{3}$')
+
+        response = self.client.post('/items/')
+
+        self.assertEqual({'id': 1}, response.json())
+        self.assertRegex(response.headers['Server-Timing'], r'^subprocess;dur=\d+\.\d{3}, serialization;dur=\d+\.\d{3}, total;dur=\d+\.\d{3}$')
+
+    def test_recorded_metrics(self):
+        self.client.get('/items/42')
+        self.client.get('/items/0')
+        self.client.get('/unknown')
+
+        metrics = self.registry.render()
+
+        self.assertIn('http_requests_total{method="GET",route="/items/{item_id}",status="200"} 1', metrics)
+        self.assertIn('http_requests_total{method="GET",route="/items/{item_id}",status="404"} 1', metrics)
+        self.assertIn('http_requests_total{method="GET",route="<unmatched>",status="404"} 1', metrics)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"} 2', metrics)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2', metrics)
+        self.assertIn('http_request_phase_duration_seconds_count{method="GET",route="/items/{item_id}",phase="db"} 2', metrics)
+        self.assertIn('http_request_phase_duration_seconds_count{method="GET",route="/items/{item_id}",phase="serialization"} 1', metrics)
+
+        self.registry.clear()
+        self.assertNotIn('route=', self.registry.render())
+
+    def test_render_histogram(self):
+        request_timings = RequestTimings()
+        request_timings.add(DB_PHASE, .05)
+        request_timings.add(DB_PHASE, .1)
+
+        self.registry.observe('GET', '/a "quoted" route', 200, .5, request_timings)
+        self.registry.observe('GET', '/a "quoted" route', 200, 2., RequestTimings())
+
+        metrics = self.registry.render()
+        labels = r'method="GET",route="/a \"quoted\" route"'
+
+        self.assertEqual(
+            [f'{labels},le="0.1"}} 0', f'{labels},le="1.0"}} 1', f'{labels},le="+Inf"}} 2'],
+            re.findall(r'^http_request_duration_seconds_bucket\{(.*)$', metrics, re.MULTILINE)
+        )
+        self.assertIn(f'http_request_duration_seconds_sum{{{labels}}} 2.5', metrics)
+        self.assertIn(f'http_request_phase_duration_seconds_bucket{{{labels},phase="db",le="1.0"}} 1', metrics)
+
+    def test_timed_without_request_timings(self):
+        with timed(DB_PHASE):
+            result = 42
+
+        self.assertEqual(42, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,25 @@
 from contextlib import closing
+import dbm.sqlite3
 import json
 import shutil
 import unittest
 from pathlib import Path
 import re
+import sqlite3
+from unittest import mock
 
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
 from movie_pipeline_segments_validator.adapters.repository.resources import Segment as MediaSegment
-from movie_pipeline_segments_validator.adapters.repository.session_repository import SessionRepository, build_media
+from movie_pipeline_segments_validator.adapters.repository.resources import Session
+from movie_pipeline_segments_validator.adapters.repository.session_repository import (SessionRepository, SessionVersionConflict, build_media, build_medias,
+                                                                                       media_build_pool)
+from movie_pipeline_segments_validator.adapters.repository.session_watcher import SessionWatcher
 from movie_pipeline_segments_validator.domain.segment_container import Segment, SegmentContainer
 from movie_pipeline_segments_validator.services import segment_service
+from movie_pipeline_segments_validator.services.import_segments_from_file import append_last_segments_to_segment_journal, segments_journal_path
+from movie_pipeline_segments_validator.services.media_selector_service import list_medias
+from movie_pipeline_segments_validator.settings import SessionBuildSettings
 
 from ....concerns import copy_files, create_output_movies_directories, get_output_movies_directories, lazy_load_config_file
 
@@ -65,6 +74,23 @@ class TestSessionRepository(unittest.TestCase):
         self.assertEqual(['no_segment', 'waiting_segment_review'], [media.state for media in session.medias.values()])
 
 
+    def test_build_medias_in_parallel(self):
+        media_paths = list_medias(self.input_dir_path, self.config)
+        serial_medias = [build_media(media_path, self.config) for media_path in media_paths]
+
+        for session_build_settings in (
+            SessionBuildSettings(max_workers=4, chunk_size=1, min_parallel_medias=1),
+            SessionBuildSettings(max_workers=2, chunk_size=1, min_parallel_medias=1, use_process_pool=True)
+        ):
+            with self.subTest(session_build_settings=session_build_settings):
+                config = self.config.model_copy(update={'SessionBuild': session_build_settings})
+                self.assertEqual(serial_medias, build_medias(media_paths, config))
+
+        process_pool = media_build_pool.get(session_build_settings)
+        self.assertIs(process_pool, media_build_pool.get(session_build_settings), 'the process pool must be reused across batches')
+        media_build_pool.close()
+
+
     def test_get_session_exist(self):
         with closing(self.session_repository) as session_repository:
             session = session_repository.create(self.input_dir_path)
@@ -90,11 +116,211 @@ class TestSessionRepository(unittest.TestCase):
 
             segment_service.validate_segments(serie_context)
 
-            updated_session = session_repository.update_media(session.id, serie_context)
+            updated_serie_media = session_repository.update_media(session.id, serie_context)
 
-            updated_serie_media = updated_session.medias[self.serie_path.stem]
             self.assertEqual('segment_reviewed', updated_serie_media.state)
             self.assertEqual([MediaSegment(start=1526, end=3246)], updated_serie_media.segments)
+            self.assertEqual(updated_serie_media, session_repository.get_media(session.id, self.serie_path.stem))
+            self.assertEqual(updated_serie_media, session_repository.get(session.id).medias[self.serie_path.stem])
+
+
+    def test_get_media_not_found(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+
+            with self.assertRaisesRegex(KeyError, 'unknown-media'):
+                session_repository.get_media(session.id, 'unknown-media')
+
+            with self.assertRaisesRegex(KeyError, 'unknown-session'):
+                session_repository.get_media('unknown-session', self.serie_path.stem)
+
+
+    def test_get_media_probe_cached(self):
+        ffprobe_output = {
+            'streams': [
+                {'index': 0, 'codec_type': 'video', 'codec_name': 'h264', 'width': 640, 'height': 360, 'avg_frame_rate': '25/1', 'duration': 'N/A'},
+                {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac', 'tags': {'language': 'fra'}}
+            ],
+            'format': {'duration': '30.000000'}
+        }
+
+        with closing(self.session_repository) as session_repository, \
+             mock.patch('movie_pipeline_segments_validator.adapters.repository.session_repository.probe_movie', return_value=ffprobe_output) as probe_movie:
+            media_probe = session_repository.get_media_probe(self.video_path)
+
+            self.assertEqual(30., media_probe.duration)
+            self.assertEqual((640, 360, 25.), (media_probe.width, media_probe.height, media_probe.frame_rate))
+            self.assertEqual(['video', 'audio'], [stream.codec_type for stream in media_probe.streams])
+            self.assertEqual('fra', media_probe.streams[1].language)
+
+            self.assertEqual(media_probe, session_repository.get_media_probe(self.video_path))
+            self.assertEqual(1, probe_movie.call_count)
+
+            self.video_path.write_bytes(self.video_path.read_bytes() + b'\0')
+            session_repository.get_media_probe(self.video_path)
+            self.assertEqual(2, probe_movie.call_count)
+
+
+    def test_refresh_only_given_medias(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+
+            self.video_path.with_suffix('.mp4.segments.json').write_text('{}')
+            self.serie_path.with_suffix('.mp4.yml').write_text('filename: Serie Name S01E16.mp4')
+
+            session_refresh = session_repository.refresh(session.id, [self.serie_path.stem])
+            self.assertEqual(([], [], [self.serie_path.stem]), (session_refresh.added, session_refresh.removed, session_refresh.changed))
+            self.assertEqual(
+                {self.video_path.stem: 'no_segment', self.serie_path.stem: 'segment_reviewed'},
+                {stem: media.state for stem, media in session_refresh.session.medias.items()}
+            )
+
+            session_refresh = session_repository.refresh(session.id)
+            self.assertEqual([self.video_path.stem], session_refresh.changed)
+            self.assertEqual('waiting_segment_review', session_refresh.session.medias[self.video_path.stem].state)
+
+
+    def test_watcher_refresh_keep_reviewed_segments(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+            serie_context = build_media(session.medias[self.serie_path.stem]).to_segment_validator_context(self.config)
+            serie_context.segment_container.add(Segment(start=1526, end=3246))
+            serie_context.title = 'Serie Name S01E17.mp4'
+            serie_context.skip_backup = True
+            session_repository.update_media(session.id, serie_context)
+
+            with closing(SessionWatcher(self.config)) as session_watcher:
+                session_watcher.watch(session.id, self.input_dir_path)
+                append_last_segments_to_segment_journal(self.serie_path, serie_context.segment_container)
+                session_watcher._refresh(self.input_dir_path.resolve(), {segments_journal_path(self.serie_path).name})
+
+            serie_media = session_repository.get_media(session.id, self.serie_path.stem)
+            self.assertEqual(3, session_repository.get_version(session.id), 'the journal append must be picked up')
+            self.assertEqual([MediaSegment(start=1526, end=3246)], serie_media.segments)
+            self.assertEqual(('Serie Name S01E17.mp4', True), (serie_media.title, serie_media.skip_backup))
+
+
+    def test_find_medias(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+            serie_context = build_media(session.medias[self.serie_path.stem]).to_segment_validator_context(self.config)
+            serie_context.segment_container.add(Segment(start=1526, end=3246))
+            session_repository.update_media(session.id, serie_context)
+
+            def find_stems(**filters):
+                return [media['stem'] for media in session_repository.find_medias(session.id, **filters).medias]
+
+            self.assertEqual([self.serie_path.stem], find_stems(has_segments=True))
+            self.assertEqual([self.video_path.stem], find_stems(has_segments=False))
+            self.assertEqual([self.video_path.stem], find_stems(title='TITRE LONG'))
+            self.assertEqual([self.video_path.stem], find_stems(channel='Channel 1'))
+            self.assertEqual([], find_stems(channel='Channel_'))
+            self.assertEqual([self.serie_path.stem, self.video_path.stem], find_stems(sort='title', descending=True))
+
+            first_page = session_repository.find_medias(session.id, sort='title', descending=True, limit=1, fields=['segments'])
+            self.assertEqual([{'stem': self.serie_path.stem, 'segments': [{'start': 1526., 'end': 3246., 'duration': 1720.}]}], first_page.medias)
+
+            second_page = session_repository.find_medias(session.id, sort='title', descending=True, limit=1, cursor=first_page.next_cursor, fields=[])
+            self.assertEqual(([{'stem': self.video_path.stem}], None), (second_page.medias, second_page.next_cursor))
+
+            with self.assertRaisesRegex(ValueError, 'Invalid cursor'):
+                session_repository.find_medias(session.id, cursor='invalid')
+
+            with self.assertRaisesRegex(KeyError, 'unknown-session'):
+                session_repository.find_medias('unknown-session')
+
+
+    def test_add_medias_skip_stored(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+            serie_media = session.medias[self.serie_path.stem]
+
+            session_repository.delete(session.id)
+            session = session_repository.set(session.model_copy(update={'medias': {self.serie_path.stem: serie_media}}))
+
+            media_paths = list_medias(self.input_dir_path, self.config)
+            added = session_repository.add_medias(session.id, (
+                (position, media_path.path.stem, media, None)
+                for position, (media_path, media) in enumerate(zip(media_paths, build_medias(media_paths, self.config)))
+            ))
+
+            self.assertEqual([self.video_path.stem], added)
+            self.assertCountEqual([self.video_path.stem, self.serie_path.stem], session_repository.get(session.id).medias)
+
+            with self.assertRaisesRegex(KeyError, 'unknown-session'):
+                session_repository.add_medias('unknown-session', [])
+
+
+    def test_update_media_versions(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+            self.assertEqual(1, session_repository.get_version(session.id))
+
+            serie_context = build_media(session_repository.get_media(session.id, self.serie_path.stem)).to_segment_validator_context(self.config)
+            session_repository.update_media(session.id, serie_context, expected_version=1)
+            self.assertEqual(1, session_repository.get_version(session.id), 'unchanged media must keep the session version')
+
+            serie_context.segment_container.add(Segment(start=1526, end=3246))
+            session_repository.update_media(session.id, serie_context, expected_version=1)
+            self.assertEqual(2, session_repository.get(session.id).version)
+
+            with self.assertRaisesRegex(SessionVersionConflict, 'is at version 2, not 1'):
+                session_repository.update_media(session.id, serie_context, expected_version=1)
+
+            with self.assertRaises(SessionVersionConflict):
+                session_repository.delete(session.id, expected_version=1)
+
+            session_repository.delete(session.id, expected_version=2)
+
+
+    def test_get_segment_validator_context_cached(self):
+        with closing(self.session_repository) as session_repository, \
+             mock.patch('movie_pipeline_segments_validator.adapters.repository.session_repository.build_media', wraps=build_media) as mocked_build_media:
+            session = session_repository.create(self.input_dir_path)
+            mocked_build_media.reset_mock()
+
+            serie_context = session_repository.get_segment_validator_context(session.id, self.serie_path.stem)
+            serie_context.segment_container.add(Segment(start=1526, end=3246))
+            session_repository.update_media(session.id, serie_context)
+            self.assertEqual(1, mocked_build_media.call_count)
+
+            # written through
+            cached_serie_context = session_repository.get_segment_validator_context(session.id, self.serie_path.stem)
+            self.assertEqual(1, mocked_build_media.call_count)
+            self.assertEqual((Segment(start=1526, end=3246),), cached_serie_context.segment_container.segments)
+            self.assertEqual(serie_context.imported_segments, cached_serie_context.imported_segments)
+
+            # changes not stored are not cached
+            cached_serie_context.segment_container.add(Segment(start=0, end=10))
+            self.assertEqual(
+                (Segment(start=1526, end=3246),),
+                session_repository.get_segment_validator_context(session.id, self.serie_path.stem).segment_container.segments
+            )
+            self.assertEqual(1, mocked_build_media.call_count)
+
+            # nor positions, concurrent edits of a media each using their own
+            cached_serie_context.media_player.set_position(1600)
+            self.assertEqual(0, session_repository.get_segment_validator_context(session.id, self.serie_path.stem).position)
+
+            # a sidecar file change invalidates the cached context
+            self.serie_path.with_suffix('.mp4.segments.jsonl').write_text('{"result_2024-10-06T11:40:39.732479": "00:00:00.000-00:00:10.000"}\n')
+            serie_context = session_repository.get_segment_validator_context(session.id, self.serie_path.stem)
+            self.assertEqual(2, mocked_build_media.call_count)
+            self.assertEqual('00:00:00.000-00:00:10.000,', next(iter(serie_context.imported_segments.values())))
+
+            # a session change invalidates the cached context
+            video_context = build_media(session.medias[self.video_path.stem]).to_segment_validator_context(self.config)
+            video_context.segment_container.add(Segment(start=0, end=10))
+            session_repository.update_media(session.id, video_context)
+            session_repository.get_segment_validator_context(session.id, self.serie_path.stem)
+            self.assertEqual(3, mocked_build_media.call_count)
+
+            with self.assertRaisesRegex(KeyError, 'unknown-media'):
+                session_repository.get_segment_validator_context(session.id, 'unknown-media')
+
+            session_repository.delete(session.id)
+            with self.assertRaisesRegex(KeyError, session.id):
+                session_repository.get_segment_validator_context(session.id, self.serie_path.stem)
 
 
     def test_update_media_invalid(self):
@@ -119,12 +345,66 @@ class TestSessionRepository(unittest.TestCase):
                 session_repository.get(session.id)
 
 
+    def test_session_locks_released(self):
+        session_locks = SessionRepository._SessionRepository__session_locks  # type: ignore
+
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+
+            with session_repository.lock(session.id):
+                self.assertIn((session_repository._db_path, session.id), session_locks)
+
+            with self.assertRaisesRegex(KeyError, 'unknown-session'):
+                session_repository.delete('unknown-session')
+
+            session_repository.delete(session.id)
+            self.assertEqual([], [key for key in session_locks if key[0] == session_repository._db_path])
+
+
     def test_destroy_session_not_found(self):
         with self.assertRaisesRegex(KeyError, 'unknown-session'):
             with closing(self.session_repository) as session_repository:
                 session_repository.get('unknown-session')
 
 
+    def test_migrate_blob_database(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+            session.medias[self.serie_path.stem].segments = [MediaSegment(start=1526, end=3246)]
+
+        legacy_db_path = self.config.Paths.db_path.with_name('sessions.legacy.sqlite3')
+        with dbm.sqlite3.open(legacy_db_path, 'c') as db:
+            db[session.id] = TypeAdapter(Session).dump_json(session)
+
+        legacy_config = self.config.model_copy(update={'Paths': self.config.Paths.model_copy(update={'db_path': legacy_db_path})})
+        with closing(SessionRepository(legacy_config)) as session_repository:
+            self.assertEqual(session, session_repository.get(session.id))
+
+        with closing(sqlite3.connect(legacy_db_path)) as db:
+            self.assertIsNone(db.execute("SELECT 1 FROM sqlite_master WHERE name = 'Dict'").fetchone())
+
+
+    def test_migrate_blob_database_keep_invalid_sessions(self):
+        with closing(self.session_repository) as session_repository:
+            session = session_repository.create(self.input_dir_path)
+
+        legacy_db_path = self.config.Paths.db_path.with_name('sessions.legacy_invalid.sqlite3')
+        with dbm.sqlite3.open(legacy_db_path, 'c') as db:
+            db[session.id] = TypeAdapter(Session).dump_json(session)
+            db['invalid-session'] = b'{"id": "invalid-session"}'
+
+        legacy_config = self.config.model_copy(update={'Paths': self.config.Paths.model_copy(update={'db_path': legacy_db_path})})
+        with closing(SessionRepository(legacy_config)) as session_repository:
+            self.assertEqual(session, session_repository.get(session.id))
+
+            with self.assertRaisesRegex(KeyError, 'invalid-session'):
+                session_repository.get('invalid-session')
+
+        with closing(sqlite3.connect(legacy_db_path)) as db:
+            self.assertIsNone(db.execute("SELECT 1 FROM sqlite_master WHERE name = 'Dict'").fetchone())
+            self.assertEqual([(b'invalid-session',)], db.execute('SELECT key FROM Dict_unmigrated').fetchall())
+
+
     def tearDown(self) -> None:
         shutil.rmtree(self.input_dir_path)
         shutil.rmtree(self.output_dir_path)
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import unittest
+
+from movie_pipeline_segments_validator.adapters.http.routers.sessions import stream_session_events
+from movie_pipeline_segments_validator.adapters.repository.session_events import SessionEvent, SessionEventBus, session_event_bus
+
+
+class TestSessionEventBus(unittest.TestCase):
+    def test_publish_from_another_thread(self):
+        event_bus = SessionEventBus()
+
+        async def receive():
+            with event_bus.subscribe('session-1') as events, event_bus.subscribe('session-2') as other_events:
+                publisher = threading.Thread(target=event_bus.publish, args=(SessionEvent(type='media_updated', session_id='session-1', media_stem='media'),))
+                publisher.start()
+                event = await asyncio.wait_for(events.get(), timeout=5)
+                publisher.join()
+
+                self.assertTrue(other_events.empty())
+                return event
+
+        event = asyncio.run(receive())
+
+        self.assertEqual(('media_updated', 'media'), (event.type, event.media_stem))
+        self.assertEqual(0, event_bus.subscriber_count('session-1'))
+
+    def test_resync_slow_subscriber(self):
+        event_bus = SessionEventBus(max_queued_events=2)
+
+        async def receive():
+            with event_bus.subscribe('session-1') as events:
+                for _ in range(3):
+                    event_bus.publish(SessionEvent(type='session_updated', session_id='session-1'))
+                await asyncio.sleep(0)
+                return [events.get_nowait() for _ in range(events.qsize())]
+
+        self.assertEqual(['resync'], [event.type for event in asyncio.run(receive())])
+
+    def test_stream_session_events(self):
+        async def stream():
+            messages = stream_session_events('session-1')
+            received = [await anext(messages)]
+
+            session_event_bus.publish(SessionEvent(type='media_updated', session_id='session-1', media_stem='media', state='segment_reviewed'))
+            session_event_bus.publish(SessionEvent(type='session_deleted', session_id='session-1'))
+            received += [message async for message in messages]
+            return received
+
+        retry, media_updated, session_deleted = asyncio.run(stream())
+
+        self.assertEqual('retry: 3000\n\n', retry)
+        self.assertTrue(media_updated.startswith('event: media_updated\ndata: {'))
+        self.assertIn('"state":"segment_reviewed"', media_updated)
+        self.assertNotIn('"added"', media_updated)
+        self.assertTrue(session_deleted.startswith('event: session_deleted\n'))
+        self.assertEqual(0, session_event_bus.subscriber_count('session-1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
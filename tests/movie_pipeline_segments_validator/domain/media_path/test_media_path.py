@@ -1,10 +1,11 @@
 # Generated by deepseek-r1:32b
 
+import pickle
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
-from movie_pipeline_segments_validator.domain.media_path import MediaPath
+from movie_pipeline_segments_validator.domain.media_path import MediaDirIndex, MediaPath
 
 
 class TestMediaPath(unittest.TestCase):
@@ -63,6 +64,42 @@ class TestMediaPath(unittest.TestCase):
         media = MediaPath(self.media_file)
         self.assertEqual(media.state, 'media_processing')
 
+    def test_state_with_reviewed_segments_text_file(self):
+        """Test that a text file of reviewed segments does not mean processing is in progress"""
+        (self.media_file.with_suffix('.txt.metadata.json')).touch()
+        (self.media_file.with_suffix('.txt.segments.json')).touch()
+        (self.media_file.with_suffix('.txt.yml.txt')).touch()
+        media = MediaPath(self.media_file)
+        self.assertEqual(media.state, 'waiting_segment_review')
+
+    def test_dir_index_groups_sidecars_by_media(self):
+        """Test that a single directory scan gives the state of every media"""
+        other_media_file = self.media_file.with_name('other_file.txt')
+        other_media_file.touch()
+        (other_media_file.with_suffix('.txt.metadata.json')).touch()
+        (self.media_file.with_suffix('.txt.yml')).touch()
+
+        media_dir_index = MediaDirIndex.scan(Path(self.temp_dir.name), '.txt')
+
+        self.assertEqual({self.media_file, other_media_file}, set(media_dir_index.media_paths))
+        self.assertEqual(MediaPath(self.media_file, media_dir_index).state, 'segment_reviewed')
+        self.assertEqual(MediaPath(other_media_file, media_dir_index).state, 'no_segment')
+
+    def test_pickle_only_media_entries_of_dir_index(self):
+        """Test that a media path sent to a worker process only carries its own directory entries"""
+        other_media_file = self.media_file.with_name('other_file.txt')
+        other_media_file.touch()
+        (other_media_file.with_suffix('.txt.metadata.json')).touch()
+        (self.media_file.with_suffix('.txt.yml')).touch()
+
+        media = MediaPath(self.media_file, MediaDirIndex.scan(Path(self.temp_dir.name), '.txt'))
+        unpickled_media = pickle.loads(pickle.dumps(media))
+
+        self.assertEqual([self.media_file], unpickled_media.media_dir_index.media_paths)
+        self.assertEqual(['test_file.txt'], list(unpickled_media.media_dir_index.sidecar_suffixes))
+        self.assertEqual((media.state, media.fingerprint), (unpickled_media.state, unpickled_media.fingerprint))
+        self.assertEqual(2, len(media.media_dir_index.media_paths))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 # Generated by llama3
 
+import random
 import unittest
 
 from movie_pipeline_segments_validator.domain.detected_segments import humanize_segments
@@ -68,6 +69,47 @@ class TestSegmentContainer(unittest.TestCase):
         merged_segment = Segment(6.0, 10.0)
         self.assertIn(merged_segment, self.segment_container.segments)
 
+    def test_nested_and_touching_segments(self):
+        """Test the overlap rule: only the bounds of the other segments are looked for within the new one."""
+        self.segment_container.add_many([Segment(0.0, 10.0), Segment(2.0, 3.0), Segment(10.0, 12.0), Segment(0.0, 10.0)])
+        self.assertEqual((Segment(0.0, 10.0), Segment(2.0, 3.0)), self.segment_container.segments)
+
+        self.segment_container.edit(Segment(2.0, 3.0), Segment(1.0, 4.0))
+        self.assertEqual((Segment(0.0, 10.0), Segment(1.0, 4.0)), self.segment_container.segments)
+
+        with self.assertRaises(KeyError):
+            self.segment_container.edit(Segment(20.0, 21.0), Segment(22.0, 23.0))
+
+    def test_same_segments_as_linear_scan(self):
+        """Test random operations keep the same segments as checking every segment on each operation."""
+        rng = random.Random(42)
+        expected_segments: set[Segment] = set()
+
+        for _ in range(2000):
+            start = rng.randrange(0, 500)
+            new_segment = Segment(start, start + rng.randrange(0, 10))
+            operation = rng.choice(('add', 'edit', 'remove', 'merge')) if expected_segments else 'add'
+
+            if operation == 'add':
+                if SegmentContainer.check_validity(expected_segments, new_segment):
+                    expected_segments.add(new_segment)
+                self.segment_container.add(new_segment)
+            elif operation == 'edit':
+                old_segment = rng.choice(sorted(expected_segments))
+                if SegmentContainer.check_validity(expected_segments - {old_segment}, new_segment):
+                    expected_segments = (expected_segments - {old_segment}) | {new_segment}
+                self.segment_container.edit(old_segment, new_segment)
+            elif operation == 'remove':
+                old_segment = rng.choice(sorted(expected_segments))
+                expected_segments.remove(old_segment)
+                self.segment_container.remove(old_segment)
+            else:
+                merged_segments = rng.sample(sorted(expected_segments), min(2, len(expected_segments)))
+                expected_segments = (expected_segments - set(merged_segments)) | {Segment(min(merged_segments).start, max(merged_segments).end)}
+                self.segment_container.merge(merged_segments)
+
+            self.assertEqual(tuple(sorted(expected_segments)), self.segment_container.segments)
+
     def test_representation(self):
         """Test the string representation of the SegmentContainer."""
         segment1 = Segment(0.0, 5.0)
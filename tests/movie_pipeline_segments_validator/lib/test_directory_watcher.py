@@ -0,0 +1,55 @@
+import queue
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from movie_pipeline_segments_validator.lib.directory_watcher import DirectoryWatcher, InotifyDirectoryWatcher, PollingDirectoryWatcher
+
+
+class DirectoryWatcherTestMixin:
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.root_path = Path(self.temp_dir.name)
+        self.media_path = self.root_path / 'Channel 1_Movie Name_2022-12-05-2203-20.ts'
+        self.media_path.touch()
+
+        self.changes: queue.Queue[set[str]] = queue.Queue()
+        self.watcher = self.create_watcher()
+        self.watcher.start()
+
+    def tearDown(self):
+        self.watcher.close()
+        self.temp_dir.cleanup()
+
+    def create_watcher(self) -> DirectoryWatcher:
+        ...
+
+    def test_report_debounced_changes(self):
+        self.media_path.with_suffix('.ts.metadata.json').write_text('{}')
+        self.media_path.with_suffix('.ts.segments.json').write_text('{}')
+        self.media_path.with_suffix('.ts.yml.done').touch()
+
+        self.assertEqual(
+            {f'{self.media_path.name}.metadata.json', f'{self.media_path.name}.segments.json', f'{self.media_path.name}.yml.done'},
+            self.changes.get(timeout=5)
+        )
+
+    def test_report_removed_entries(self):
+        self.media_path.unlink()
+        self.assertEqual({self.media_path.name}, self.changes.get(timeout=5))
+
+
+class TestPollingDirectoryWatcher(DirectoryWatcherTestMixin, unittest.TestCase):
+    def create_watcher(self):
+        return PollingDirectoryWatcher(self.root_path, self.changes.put, debounce_s=.3, max_delay_s=2., poll_interval_s=.1)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on Linux')
+class TestInotifyDirectoryWatcher(DirectoryWatcherTestMixin, unittest.TestCase):
+    def create_watcher(self):
+        return InotifyDirectoryWatcher(self.root_path, self.changes.put, debounce_s=.2, max_delay_s=2.)
+
+
+if __name__ == '__main__':
+    unittest.main()
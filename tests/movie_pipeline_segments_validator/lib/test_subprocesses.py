@@ -0,0 +1,120 @@
+import asyncio
+import subprocess
+import sys
+import time
+import unittest
+from threading import Thread
+
+from movie_pipeline_segments_validator.lib import subprocesses
+from movie_pipeline_segments_validator.lib.subprocesses import (SubprocessSlots, SubprocessSlotsExhausted, open_subprocess, run_subprocess,
+                                                                  run_subprocess_async)
+
+
+class TestSubprocessSlots(unittest.IsolatedAsyncioTestCase):
+    async def test_acquire_async_waits_first_come_first_served(self):
+        slots = SubprocessSlots(max_running=1, max_waiting=2, wait_timeout_s=5.)
+        acquired = []
+
+        async def acquire(name: str, hold_s: float):
+            async with slots.acquire_async():
+                acquired.append(name)
+                await asyncio.sleep(hold_s)
+
+        first = asyncio.create_task(acquire('first', .05))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(acquire(name, 0)) for name in ('second', 'third')]
+        await asyncio.sleep(0)
+
+        self.assertEqual((1, 2), (slots.running, slots.waiting))
+        with self.assertRaises(SubprocessSlotsExhausted):
+            async with slots.acquire_async():
+                pass
+
+        await asyncio.gather(first, *waiting)
+        self.assertEqual(['first', 'second', 'third'], acquired)
+        self.assertEqual((0, 0), (slots.running, slots.waiting))
+
+    async def test_acquire_async_timeout_and_cancellation(self):
+        slots = SubprocessSlots(max_running=1, max_waiting=2, wait_timeout_s=.05)
+
+        async with slots.acquire_async():
+            with self.assertRaises(SubprocessSlotsExhausted):
+                async with slots.acquire_async():
+                    pass
+
+            async def acquire():
+                async with slots.acquire_async():
+                    pass
+
+            cancelled = asyncio.create_task(acquire())
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await cancelled
+
+            self.assertEqual((1, 0), (slots.running, slots.waiting))
+
+        self.assertEqual(0, slots.running)
+
+    async def test_slots_shared_by_threads_and_event_loop(self):
+        slots = SubprocessSlots(max_running=1, max_waiting=1, wait_timeout_s=5.)
+
+        def hold_slot():
+            with slots.acquire():
+                time.sleep(.05)
+
+        thread = Thread(target=hold_slot)
+        thread.start()
+        while slots.running == 0:
+            await asyncio.sleep(.001)
+
+        started_at = time.perf_counter()
+        async with slots.acquire_async():
+            self.assertGreater(time.perf_counter() - started_at, .01)
+
+        await asyncio.to_thread(thread.join)
+        self.assertEqual(0, slots.running)
+
+
+class TestRunSubprocess(unittest.IsolatedAsyncioTestCase):
+    async def test_run_subprocess(self):
+        cmd = (sys.executable, '-c', 'import sys; sys.stdout.write("out"); sys.exit(3)')
+
+        process = await run_subprocess_async(cmd)
+        self.assertEqual((3, b'out'), (process.returncode, process.stdout))
+
+        process = run_subprocess(cmd)
+        self.assertEqual((3, b'out'), (process.returncode, process.stdout))
+
+    async def test_run_subprocess_async_killed_when_cancelled(self):
+        started_at = time.perf_counter()
+        task = asyncio.create_task(run_subprocess_async((sys.executable, '-c', 'import time; time.sleep(30)')))
+        await asyncio.sleep(.2)
+
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        self.assertLess(time.perf_counter() - started_at, 10)
+        self.assertEqual(0, subprocesses.subprocess_slots.running)
+
+    def test_open_subprocess(self):
+        with open_subprocess((sys.executable, '-c', 'print("line 1"); print("line 2")'), timeout_s=10.) as process:
+            self.assertEqual(1, subprocesses.subprocess_slots.running)
+            self.assertEqual(['line 1\n', 'line 2\n'], list(process.stdout or ()))
+
+        self.assertEqual((0, 0), (process.returncode, subprocesses.subprocess_slots.running))
+
+    def test_open_subprocess_killed_after_timeout(self):
+        started_at = time.perf_counter()
+
+        with self.assertRaises(subprocess.TimeoutExpired):
+            with open_subprocess((sys.executable, '-c', 'import time; time.sleep(30)'), timeout_s=.2) as process:
+                list(process.stdout or ())
+
+        self.assertLess(time.perf_counter() - started_at, 10)
+        self.assertEqual(0, subprocesses.subprocess_slots.running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import time
+import unittest
+from datetime import timedelta
+
+from movie_pipeline_segments_validator.domain.movie_segments import MovieSegments
+from movie_pipeline_segments_validator.lib.timestamp_codec import (BULK_MIN_SIZE, decode_position, decode_positions,
+                                                                   decode_segments, encode_position, encode_positions,
+                                                                   encode_segments)
+
+
+def reference_seconds_to_position(seconds: float) -> str:
+    formatted_time = time.strftime('%H:%M:%S', time.gmtime(seconds))
+    formatted_decimal_part = f'{(seconds % 1):.3f}'.removeprefix('0')
+    return f"{formatted_time}{formatted_decimal_part}"
+
+
+def reference_position_in_seconds(position: str) -> float:
+    hours, mins, secs = position.split(':', maxsplit=3)
+    return timedelta(hours=int(hours), minutes=int(mins), seconds=float(secs)).total_seconds()
+
+
+class TestTimestampCodec(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+        self.edge_seconds = [
+            0., 0.0005, 0.0015, 0.0625, 0.1, 0.9995, 5.9999, 59.9996, 3599.9999, 3600., 86399.9999,
+            86400., 86400.5, 90061.001, 123456.789, 26.12, 1e-9, 1 - 1e-12
+        ]
+
+    def test_encode_position(self):
+        seconds = self.edge_seconds + [self.random.uniform(0, 200_000) for _ in range(2000)]
+
+        for second in seconds:
+            with self.subTest(second=second):
+                self.assertEqual(reference_seconds_to_position(second), encode_position(second))
+
+        self.assertEqual('00:00:051.000', encode_position(5.9999))
+
+    def test_encode_positions(self):
+        for size in (0, 1, BULK_MIN_SIZE - 1, BULK_MIN_SIZE, 5000):
+            seconds = (self.edge_seconds + [self.random.uniform(0, 200_000) for _ in range(size)])[:size]
+            rounded_seconds = [round(second, self.random.choice((2, 3, 4))) for second in seconds]
+            ties = [self.random.randrange(0, 100_000) + self.random.randrange(0, 1000) / 1000 + .0005 for _ in range(size)]
+
+            for values in (seconds, rounded_seconds, ties):
+                with self.subTest(size=size):
+                    self.assertEqual([reference_seconds_to_position(value) for value in values], encode_positions(values))
+
+    def test_decode_position(self):
+        positions = [
+            '00:00:00.000', '00:00:05.5', '00:00:26.12', '00:00:26.120', '01:02:03.456', '99:59:59.999',
+            '00:00:051.000', '00:00:00.0000005', '00:00:00.0000015', '1:2:3', '00:00:-0.5'
+        ]
+
+        for position in positions:
+            with self.subTest(position=position):
+                self.assertEqual(reference_position_in_seconds(position), decode_position(position))
+
+    def test_decode_positions(self):
+        for size in (0, 1, BULK_MIN_SIZE - 1, BULK_MIN_SIZE, 5000):
+            seconds = [self.random.uniform(0, 86400) for _ in range(size)]
+            positions = [reference_seconds_to_position(second) for second in seconds]
+            two_digits_positions = [position[:-1] for position in positions]
+            mixed_positions = positions[:size // 2] + ['00:00:051.000', '1:2:3.4'] + positions[size // 2:]
+
+            for values in (positions, two_digits_positions, mixed_positions):
+                with self.subTest(size=size):
+                    self.assertEqual([reference_position_in_seconds(value) for value in values], decode_positions(values))
+
+    def test_encode_decode_segments(self):
+        segments = sorted(
+            (start, start + self.random.uniform(0.1, 600))
+            for start in (self.random.uniform(0, 20_000) for _ in range(50))
+        )
+        raw_segments = ','.join(f'{reference_seconds_to_position(start)}-{reference_seconds_to_position(end)}' for start, end in segments)
+
+        self.assertEqual(raw_segments, encode_segments(segments))
+        self.assertEqual(
+            [(reference_position_in_seconds(start), reference_position_in_seconds(end)) for start, end in (segment.split('-') for segment in raw_segments.split(','))],
+            decode_segments(raw_segments + ',')
+        )
+        self.assertEqual([], decode_segments(''))
+        self.assertEqual([], MovieSegments(',').segments)
+        self.assertEqual([(0., 5.5), (10., 20.25)], MovieSegments('00:00:00.000-00:00:05.500,00:00:10.000-00:00:20.250,').segments)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from movie_pipeline_segments_validator.lib.video_player.decoder_video_player import DecoderVideoPlayer, DecoderVideoPlayerPool
+
+media_path = Path('Channel 1_Movie Name_2022-12-05-2203-20.ts')
+
+
+def build_fake_decoder(source, frame_format, custom_ffmpeg, **ffparams):
+    start_frame = round(float(ffparams['-ffprefixes'][1]) * 25)
+
+    decoder = mock.Mock()
+    decoder.formulate.return_value = decoder
+    decoder.metadata = json.dumps({'output_framerate': 25.0, 'source_duration_sec': 30.0})
+    decoder.generateFrame.return_value = (np.full((2, 2, 3), index, dtype=np.uint16) for index in range(start_frame, 30 * 25))
+    return decoder
+
+
+class TestDecoderVideoPlayer(unittest.TestCase):
+    def setUp(self):
+        self.ffdecoder = self.enterContext(mock.patch(
+            'movie_pipeline_segments_validator.lib.video_player.decoder_video_player.FFdecoder',
+            side_effect=build_fake_decoder
+        ))
+
+    def test_read_frame_decodes_ahead_for_nearby_forward_positions(self):
+        player = DecoderVideoPlayer(media_path, max_decode_ahead_s=5.)
+
+        self.assertEqual(25, player.read_frame(1.)[0, 0, 0])
+        self.assertEqual(30, player.read_frame(1.2)[0, 0, 0])
+        self.assertEqual(30, player.read_frame(1.2)[0, 0, 0])
+        self.assertEqual(100, player.read_frame(4.)[0, 0, 0])
+
+        self.ffdecoder.assert_called_once()
+        self.assertEqual(30., player.duration)
+        self.assertEqual(4., player.position)
+
+    def test_read_frame_seeks_for_backward_or_far_positions(self):
+        player = DecoderVideoPlayer(media_path, max_decode_ahead_s=5.)
+
+        player.read_frame(10.)
+        self.assertEqual(125, player.read_frame(5.)[0, 0, 0])
+        self.assertEqual(500, player.read_frame(20.)[0, 0, 0])
+
+        self.assertEqual(3, self.ffdecoder.call_count)
+
+    def test_read_frame_out_of_media(self):
+        player = DecoderVideoPlayer(media_path)
+
+        with self.assertRaisesRegex(ValueError, 'No frame at 31.0s'):
+            player.read_frame(31.)
+
+    def test_pool_reaps_idle_decoders(self):
+        decoder_pool = DecoderVideoPlayerPool(idle_timeout_s=60, max_decode_ahead_s=5.)
+        player = decoder_pool.get(media_path)
+        player.read_frame(1.)
+
+        self.assertIs(player, decoder_pool.get(media_path))
+
+        player.last_used_at -= 120
+        decoder_pool.reap_idle()
+        self.assertIsNot(player, decoder_pool.get(media_path))
+        decoder_pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from movie_pipeline_segments_validator.lib.video_player.frame_cache import FrameCache
+
+
+class TestFrameCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.media_path = Path(self.temp_dir.name) / 'Channel 1_Movie Name_2022-12-05-2203-20.ts'
+        self.media_path.write_bytes(b'media')
+        self.disk_path = Path(self.temp_dir.name) / 'frames'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build_frame_cache(self, memory_max_bytes=1024, disk_max_bytes=1024):
+        return FrameCache(self.disk_path, memory_max_bytes, disk_max_bytes, position_step_s=0.04)
+
+    def test_get_or_extract_extracts_once_per_quantized_position(self):
+        frame_cache = self.build_frame_cache()
+        extract = mock.Mock(return_value=b'frame')
+
+        self.assertEqual(b'frame', frame_cache.get_or_extract(self.media_path, 10.01, extract, vcodec='mjpeg'))
+        self.assertEqual(b'frame', frame_cache.get_or_extract(self.media_path, 10.0, extract, vcodec='mjpeg'))
+
+        extract.assert_called_once_with(10.0)
+        self.assertEqual((1, 1), (frame_cache.stats.memory_hits, frame_cache.stats.misses))
+
+    def test_get_or_extract_async_extracts_once_per_quantized_position(self):
+        frame_cache = self.build_frame_cache()
+        extract = mock.AsyncMock(return_value=b'frame')
+
+        async def get_frames():
+            return [await frame_cache.get_or_extract_async(self.media_path, position_s, extract, vcodec='mjpeg') for position_s in (10.01, 10.0)]
+
+        self.assertEqual([b'frame', b'frame'], asyncio.run(get_frames()))
+
+        extract.assert_awaited_once_with(10.0)
+        self.assertEqual((1, 1), (frame_cache.stats.memory_hits, frame_cache.stats.misses))
+
+    def test_key_depends_on_output_options_and_media_identity(self):
+        frame_cache = self.build_frame_cache()
+        key = frame_cache.key(self.media_path, 10, vcodec='mjpeg')
+
+        self.assertNotEqual(key, frame_cache.key(self.media_path, 10, vcodec='png'))
+
+        self.media_path.write_bytes(b'media rewritten')
+        self.assertNotEqual(key, frame_cache.key(self.media_path, 10, vcodec='mjpeg'))
+
+    def test_disk_tier_survives_new_instance(self):
+        frame_cache = self.build_frame_cache()
+        key = frame_cache.key(self.media_path, 10)
+        frame_cache.set(key, b'frame')
+
+        new_frame_cache = self.build_frame_cache()
+        self.assertEqual(b'frame', new_frame_cache.get(key))
+        self.assertEqual(1, new_frame_cache.stats.disk_hits)
+
+    def test_evict_least_recently_used_frames(self):
+        frame_cache = self.build_frame_cache(memory_max_bytes=10, disk_max_bytes=10)
+        first_key, second_key, third_key = (frame_cache.key(self.media_path, position) for position in (1, 2, 3))
+
+        frame_cache.set(first_key, b'12345')
+        frame_cache.set(second_key, b'12345')
+        frame_cache.set(third_key, b'12345')
+
+        self.assertIsNone(frame_cache.get(first_key))
+        self.assertEqual(b'12345', frame_cache.get(third_key))
+        self.assertEqual((2, 10), (frame_cache.stats.disk_entries, frame_cache.stats.disk_bytes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import io
+import unittest
+from array import array
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from movie_pipeline_segments_validator.lib.video_player.keyframe_index import KeyframeIndex, KeyframeIndexStore, scan_keyframes
+
+ffprobe_packets_output = '''\
+pts_time=1.400000|duration_time=0.040000|pos=564|flags=K__
+pts_time=1.480000|duration_time=0.040000|pos=9024|flags=___
+pts_time=1.440000|duration_time=0.040000|pos=12220|flags=___
+pts_time=N/A|duration_time=N/A|pos=13160|flags=___
+pts_time=3.400000|duration_time=0.040000|pos=80276|flags=K__
+pts_time=3.440000|duration_time=0.040000|pos=90052|flags=___
+'''
+
+
+class TestKeyframeIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.media_path = Path(self.temp_dir.name) / 'Channel 1_Movie Name_2022-12-05-2203-20.ts'
+        self.media_path.write_bytes(b'media')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def scan_media_keyframes(self):
+        process = mock.MagicMock(stdout=io.StringIO(ffprobe_packets_output), returncode=0)
+        process.__enter__.return_value = process
+
+        with mock.patch('subprocess.Popen', return_value=process):
+            return scan_keyframes(self.media_path)
+
+    def test_scan_keyframes(self):
+        keyframe_index = self.scan_media_keyframes()
+
+        self.assertEqual(array('d', [1.4, 3.4]), keyframe_index.pts)
+        self.assertEqual(array('q', [564, 80276]), keyframe_index.positions)
+        self.assertAlmostEqual(2.08, keyframe_index.duration)
+
+    def test_seek_point(self):
+        keyframe_index = self.scan_media_keyframes()
+
+        self.assertEqual((1.4, 564), keyframe_index.seek_point(0))
+        self.assertEqual((1.4, 564), keyframe_index.seek_point(1.99))
+        self.assertEqual((3.4, 80276), keyframe_index.seek_point(2))
+
+    def test_binary_round_trip(self):
+        keyframe_index = self.scan_media_keyframes()
+        self.assertEqual(keyframe_index, KeyframeIndex.from_bytes(keyframe_index.to_bytes()))
+
+    def test_store_invalidates_index_when_media_changes(self):
+        keyframe_index_store = KeyframeIndexStore(Path(self.temp_dir.name) / 'keyframes')
+
+        with mock.patch('movie_pipeline_segments_validator.lib.video_player.keyframe_index.scan_keyframes', return_value=self.scan_media_keyframes()):
+            keyframe_index_store.build(self.media_path)
+
+        self.assertIsNotNone(KeyframeIndexStore(Path(self.temp_dir.name) / 'keyframes').get(self.media_path))
+
+        self.media_path.write_bytes(b'media rewritten')
+        self.assertIsNone(keyframe_index_store.get(self.media_path))
+        keyframe_index_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
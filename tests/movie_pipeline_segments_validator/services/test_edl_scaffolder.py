@@ -0,0 +1,72 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from typing import cast
+
+from movie_pipeline_segments_validator.services.edl_scaffolder import TitleExtractionEngine, get_title_extraction_engine, get_title_strategy_context
+from movie_pipeline_segments_validator.settings import PathContent, Settings
+
+
+def fake_config(title_strategies: dict[str, str], series_extracted_metadata: dict):
+    return cast(Settings, SimpleNamespace(PathsContent=PathContent(
+        title_strategies=title_strategies,
+        title_re_blacklist=r'\s*\(VM\)',
+        series_extracted_metadata=series_extracted_metadata
+    )))
+
+
+class TestTitleExtractionEngine(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.input_dir_path = Path(self.temp_dir.name)
+
+        self.serie_path = self.input_dir_path / 'Channel 2_Serie Name_2022-12-05-2203-20.ts'
+        self.serie_path.with_suffix('.ts.metadata.json').write_text(json.dumps({
+            "title": "Serie Name",
+            "sub_title": "Serie Name : Episode Name. Série policière. 2022. Saison 1. 16/26.",
+            "description": ""
+        }), encoding='utf-8')
+
+        self.config = fake_config(
+            title_strategies={'Channel 2': 'SerieSubTitleAwareTitleExtractor'},
+            series_extracted_metadata={'Other Serie': {'Épisode Name': {'formattedEpisode': 'S03E42'}}}
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_extract_titles(self):
+        title_extraction_engine = TitleExtractionEngine(get_title_strategy_context(self.config))
+
+        self.assertEqual(
+            ['Movie Name', 'Serie Name S01E16', 'Other Serie S03E42', 'Nom du fichier converti.mp4'],
+            title_extraction_engine.extract_titles([
+                self.input_dir_path / 'Channel 1_Movie Name (VM)_2022-12-05-2203-20.ts',
+                self.serie_path,
+                self.input_dir_path / "Channel 1_Other Serie 'episode name'_2022-12-05-2203-20.ts",
+                self.input_dir_path / 'recording.ts'
+            ])
+        )
+
+    def test_invalid_strategy_only_fails_its_channel(self):
+        title_strategy_context = get_title_strategy_context(self.config)
+        title_strategy_context.titles_strategies = {**title_strategy_context.titles_strategies, 'Channel 3': 'UnknownTitleExtractor'}
+        title_extraction_engine = TitleExtractionEngine(title_strategy_context)
+
+        self.assertEqual('Serie Name S01E16', title_extraction_engine.extract_title(self.serie_path))
+
+        with self.assertRaises(AttributeError):
+            title_extraction_engine.extract_title(self.input_dir_path / 'Channel 3_Movie Name_2022-12-05-2203-20.ts')
+
+    def test_reuse_engine_until_settings_change(self):
+        title_extraction_engine = get_title_extraction_engine(self.config)
+        self.assertIs(title_extraction_engine, get_title_extraction_engine(self.config))
+
+        reloaded_config = fake_config(title_strategies={'Channel 2': 'NaiveTitleExtractor'}, series_extracted_metadata={})
+        self.assertIsNot(title_extraction_engine, get_title_extraction_engine(reloaded_config))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from movie_pipeline_segments_validator.lib.video_player.frame_cache import FrameCache
+from movie_pipeline_segments_validator.services.frame_prefetcher import FramePrefetcher, positions_around
+
+
+class TestFramePrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.media_path = Path(self.temp_dir.name) / 'Channel 1_Movie Name_2022-12-05-2203-20.ts'
+        self.media_path.write_bytes(b'media')
+        self.frame_cache = FrameCache(Path(self.temp_dir.name) / 'frames', 1024, 1024, position_step_s=0.04)
+        self.extract_frame = self.enterContext(mock.patch('movie_pipeline_segments_validator.services.frame_service.extract_frame', return_value=b'frame'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_positions_around_nearest_first(self):
+        self.assertEqual([10, 9.5, 10.5, 9, 11], positions_around(10, window_s=1, step_s=.5))
+        self.assertEqual([0, 0.5], positions_around(0, window_s=.5, step_s=.5))
+
+    def test_prefetch_around_edges_warms_frame_cache(self):
+        frame_prefetcher = FramePrefetcher(self.frame_cache, window_s=.5, step_s=.5, max_workers=2, max_pending=64)
+
+        scheduled_count = frame_prefetcher.prefetch_around_edges(self.media_path, [(10, 20), (20, 30)])
+        frame_prefetcher._executor.shutdown(wait=True)
+
+        self.assertEqual(9, scheduled_count)
+        self.assertEqual(9, self.extract_frame.call_count)
+        self.assertEqual(9, self.frame_cache.stats.memory_entries)
+
+    def test_prefetch_is_bounded(self):
+        frame_prefetcher = FramePrefetcher(self.frame_cache, window_s=1, step_s=.5, max_workers=1, max_pending=2)
+
+        with mock.patch.object(frame_prefetcher._executor, 'submit') as submit:
+            self.assertEqual(2, frame_prefetcher.prefetch_around(self.media_path, 10))
+            self.assertEqual(0, frame_prefetcher.prefetch_around(self.media_path, 20))
+            self.assertEqual(2, submit.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from movie_pipeline_segments_validator.domain.segment_container import Segment, SegmentContainer
+from movie_pipeline_segments_validator.services import import_segments_from_file
+from movie_pipeline_segments_validator.services.import_segments_from_file import (append_last_segments_to_segment_journal,
+                                                                                  compact_segments_journal, import_segments,
+                                                                                  read_latest_results)
+
+
+class TestImportSegmentsFromFile(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.media_path = Path(self.temp_dir.name) / 'Channel 1_Movie Name_2022-12-05-2203-20.ts'
+        self.segments_path = self.media_path.with_suffix('.ts.segments.json')
+        self.journal_path = self.media_path.with_suffix('.ts.segments.jsonl')
+
+        self.segments_path.write_text(json.dumps({
+            'result_2024-10-05T11:40:39.732479': '00:25:26.000-00:34:06.000,',
+            'auto': '00:00:00.000-01:05:54.840,'
+        }), encoding='utf-8')
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def append(self, *segments: Segment):
+        segment_container = SegmentContainer()
+        segment_container.add_many(segments)
+        append_last_segments_to_segment_journal(self.media_path, segment_container)
+
+    def test_append_and_import_segments(self):
+        self.append(Segment(0., 10.))
+        self.append(Segment(0., 20.), Segment(30., 40.))
+
+        imported_segments = import_segments(self.media_path)
+        self.assertEqual(
+            [
+                '00:00:00.000-00:00:20.000,00:00:30.000-00:00:40.000',
+                '00:00:00.000-00:00:10.000',
+                '00:25:26.000-00:34:06.000,',
+                '00:00:00.000-01:05:54.840,'
+            ],
+            list(imported_segments.values())
+        )
+        self.assertEqual('auto', list(imported_segments.keys())[-1])
+        self.assertEqual(2, len(self.journal_path.read_text(encoding='utf-8').splitlines()))
+
+        self.assertEqual(
+            ['00:00:00.000-00:00:20.000,00:00:30.000-00:00:40.000', '00:25:26.000-00:34:06.000,', '00:00:00.000-01:05:54.840,'],
+            list(import_segments(self.media_path, max_results=1).values())
+        )
+
+    def test_append_create_missing_segments_file(self):
+        self.segments_path.unlink()
+        self.append(Segment(0., 10.))
+
+        self.assertEqual({}, json.loads(self.segments_path.read_text(encoding='utf-8')))
+        self.assertEqual(['00:00:00.000-00:00:10.000'], list(import_segments(self.media_path).values()))
+
+    def test_read_latest_results(self):
+        for index in range(200):
+            self.append(Segment(index, index + .5))
+
+        # a crash truncated the last line
+        with self.journal_path.open('ab') as journal:
+            journal.write(b'{"result_2')
+
+        with mock.patch.object(import_segments_from_file, 'JOURNAL_READ_BLOCK_SIZE', 256):
+            latest_results = read_latest_results(self.media_path, max_results=3)
+
+        self.assertEqual(
+            ['00:03:19.000-00:03:19.500', '00:03:18.000-00:03:18.500', '00:03:17.000-00:03:17.500'],
+            [raw_segments for _, raw_segments in latest_results]
+        )
+        self.assertEqual(200, len(read_latest_results(self.media_path)))
+
+        self.append(Segment(1000., 1001.))
+        self.assertEqual('00:16:40.000-00:16:41.000', read_latest_results(self.media_path, max_results=1)[0][1])
+        self.assertEqual(201, len(read_latest_results(self.media_path)))
+
+    def test_compact_segments_journal(self):
+        for index in range(5):
+            self.append(Segment(index, index + .5))
+
+        self.assertEqual(3, compact_segments_journal(self.media_path, max_results=3))
+        self.assertEqual({'auto': '00:00:00.000-01:05:54.840,'}, json.loads(self.segments_path.read_text(encoding='utf-8')))
+        self.assertEqual(
+            ['00:00:04.000-00:00:04.500', '00:00:03.000-00:00:03.500', '00:00:02.000-00:00:02.500', '00:00:00.000-01:05:54.840,'],
+            list(import_segments(self.media_path).values())
+        )
+
+        self.assertEqual(0, compact_segments_journal(self.media_path, max_results=3))
+
+        self.assertEqual(1, compact_segments_journal(self.media_path, max_results=2))
+        self.assertEqual(2, len(read_latest_results(self.media_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from movie_pipeline_segments_validator.settings import SettingsLoader
+
+
+class TestSettingsLoader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir_path = Path(self.temp_dir.name)
+        (self.config_dir_path / 'Films').mkdir()
+        (self.config_dir_path / 'Séries').mkdir()
+
+        self.title_strategies_path = self.config_dir_path / 'title_strategies.yml'
+        self.title_strategies_path.write_text('Channel 1: SubtitleTitleExpanderExtractor', encoding='utf-8')
+
+        self.config_path = self.config_dir_path / 'config.env'
+        self.config_path.write_text(
+            'Paths__movies_folder=Films\n'
+            'Paths__series_folder=Séries\n'
+            'Paths__title_strategies=title_strategies.yml\n'
+            'Paths__db_path=sessions.sqlite3\n',
+            encoding='utf-8'
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def touch(self, path: Path, content: str):
+        path.write_text(content, encoding='utf-8')
+        mtime_ns = path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_resolve_relative_paths_from_config_dir(self):
+        settings = SettingsLoader(self.config_path).get()
+
+        self.assertEqual(self.config_dir_path / 'Films', settings.Paths.movies_folder)
+        self.assertEqual(self.config_dir_path / 'sessions.sqlite3', settings.Paths.db_path)
+        self.assertEqual({'Channel 1': 'SubtitleTitleExpanderExtractor'}, settings.PathsContent.title_strategies)
+
+    def test_reuse_settings_until_a_file_changes(self):
+        settings_loader = SettingsLoader(self.config_path, ttl_s=0)
+        settings = settings_loader.get()
+
+        self.assertIs(settings, settings_loader.get())
+
+        self.touch(self.title_strategies_path, 'Channel 2: SerieSubTitleAwareTitleExtractor')
+        reloaded_settings = settings_loader.get()
+        self.assertIsNot(settings, reloaded_settings)
+        self.assertEqual({'Channel 2': 'SerieSubTitleAwareTitleExtractor'}, reloaded_settings.PathsContent.title_strategies)
+
+        self.touch(self.config_path, self.config_path.read_text(encoding='utf-8') + 'MediaSelector__media_extension=.mp4\n')
+        self.assertEqual('.mp4', settings_loader.get().MediaSelector.media_extension)
+
+    def test_skip_change_detection_within_ttl(self):
+        settings_loader = SettingsLoader(self.config_path, ttl_s=3600)
+        settings = settings_loader.get()
+
+        self.touch(self.title_strategies_path, 'Channel 2: SerieSubTitleAwareTitleExtractor')
+        self.assertIs(settings, settings_loader.get())
+
+
+if __name__ == '__main__':
+    unittest.main()